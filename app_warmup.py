@@ -0,0 +1,95 @@
+"""
+Background Warm-up for the App's Heavy Subsystems
+Runs named startup steps (dataset, models, analyzer) off the import path and
+tracks per-subsystem readiness for /api/health and waiting requests
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def warmup_mode():
+    """'background' (default) or 'blocking' (finish every step during import)"""
+    mode = os.getenv('APP_WARMUP', 'background').lower()
+    return mode if mode in ['background', 'blocking'] else 'background'
+
+
+class Warmup:
+    """Ordered startup steps run once, each with its own readiness flag.
+
+    A step that raises is reported as failed; the app keeps serving with
+    whatever fallbacks it has, as it did when these steps ran at import,
+    but is not reported ready.
+    """
+
+    def __init__(self):
+        self.steps = OrderedDict()
+        self.started_at = None
+        self._done = {}
+        self._thread = None
+
+    def add(self, name, step):
+        self.steps[name] = {'step': step, 'state': 'pending', 'seconds': None, 'error': None}
+        self._done[name] = threading.Event()
+
+    def start(self, background=True):
+        """Run the steps in order (in a daemon thread by default)"""
+        if self.started_at is not None:
+            return
+        self.started_at = time.time()
+        if background:
+            self._thread = threading.Thread(target=self._run, name='app-warmup', daemon=True)
+            self._thread.start()
+        else:
+            self._run()
+
+    def _run(self, names=None):
+        for name in names or list(self.steps):
+            entry = self.steps[name]
+            entry['state'] = 'loading'
+            start = time.perf_counter()
+            try:
+                entry['step']()
+                entry['state'] = 'ready'
+            except Exception as e:
+                entry['state'] = 'failed'
+                entry['error'] = str(e)
+                print(f"[ERROR] Warm-up step '{name}' failed: {str(e)}")
+            entry['seconds'] = round(time.perf_counter() - start, 3)
+            self._done[name].set()
+        print(f"[OK] Warm-up finished in {time.time() - self.started_at:.2f} s")
+
+    def after_fork(self):
+        """Finish, in a forked child, the steps the parent's thread had not"""
+        pending = [name for name in self.steps if not self.finished(name)]
+        if self.started_at is None or not pending:
+            return
+        for name in pending:
+            self.steps[name]['state'] = 'pending'
+            self._done[name] = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(pending,), name='app-warmup', daemon=True)
+        self._thread.start()
+
+    def wait(self, names, timeout=None):
+        """Block until the named steps have finished; False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for name in names:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not self._done[name].wait(remaining):
+                return False
+        return True
+
+    def finished(self, name):
+        return self._done[name].is_set()
+
+    def ready(self):
+        """Every step has finished and none failed"""
+        return all(self.finished(name) and entry['state'] != 'failed' for name, entry in self.steps.items())
+
+    def report(self):
+        return {
+            name: {key: entry[key] for key in ('state', 'seconds', 'error')}
+            for name, entry in self.steps.items()
+        }
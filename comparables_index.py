@@ -0,0 +1,116 @@
+"""
+Hierarchical Comparables Index
+Precomputed "similar cars" summaries at the (company, model, year),
+(company, year) and company levels, so car_info is a dictionary lookup
+"""
+
+import numpy as np
+
+# Fallback order used when looking up comparables for a car
+LEVELS = [
+    ('exact_match', ['company', 'model', 'year']),
+    ('company_year_match', ['company', 'year']),
+    ('company_match', ['company'])
+]
+
+# (response key, column, number of entries kept)
+DISTRIBUTIONS = [
+    ('fuel_type_distribution', 'fuel_type', None),
+    ('transmission_distribution', 'transmission', None),
+    ('condition_distribution', 'car_condition', None),
+    ('top_cities', 'city', 10)
+]
+
+
+def _round(value, digits):
+    return float(round(value, digits))
+
+
+def _group_key(index, n_keys):
+    """Group key of a (keys..., value) index entry, matching groupby's own keys"""
+    return index[0] if n_keys == 1 else tuple(index[:n_keys])
+
+
+class ComparablesIndex:
+    """Serializable car_info summaries for every group at every level.
+
+    Each entry holds the listing count, price statistics, categorical
+    distributions, year range and average kilometers of its group.
+    """
+
+    def __init__(self, df):
+        self.levels = {name: {} for name, _ in LEVELS}
+
+        if df is None or df.empty or 'company' not in df.columns:
+            return
+
+        for name, keys in LEVELS:
+            if all(key in df.columns for key in keys):
+                self._build_level(df, keys, self.levels[name])
+
+    def _build_level(self, df, keys, target):
+        grouped = df.groupby(keys[0] if len(keys) == 1 else keys, sort=False, observed=True)
+
+        counts = grouped.size()
+        prices = grouped['Price'].agg(['mean', 'min', 'max', 'std']).to_dict('index')
+        years = grouped['year'].agg(['min', 'max']).to_dict('index')
+        if 'kilometers_driven' in df.columns:
+            kms = grouped['kilometers_driven'].mean().to_dict()
+        else:
+            kms = {}
+
+        for key, count in counts.items():
+            price = prices[key]
+            target[key] = {
+                'similar_cars_found': int(count),
+                'price_statistics': {
+                    'average': _round(price['mean'], 2),
+                    'minimum': _round(price['min'], 2),
+                    'maximum': _round(price['max'], 2),
+                    'standard_deviation': _round(price['std'], 2) if not np.isnan(price['std']) else 0.0
+                },
+                'year_range': {'min': int(years[key]['min']), 'max': int(years[key]['max'])},
+                'average_kilometers': _round(kms.get(key, np.nan), 0)
+            }
+            for field, _, _ in DISTRIBUTIONS:
+                target[key][field] = {}
+
+        # value_counts per group, ordered by count like Series.value_counts
+        for field, column, limit in DISTRIBUTIONS:
+            if column not in df.columns:
+                continue
+            for index, count in grouped[column].value_counts().items():
+                if not count:
+                    # Categorical columns also list categories absent from the group
+                    continue
+                distribution = target[_group_key(index, len(keys))][field]
+                if limit is None or len(distribution) < limit:
+                    distribution[index[-1]] = int(count)
+
+    def __len__(self):
+        return sum(len(level) for level in self.levels.values())
+
+    def lookup(self, company, model, year):
+        """car_info for the most specific level with listings, or None"""
+        keys = {
+            'exact_match': (company, model, year),
+            'company_year_match': (company, year),
+            'company_match': company
+        }
+        try:
+            found = {name: self.levels[name].get(keys[name]) for name, _ in LEVELS}
+        except TypeError:
+            # Unhashable request values cannot match any listing
+            return None
+
+        entry = next((found[name] for name, _ in LEVELS if found[name] is not None), None)
+        if entry is None:
+            return None
+
+        # Copy so callers can enrich the result without touching the index
+        info = {
+            key: dict(value) if isinstance(value, dict) else value
+            for key, value in entry.items()
+        }
+        info['data_availability'] = {name: found[name] is not None for name, _ in LEVELS}
+        return info
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Columnar Dataset Snapshots
+Caches a loaded listings table as a content-hashed NumPy npz bundle so later
+boots skip CSV parsing and full Mongo reads while the source is unchanged
+"""
+
+import glob
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+
+class SnapshotUnsupported(ValueError):
+    """The table has a column the npz format cannot round-trip exactly"""
+
+
+# Per-thread flag set by fresh_reads()
+_reads = threading.local()
+
+
+def snapshots_enabled():
+    return os.getenv('DATASET_SNAPSHOTS', 'true').lower() in ['1', 'true', 'yes']
+
+
+def snapshot_dir():
+    return os.getenv('DATASET_SNAPSHOT_DIR', 'dataset_snapshots')
+
+
+def file_fingerprint(path):
+    """Content hash of a source file (raises FileNotFoundError like read_csv)"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def collection_fingerprint(collection):
+    """Cheap server-side fingerprint of a Mongo collection, or None if it has no reliable one.
+
+    Uses the dbHash command (an md5 of the collection contents) where the
+    server allows it. Otherwise the document count, newest _id and newest
+    ``updated_at`` stand in; count and _id alone miss in-place updates and
+    delete-plus-insert, so this needs every document stamped with
+    ``updated_at`` on write (upload_dataset_to_mongodb.py does).
+    """
+    try:
+        result = collection.database.command('dbHash', collections=[collection.name])
+        return f"dbhash-{result['collections'][collection.name]}"
+    except Exception:
+        pass
+
+    if collection.count_documents({'updated_at': {'$exists': False}}, limit=1):
+        return None
+    newest = collection.find_one({}, {'_id': 1}, sort=[('_id', -1)])
+    changed = collection.find_one({}, {'updated_at': 1}, sort=[('updated_at', -1)])
+    return (f"count-{collection.count_documents({})}-{newest['_id'] if newest else 'none'}"
+            f"-{changed['updated_at'].isoformat() if changed else 'none'}")
+
+
+def snapshot_path(name, fingerprint):
+    key = hashlib.sha1(f"{name}:{fingerprint}".encode('utf-8')).hexdigest()[:16]
+    return os.path.join(snapshot_dir(), f"{name}-{key}.npz")
+
+
+def is_string_column(series):
+    if pd.api.types.is_string_dtype(series.dtype) and series.dtype != object:
+        return True
+    if series.dtype == object:
+        return series.dropna().map(type).eq(str).all()
+    return False
+
+
+def to_arrays(df):
+    """Encode a DataFrame as npz-ready arrays (no pickled objects)"""
+    arrays = {
+        '__columns__': np.array([str(column) for column in df.columns]),
+        '__dtypes__': np.array([str(dtype) for dtype in df.dtypes])
+    }
+    if len(set(arrays['__columns__'])) != len(df.columns):
+        raise SnapshotUnsupported("Duplicate or non-string column names")
+
+    for i, column in enumerate(df.columns):
+        series = df[column]
+        if is_string_column(series):
+            # Dictionary-encode strings: codes plus the distinct values
+            codes, categories = pd.factorize(series)
+            if len(categories) and not all(isinstance(value, str) for value in categories):
+                raise SnapshotUnsupported(f"Column '{column}' mixes strings and other values")
+            arrays[f"c{i}"] = codes.astype(np.int32)
+            arrays[f"c{i}_categories"] = np.array(list(categories), dtype=str)
+        elif isinstance(series.dtype, np.dtype) and series.dtype.kind in 'biufM':
+            arrays[f"c{i}"] = series.to_numpy()
+        else:
+            raise SnapshotUnsupported(f"Column '{column}' has unsupported dtype {series.dtype}")
+    return arrays
+
+
+def from_arrays(arrays):
+    """Rebuild the DataFrame written by to_arrays"""
+    columns = {}
+    for i, (column, dtype) in enumerate(zip(arrays['__columns__'].tolist(), arrays['__dtypes__'].tolist())):
+        values = arrays[f"c{i}"]
+        if f"c{i}_categories" in arrays:
+            categories = arrays[f"c{i}_categories"].astype(object)
+            if dtype == 'object':
+                decoded = categories.take(values) if len(categories) else np.empty(len(values), dtype=object)
+                decoded[values < 0] = np.nan
+            else:
+                # Gather straight into the string extension array; -1 becomes missing
+                decoded = pd.array(categories, dtype=dtype).take(values, allow_fill=True)
+            columns[column] = decoded
+        else:
+            columns[column] = values
+    return pd.DataFrame(columns)
+
+
+def load_snapshot(name, fingerprint):
+    """Return the cached table for this source fingerprint, or None"""
+    if not snapshots_enabled():
+        return None
+    path = snapshot_path(name, fingerprint)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as bundle:
+            return from_arrays({key: bundle[key] for key in bundle.files})
+    except Exception as e:
+        print(f"[WARNING] Ignoring unreadable dataset snapshot {path}: {str(e)}")
+        return None
+
+
+def save_snapshot(name, fingerprint, df):
+    """Write the table for this fingerprint and drop older snapshots of ``name``"""
+    if not snapshots_enabled():
+        return None
+    try:
+        arrays = to_arrays(df)
+        os.makedirs(snapshot_dir(), exist_ok=True)
+        path = snapshot_path(name, fingerprint)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(temp_path, path)
+
+        for old in glob.glob(os.path.join(snapshot_dir(), f"{name}-*.npz")):
+            if old != path:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+        return path
+    except Exception as e:
+        print(f"[WARNING] Could not write dataset snapshot for {name}: {str(e)}")
+        return None
+
+
+@contextmanager
+def fresh_reads():
+    """Within this block cached_table reads the source and rewrites the snapshot instead of trusting it"""
+    previous = getattr(_reads, 'fresh', False)
+    _reads.fresh = True
+    try:
+        yield
+    finally:
+        _reads.fresh = previous
+
+
+def cached_table(name, fingerprint, loader):
+    """Return the snapshot for ``fingerprint`` or call ``loader()`` and snapshot it.
+
+    A None fingerprint means the source cannot tell whether it changed, so
+    ``loader()`` is always called and nothing is cached. Inside
+    fresh_reads() the snapshot is rewritten from ``loader()``.
+    """
+    if fingerprint is None:
+        print(f"[INFO] {name} has no reliable change fingerprint, not using snapshots")
+        return loader()
+
+    start = time.perf_counter()
+    df = None if getattr(_reads, 'fresh', False) else load_snapshot(name, fingerprint)
+    if df is not None:
+        print(f"[OK] {name} loaded from snapshot in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return df
+
+    df = loader()
+    if df is not None and save_snapshot(name, fingerprint, df):
+        print(f"[INFO] Snapshot written for {name}")
+    return df
+
+
+def read_csv_cached(path):
+    """pd.read_csv backed by a snapshot keyed on the file contents"""
+    return cached_table(os.path.basename(path), file_fingerprint(path), lambda: pd.read_csv(path))
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Round-trip check: the snapshot must reproduce read_csv exactly
+    paths = sys.argv[1:] or ['Cleaned_Car_data_master.csv', 'generated_5000_strict.csv']
+    for path in paths:
+        start = time.perf_counter()
+        expected = pd.read_csv(path)
+        parse_ms = (time.perf_counter() - start) * 1000
+
+        fingerprint = file_fingerprint(path)
+        save_snapshot(os.path.basename(path), fingerprint, expected)
+        start = time.perf_counter()
+        actual = load_snapshot(os.path.basename(path), fingerprint)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        pd.testing.assert_frame_equal(actual, expected)
+        print(f"[OK] {path}: {len(actual)} rows identical (read_csv {parse_ms:.0f} ms, snapshot {load_ms:.0f} ms)")
@@ -0,0 +1,287 @@
+"""
+Shared Listings Dataset Store
+Loads the listings table once, normalizes and versions it, and hands every
+subsystem (API routes, indexes, market analyzer) views of the same copy;
+reloads build a new version in the background and swap it in atomically
+"""
+
+import threading
+import time
+
+import pandas as pd
+
+from dataset_snapshot import fresh_reads
+from dataset_types import compact_dtypes, compact_types_enabled, memory_mb
+from shared_dataset import SharedFrame, shared_dataset_enabled
+
+# Other spellings of the kilometers column used by the source datasets
+KILOMETER_ALIASES = ['kms_driven', 'km_driven']
+
+# Spelling API clients read besides kilometers_driven (the training data's name)
+SERIALIZED_KILOMETER_ALIAS = 'kms_driven'
+
+
+def normalize_listings(df):
+    """Canonical listing columns: kilometers in ``kilometers_driven`` only.
+
+    Where a dataset spells the column differently (or rows of a combined
+    dataset use different spellings) the values are merged into
+    ``kilometers_driven`` and the alias columns dropped.
+    """
+    if df is None:
+        return pd.DataFrame()
+
+    aliases = [column for column in KILOMETER_ALIASES if column in df.columns]
+    if not aliases:
+        return df
+
+    kilometers = df['kilometers_driven'] if 'kilometers_driven' in df.columns else None
+    for alias in aliases:
+        kilometers = df[alias] if kilometers is None else kilometers.fillna(df[alias])
+
+    position = df.columns.get_loc('kilometers_driven' if 'kilometers_driven' in df.columns else aliases[0])
+    df = df.drop(columns=[column for column in aliases + ['kilometers_driven'] if column in df.columns])
+    df.insert(min(position, len(df.columns)), 'kilometers_driven', kilometers)
+    return df
+
+
+def listing_records(frame):
+    """Row dicts of ``frame`` as served by the API: ``to_dict('records')`` plus ``kms_driven``.
+
+    normalize_listings keeps one kilometers column; rows are still served
+    with the ``kms_driven`` spelling alongside it.
+    """
+    records = frame.to_dict('records')
+    if 'kilometers_driven' in frame.columns:
+        for record in records:
+            record[SERIALIZED_KILOMETER_ALIAS] = record['kilometers_driven']
+    return records
+
+
+def compute_dataset_version(df):
+    """Cheap content fingerprint of the listings table"""
+    try:
+        return f"{len(df)}-{int(pd.util.hash_pandas_object(df, index=False).sum()) & 0xffffffff:08x}"
+    except Exception:
+        return f"{len(df)}-{len(df.columns)}"
+
+
+def is_appended_to(df, previous):
+    """Whether ``df`` (normalized) is ``previous``'s table with rows appended at the end"""
+    rows = len(previous.frame)
+    if len(df) <= rows or list(df.columns) != list(previous.frame.columns):
+        return False
+    return compute_dataset_version(df.iloc[:rows]) == previous.version
+
+
+def compact_frame(df):
+    """Store the listings table in compact dtypes (same values, less memory)"""
+    if not compact_types_enabled() or df.empty:
+        return df
+    try:
+        before = memory_mb(df)
+        compact = compact_dtypes(df)
+        print(f"[OK] Dataset types compacted: {before:.1f} MB -> {memory_mb(compact):.1f} MB")
+        return compact
+    except Exception as e:
+        print(f"[WARNING] Could not compact dataset types: {e}")
+        return df
+
+
+def share_frame(df, version_id):
+    """Place the table in shared memory (SHARED_DATASET); None keeps it in process memory"""
+    if not shared_dataset_enabled() or df.empty:
+        return None
+    try:
+        shared = SharedFrame.create(df, version_id)
+        print(f"[OK] Dataset {version_id} placed in shared memory: "
+              f"{shared.describe()['size_mb']:.1f} MB in {shared.manifest['segment']}")
+        return shared
+    except Exception as e:
+        print(f"[WARNING] Could not place dataset in shared memory: {e}")
+        return None
+
+
+class DatasetVersion:
+    """One loaded listings table plus everything derived from it.
+
+    The store's ``prepare`` hook attaches derived catalogs and indexes as
+    attributes. Requests take one reference to the active version and read
+    everything from it, so a reload never mixes two tables in one response.
+    With ``shared`` (a SharedFrame) the frame's columns are read-only views of
+    a shared memory segment that lives as long as the version.
+    While ``prepare`` runs, ``appended_to`` is the previous version when this
+    table is that one plus rows appended at the end (None otherwise), so
+    derived state can be extended instead of rebuilt.
+    """
+
+    def __init__(self, frame, version, shared=None):
+        self.frame = shared.frame if shared is not None else frame
+        self.version = version
+        self.shared = shared
+        self.loaded_at = time.time()
+        self.appended_to = None
+        self._derived = {}
+        self._derive_lock = threading.Lock()
+
+    def derive(self, name, build):
+        """``build(self)`` computed once per version, on first use"""
+        if name not in self._derived:
+            with self._derive_lock:
+                if name not in self._derived:
+                    self._derived[name] = build(self)
+        return self._derived[name]
+
+    def derived(self, name):
+        """``name`` if it has already been built for this version, else None"""
+        return self._derived.get(name)
+
+    def view(self):
+        """Shallow copy that can take extra derived columns without copying the listings"""
+        return self.frame.copy(deep=False)
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'records': len(self.frame),
+            'columns': len(self.frame.columns),
+            'memory_mb': round(memory_mb(self.frame), 2),
+            'shared_memory': self.shared.describe() if self.shared is not None else None,
+            'loaded_at': self.loaded_at
+        }
+
+
+class DatasetStore:
+    """The single in-process copy of the listings table.
+
+    ``loader()`` returns the raw table (from MongoDB or the CSV files). The
+    store normalizes column names, fingerprints the contents and compacts
+    the dtypes. ``prepare(version)`` then builds the derived catalogs and
+    indexes and ``on_activate(version)`` publishes a newly activated
+    version. Consumers must treat ``frame`` as read-only.
+    """
+
+    def __init__(self, loader=None, prepare=None, on_activate=None):
+        self.loader = loader
+        self.prepare = prepare
+        self.on_activate = on_activate
+
+        self.active = None
+        self.status = {'state': 'idle', 'error': None, 'finished_at': None}
+
+        self.reload_interval = 0
+        self._lock = threading.Lock()
+        self._reload_thread = None
+        self._schedule_thread = None
+
+    @property
+    def frame(self):
+        return self.active.frame if self.active is not None else pd.DataFrame()
+
+    @property
+    def version(self):
+        return self.active.version if self.active is not None else None
+
+    def load(self, df=None, unless_version=None):
+        """Load (or adopt ``df``) and prepare a version without activating it.
+
+        Returns None when the contents match ``unless_version``.
+        """
+        raw = self.loader() if df is None else df
+        frame = normalize_listings(raw)
+        version_id = compute_dataset_version(frame)
+        if unless_version is not None and version_id == unless_version:
+            return None
+
+        previous = self.active
+        appended = previous is not None and is_appended_to(frame, previous)
+
+        frame = compact_frame(frame)
+        version = DatasetVersion(frame, version_id, shared=share_frame(frame, version_id))
+        if self.prepare is not None:
+            version.appended_to = previous if appended else None
+            try:
+                self.prepare(version)
+            finally:
+                # Do not keep the previous table alive through the new version
+                version.appended_to = None
+        return version
+
+    def activate(self, version):
+        """Make ``version`` the one serving requests"""
+        with self._lock:
+            self.active = version
+            if self.on_activate is not None:
+                self.on_activate(version)
+
+    def load_and_activate(self, df=None):
+        version = self.load(df)
+        self.activate(version)
+        return version
+
+    def view(self):
+        return self.active.view() if self.active is not None else pd.DataFrame()
+
+    def reload(self, background=True):
+        """Re-read the source (in a background thread by default) and swap in a new version.
+
+        Snapshots are bypassed: the source is read again and its snapshot
+        rewritten. Returns False if a reload is already running.
+        """
+        with self._lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return False
+            self.status = {'state': 'loading', 'error': None, 'finished_at': None}
+            self._reload_thread = threading.Thread(target=self._reload, name='dataset-reload', daemon=True)
+
+        if background:
+            self._reload_thread.start()
+        else:
+            self._reload_thread.run()
+        return True
+
+    def _reload(self):
+        try:
+            with fresh_reads():
+                version = self.load(unless_version=self.version)
+            if version is None:
+                self.status = {'state': 'unchanged', 'error': None, 'finished_at': time.time()}
+                return
+            self.activate(version)
+            self.status = {'state': 'ready', 'error': None, 'finished_at': time.time()}
+            print(f"[OK] Dataset {version.version} activated ({len(version.frame)} records)")
+        except Exception as e:
+            # The previous version keeps serving
+            self.status = {'state': 'failed', 'error': str(e), 'finished_at': time.time()}
+            print(f"[ERROR] Dataset reload failed: {str(e)}")
+
+    def schedule(self, interval):
+        """Reload every ``interval`` seconds in a daemon thread (0 disables)"""
+        if not interval or interval <= 0 or self._schedule_thread is not None:
+            return
+        self.reload_interval = interval
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.reload(background=False)
+
+        self._schedule_thread = threading.Thread(target=run, name='dataset-reload-schedule', daemon=True)
+        self._schedule_thread.start()
+
+    def after_fork(self):
+        """Restart the reload schedule in a forked worker.
+
+        Threads do not survive fork; the inherited version stays shared
+        copy-on-write until this worker reloads a version of its own.
+        """
+        self._lock = threading.Lock()
+        self._reload_thread = None
+        self._schedule_thread = None
+        self.schedule(self.reload_interval)
+
+    def stats(self):
+        return {
+            'active': self.active.describe() if self.active is not None else None,
+            'reload': dict(self.status)
+        }
@@ -0,0 +1,108 @@
+"""
+Compact In-Memory Types for the Listings Table
+Dictionary-encodes low-cardinality string columns as pandas Categoricals and
+downcasts numeric columns wherever every value survives unchanged
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from dataset_snapshot import is_string_column
+
+# String columns with at most this share of distinct values become categorical
+CATEGORY_MAX_RATIO = 0.5
+
+# Whole-number float columns within this bound are stored as float32. The
+# bound keeps them small spec/count fields (doors, accidents, engine size);
+# prices and kilometers stay float64 so means match the float64 results
+FLOAT32_MAX_WHOLE = 2 ** 15
+
+
+def compact_types_enabled():
+    return os.getenv('COMPACT_DATASET_TYPES', 'true').lower() in ['1', 'true', 'yes']
+
+
+def _smallest_int_dtype(values):
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if values.min() >= info.min and values.max() <= info.max:
+            return dtype
+    return values.dtype
+
+
+def compact_column(series, max_category_ratio=CATEGORY_MAX_RATIO):
+    """Return ``series`` in the most compact dtype that keeps every value"""
+    if series.empty:
+        return series
+
+    if is_string_column(series):
+        if series.nunique(dropna=True) <= max(1, len(series) * max_category_ratio):
+            # Categories in order of first appearance, so value_counts ties
+            # and unique() keep the order the string column gives
+            return series.astype(pd.CategoricalDtype(series.dropna().unique()))
+        return series
+
+    if not isinstance(series.dtype, np.dtype):
+        return series
+
+    values = series.to_numpy()
+    if series.dtype.kind in 'iu':
+        return series.astype(_smallest_int_dtype(values))
+
+    if series.dtype == np.float64:
+        present = values[~np.isnan(values)]
+        if (len(present) and np.abs(present).max() <= FLOAT32_MAX_WHOLE
+                and np.array_equal(present, np.round(present))):
+            return series.astype(np.float32)
+    return series
+
+
+def compact_dtypes(df, max_category_ratio=CATEGORY_MAX_RATIO):
+    """Copy of the listings table with categorical strings and downcast numerics"""
+    if df is None or df.empty:
+        return df
+    return pd.DataFrame(
+        {column: compact_column(df[column], max_category_ratio) for column in df.columns},
+        index=df.index
+    )
+
+
+def widen_numeric(df):
+    """Shallow copy of ``df`` with downcast numeric columns back at 64 bits (categoricals stay).
+
+    For statistics that must match the full-width table to the last bit
+    (float32 means and fills round differently).
+    """
+    widened = df.copy(deep=False)
+    for column in df.columns:
+        dtype = df[column].dtype
+        if isinstance(dtype, np.dtype) and dtype.kind in 'iuf' and dtype.itemsize < 8:
+            widened[column] = df[column].astype(np.float64 if dtype.kind == 'f' else np.int64)
+    return widened
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # Value check: the compact table must hold exactly the same values
+    paths = sys.argv[1:] or ['Cleaned_Car_data_master.csv', 'generated_5000_strict.csv']
+    original = pd.concat([pd.read_csv(path) for path in paths], ignore_index=True)
+    compact = compact_dtypes(original)
+    restored = compact.astype(original.dtypes.to_dict())
+    pd.testing.assert_frame_equal(restored, original)
+    print(f"[OK] {len(original)} rows identical; {memory_mb(original):.1f} MB -> {memory_mb(compact):.1f} MB")
+    print(compact.dtypes.to_string())
+
+    company = original['company'].mode()[0]
+    for label, df in (('original', original), ('compact', compact)):
+        start = time.perf_counter()
+        for _ in range(200):
+            (df['company'] == company) & (df['fuel_type'] == 'Diesel')
+        print(f"{label}: company & fuel_type mask {(time.perf_counter() - start) / 200 * 1000:.3f} ms")
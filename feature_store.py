@@ -0,0 +1,80 @@
+"""
+Prediction-Input Feature Store
+Precomputed per-(company, model, year), per-(company, model) and per-company
+aggregates so prediction inputs are dictionary lookups instead of dataset scans
+"""
+
+import numpy as np
+
+# Spec columns whose typical value fills in fields a request leaves out
+SPEC_COLUMNS = ['engine_size', 'power', 'num_doors']
+
+
+def _clean(value):
+    """Convert aggregates to plain Python numbers, NaN to None"""
+    if value is None:
+        return None
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+class FeatureStore:
+    """Aggregates of the listings table at three levels of detail.
+
+    Each entry holds the listing count, mean price and the median
+    engine_size, power and num_doors of the matching listings.
+    """
+
+    def __init__(self, df):
+        self.by_model_year = {}
+        self.by_model = {}
+        self.by_company = {}
+
+        if df is None or df.empty or 'company' not in df.columns or 'Price' not in df.columns:
+            return
+
+        specs = [column for column in SPEC_COLUMNS if column in df.columns]
+        levels = [('company', self.by_company)]
+        if 'model' in df.columns:
+            levels.append((['company', 'model'], self.by_model))
+            if 'year' in df.columns:
+                levels.append((['company', 'model', 'year'], self.by_model_year))
+
+        for keys, target in levels:
+            grouped = df.groupby(keys, sort=False, observed=True)
+            counts = grouped.size()
+            prices = grouped['Price'].mean()
+            medians = grouped[specs].median() if specs else None
+
+            for key, count in counts.items():
+                entry = {'count': int(count), 'price_mean': prices.get(key)}
+                for column in specs:
+                    typical = _clean(medians.at[key, column])
+                    entry[column] = int(round(typical)) if typical is not None else None
+                target[key] = entry
+
+    def __len__(self):
+        return len(self.by_model_year) + len(self.by_model) + len(self.by_company)
+
+    def price_mean(self, company, model, year):
+        """Mean price of the same company/model/year, else of the brand (None if unknown)"""
+        entry = self.by_model_year.get((company, model, year))
+        if entry is None:
+            entry = self.by_company.get(company)
+        return entry['price_mean'] if entry is not None else None
+
+    def typical_spec(self, company, model, year, column, default):
+        """Most specific typical value of a spec column, or ``default``"""
+        try:
+            candidates = (
+                self.by_model_year.get((company, model, year)),
+                self.by_model.get((company, model)),
+                self.by_company.get(company)
+            )
+        except TypeError:
+            # Unhashable request values cannot match any listing
+            return default
+        for entry in candidates:
+            if entry is not None and entry.get(column) is not None:
+                return entry[column]
+        return default
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Compact Tree-Ensemble Engine for the Comprehensive Price Model
+Flattens a fitted RandomForest into contiguous NumPy arrays and evaluates
+all trees for a batch of rows with vectorized traversal
+"""
+
+import mmap
+import os
+import pickle
+import sys
+
+import joblib
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+from sklearn.pipeline import Pipeline
+
+
+def _float32_floor(values):
+    """Round float64 thresholds down to float32.
+
+    Trees compare float32 inputs with float64 thresholds. Rounding each
+    threshold to the largest float32 not above it keeps every
+    ``x <= threshold`` decision identical, so float32 storage is lossless.
+    """
+    rounded = values.astype(np.float32)
+    too_high = rounded.astype(np.float64) > values
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+
+class CompactForestRegressor(BaseEstimator, RegressorMixin):
+    """Array-backed replacement for a fitted forest regressor.
+
+    All trees share one set of node arrays (feature, threshold, children,
+    value); ``roots`` holds the index of each tree's first node. ``children``
+    stores the right child in column 0 and the left child in column 1 so the
+    comparison result indexes it directly. Leaves point at themselves, so a
+    fixed number of traversal steps settles every row.
+
+    Instances are only built from a fitted forest with ``from_forest`` (or
+    loaded from an exported artifact, where it ends a CompactPipeline);
+    there is no ``fit``, so retraining means exporting a new sklearn forest.
+    """
+
+    # Rows per traversal chunk; bounds the (rows x trees) working arrays
+    chunk_size = 4096
+
+    def __init__(self):
+        pass
+
+    @classmethod
+    def from_forest(cls, forest):
+        """Export a fitted RandomForestRegressor/ExtraTreesRegressor"""
+        if not isinstance(forest, (RandomForestRegressor, ExtraTreesRegressor)):
+            raise ValueError(f"Unsupported estimator: {type(forest).__name__}")
+        if forest.n_outputs_ != 1:
+            raise ValueError("Only single-output forests are supported")
+
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        counts = np.array([tree.node_count for tree in trees], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        total = int(counts.sum())
+        if total >= np.iinfo(np.int32).max:
+            raise ValueError("Forest too large for 32-bit node indexes")
+
+        feature = np.empty(total, dtype=np.int32)
+        threshold = np.empty(total, dtype=np.float64)
+        left = np.empty(total, dtype=np.int32)
+        right = np.empty(total, dtype=np.int32)
+        value = np.empty(total, dtype=np.float64)
+        missing_left = np.zeros(total, dtype=np.bool_)
+
+        for tree, offset, count in zip(trees, offsets, counts):
+            nodes = slice(offset, offset + count)
+            local = np.arange(count)
+            is_leaf = tree.children_left == -1
+
+            feature[nodes] = np.where(is_leaf, 0, tree.feature)
+            threshold[nodes] = np.where(is_leaf, 0.0, tree.threshold)
+            left[nodes] = np.where(is_leaf, local, tree.children_left) + offset
+            right[nodes] = np.where(is_leaf, local, tree.children_right) + offset
+            value[nodes] = tree.value[:, 0, 0]
+            if hasattr(tree, 'missing_go_to_left'):
+                missing_left[nodes] = tree.missing_go_to_left.astype(np.bool_) & ~is_leaf
+
+        n_features = int(forest.n_features_in_)
+        compact = cls()
+        compact.n_features_in_ = n_features
+        compact.n_estimators_ = len(trees)
+        compact.max_depth_ = int(max(tree.max_depth for tree in trees))
+        compact.roots_ = offsets.astype(np.int32)
+        compact.feature_ = feature.astype(np.int16 if n_features < np.iinfo(np.int16).max else np.int32)
+        compact.threshold_ = _float32_floor(threshold)
+        compact.children_ = np.ascontiguousarray(np.stack([right, left], axis=1))
+        compact.value_ = value
+        compact.missing_left_ = missing_left if missing_left.any() else None
+        return compact
+
+    def __setstate__(self, state):
+        # Memory-mapped arrays arrive as np.memmap; plain ndarray views of the
+        # same pages avoid the subclass overhead on every traversal step
+        for name, value in state.items():
+            if isinstance(value, np.memmap):
+                state[name] = value.view(np.ndarray)
+        super().__setstate__(state)
+
+    def __sklearn_is_fitted__(self):
+        return hasattr(self, 'roots_')
+
+    def _apply_chunk(self, X):
+        n_rows = X.shape[0]
+        n_features = X.shape[1]
+        node = np.tile(self.roots_, n_rows)
+        row_base = np.repeat(np.arange(n_rows, dtype=np.intp) * n_features, len(self.roots_))
+        flat_X = X.ravel()
+        children = self.children_.ravel()
+        has_nan = self.missing_left_ is not None and np.isnan(flat_X).any()
+
+        for _ in range(self.max_depth_):
+            x = np.take(flat_X, row_base + np.take(self.feature_, node))
+            go_left = x <= np.take(self.threshold_, node)
+            if has_nan:
+                go_left = np.where(np.isnan(x), np.take(self.missing_left_, node), go_left)
+            node = np.take(children, 2 * node + go_left)
+
+        return node.reshape(n_rows, len(self.roots_))
+
+    def apply(self, X):
+        """Return the global leaf index reached in every tree, shape (rows, trees)"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got shape {X.shape}")
+        if X.shape[0] <= self.chunk_size:
+            return self._apply_chunk(X)
+        return np.vstack([
+            self._apply_chunk(X[start:start + self.chunk_size])
+            for start in range(0, X.shape[0], self.chunk_size)
+        ])
+
+    def predict_all(self, X):
+        """Per-tree predictions, shape (rows, trees)"""
+        return self.value_[self.apply(X)]
+
+    def predict(self, X):
+        """Average of all trees, matching RandomForestRegressor.predict"""
+        return self.predict_all(X).mean(axis=1)
+
+    def predict_quantiles(self, X, quantiles=(10, 50, 90)):
+        """Mean prediction plus percentiles of the per-tree predictions.
+
+        Both come from a single traversal; returns ``(mean, percentiles)``
+        with shapes (rows,) and (rows, len(quantiles)).
+        """
+        per_tree = self.predict_all(X)
+        return per_tree.mean(axis=1), np.percentile(per_tree, quantiles, axis=1).T
+
+    def nbytes(self):
+        """Memory held by the node arrays"""
+        arrays = [self.roots_, self.feature_, self.threshold_, self.children_, self.value_]
+        if self.missing_left_ is not None:
+            arrays.append(self.missing_left_)
+        return int(sum(array.nbytes for array in arrays))
+
+
+class CompactPipeline(Pipeline):
+    """Prediction-only Pipeline whose final step is a CompactForestRegressor.
+
+    sklearn's Pipeline only counts a final step with ``fit`` as fitted; the
+    compact forest has none, so the check asks the forest directly.
+    """
+
+    def __sklearn_is_fitted__(self):
+        return self.steps[-1][1].__sklearn_is_fitted__()
+
+
+def compact_model_path(model_path):
+    """Location of the compact artifact exported from ``model_path``.
+
+    Compact artifacts are uncompressed joblib files so their node arrays can
+    be memory-mapped (see load_model_artifact).
+    """
+    root, _ = os.path.splitext(model_path)
+    return f"{root}.compact.joblib"
+
+
+def load_model_artifact(path):
+    """Load a saved model; joblib artifacts are memory-mapped read-only.
+
+    Every process mapping the same file shares its array pages through the
+    OS page cache, so gunicorn workers do not each hold a copy of the forest.
+    """
+    if path.endswith('.joblib'):
+        model_data = joblib.load(path, mmap_mode='r')
+    else:
+        with open(path, 'rb') as f:
+            model_data = pickle.load(f)
+
+    # Compact artifacts exported as a plain Pipeline predate CompactPipeline
+    pipeline = model_data.get('model') if isinstance(model_data, dict) else model_data
+    if (type(pipeline) is Pipeline and pipeline.steps
+            and isinstance(pipeline.steps[-1][1], CompactForestRegressor)):
+        pipeline = CompactPipeline(pipeline.steps, memory=pipeline.memory, verbose=pipeline.verbose)
+        if isinstance(model_data, dict):
+            model_data['model'] = pipeline
+        else:
+            model_data = pipeline
+    return model_data
+
+
+def export_compact_model(model_path='Comprehensive_Model.pkl', output_path=None):
+    """Write a copy of a saved model whose forest is replaced by the compact engine"""
+    output_path = output_path or compact_model_path(model_path)
+
+    with open(model_path, 'rb') as f:
+        model_data = pickle.load(f)
+
+    pipeline = model_data['model'] if isinstance(model_data, dict) else model_data
+    if not isinstance(pipeline, Pipeline):
+        raise ValueError("Expected a saved sklearn Pipeline")
+
+    name, forest = pipeline.steps[-1]
+    compact = CompactForestRegressor.from_forest(forest)
+    pipeline = CompactPipeline(pipeline.steps[:-1] + [(name, compact)], memory=pipeline.memory, verbose=pipeline.verbose)
+
+    if isinstance(model_data, dict):
+        model_data['model'] = pipeline
+        model_data['compact_forest'] = {
+            'source': os.path.basename(model_path),
+            'n_estimators': compact.n_estimators_,
+            'max_depth': compact.max_depth_,
+            'nbytes': compact.nbytes()
+        }
+    else:
+        model_data = pipeline
+
+    # No compression: compressed joblib files cannot be memory-mapped
+    joblib.dump(model_data, output_path, protocol=pickle.HIGHEST_PROTOCOL)
+
+    return output_path, forest, compact
+
+
+def is_memory_mapped(array):
+    """Whether ``array`` reads from a file mapping (directly or as a view of one)"""
+    while array is not None:
+        if isinstance(array, (np.memmap, mmap.mmap)):
+            return True
+        array = getattr(array, 'base', None)
+    return False
+
+
+def check_parity(forest, compact, X, rtol=1e-9):
+    """Compare the compact engine against ``forest.predict`` on X"""
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    expected = forest.predict(X)
+    actual = compact.predict(X)
+    max_error = float(np.max(np.abs(actual - expected))) if len(X) else 0.0
+    return bool(np.allclose(actual, expected, rtol=rtol, atol=1e-6)), max_error
+
+
+if __name__ == "__main__":
+    import time
+    import pandas as pd
+
+    from derived_features import MODEL_DERIVED_COLUMNS, add_derived_columns
+    # Re-import by module name so the pickle references forest_engine, not __main__
+    from forest_engine import check_parity, export_compact_model, load_model_artifact
+
+    # Defaults are the artifacts train_comprehensive_model.py writes and reads
+    source = sys.argv[1] if len(sys.argv) > 1 else 'Comprehensive_Model.pkl'
+    dataset = sys.argv[2] if len(sys.argv) > 2 else 'enhanced_indian_car_dataset.csv'
+    for path in (source, dataset):
+        if not os.path.exists(path):
+            print(f"[ERROR] {path} not found (usage: forest_engine.py [model.pkl] [training.csv])")
+            sys.exit(2)
+
+    print(f"Exporting compact forest from {source}...")
+    output, forest, compact = export_compact_model(source)
+    print(f"[OK] Compact model saved as: {output}")
+    print(f"Trees: {compact.n_estimators_}, max depth: {compact.max_depth_}, "
+          f"node arrays: {compact.nbytes() / 1e6:.1f} MB")
+
+    # Parity check on the preprocessed training data
+    with open(source, 'rb') as f:
+        pipeline = pickle.load(f)['model']
+    preprocessor = pipeline.steps[0][1]
+    df = pd.read_csv(dataset)
+    features = list(preprocessor.feature_names_in_)
+    df = add_derived_columns(df, MODEL_DERIVED_COLUMNS, reference_year=2024)
+    X = preprocessor.transform(df[features].dropna())
+
+    # Check the memory-mapped copy the app will actually serve
+    compact = load_model_artifact(output)['model'].steps[-1][1]
+    print(f"Node arrays memory-mapped: {is_memory_mapped(compact.value_)}")
+
+    matches, max_error = check_parity(forest, compact, X)
+    print(f"Parity on {len(X)} rows: {'OK' if matches else 'MISMATCH'} (max abs error {max_error:.6f})")
+
+    start = time.perf_counter()
+    forest.predict(X)
+    print(f"sklearn predict: {(time.perf_counter() - start) * 1000:.1f} ms")
+    start = time.perf_counter()
+    compact.predict(X)
+    print(f"compact predict: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    if not matches:
+        sys.exit(1)
@@ -0,0 +1,37 @@
+"""
+Gunicorn Configuration
+Preloads unified_app once in the master so forked workers share the loaded
+dataset, catalogs and models copy-on-write (PRELOAD_APP=false loads them in
+every worker instead)
+"""
+
+import gc
+import os
+
+preload_app = os.getenv('PRELOAD_APP', 'true').lower() in ['1', 'true', 'yes']
+
+if preload_app:
+    # The warm-up thread would not survive the fork, so finish it before
+    # the workers start
+    os.environ['APP_WARMUP'] = 'blocking'
+    # Listings columns in shared memory stay shared however long workers run
+    os.environ.setdefault('SHARED_DATASET', 'true')
+    # No collections while the app loads: freeing objects leaves holes in
+    # pages the workers would otherwise share
+    gc.disable()
+
+
+def when_ready(server):
+    if preload_app:
+        # Move everything loaded so far to the permanent generation so the
+        # workers' collections never write to (and un-share) those pages
+        gc.freeze()
+        server.log.info(f"Preloaded app frozen: {gc.get_freeze_count():,} objects shared with workers")
+
+
+def post_fork(server, worker):
+    gc.enable()
+    if preload_app:
+        import unified_app
+
+        unified_app.after_fork()
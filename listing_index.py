@@ -0,0 +1,213 @@
+"""
+Inverted Listing Index
+Maps every value of the filterable categorical columns to the sorted ids of
+the rows holding it, and keeps the numeric columns presorted, so searches
+intersect short id arrays and binary-search ranges instead of masking copies
+of the whole table
+"""
+
+import numpy as np
+import pandas as pd
+
+from text_index import TermIndex
+
+# Columns /api/cars/search filters on by exact value
+INDEXED_COLUMNS = ['company', 'model', 'fuel_type', 'transmission', 'owner', 'car_condition', 'city']
+
+# Numeric columns with range filters and sorted output
+RANGE_COLUMNS = ['Price', 'year', 'kilometers_driven']
+
+# Indexed columns whose values are also searched as text (free-text filter, suggestions)
+TEXT_COLUMNS = ['company', 'model', 'city', 'fuel_type']
+
+# Free-text search falls back to names at least this similar to the query; it
+# lists several candidates, so it accepts looser matches than name resolution
+FUZZY_SEARCH_THRESHOLD = 0.35
+
+EMPTY_IDS = np.empty(0, dtype=np.int32)
+
+
+def intersect_sorted(a, b):
+    """Ids present in both sorted id arrays (binary-searches the shorter in the longer)"""
+    if len(a) > len(b):
+        a, b = b, a
+    if not len(a):
+        return a
+    positions = np.minimum(np.searchsorted(b, a), len(b) - 1)
+    return a[b[positions] == a]
+
+
+def union_sorted(id_arrays):
+    id_arrays = [ids for ids in id_arrays if len(ids)]
+    if not id_arrays:
+        return EMPTY_IDS
+    if len(id_arrays) == 1:
+        return id_arrays[0]
+    return np.unique(np.concatenate(id_arrays))
+
+
+class SortedColumn:
+    """One numeric column presorted: ascending/descending permutations and sorted values.
+
+    Both permutations are stable (ties keep table order) and put missing
+    values last, like ``sort_values``.
+    """
+
+    def __init__(self, series):
+        self.values = series.to_numpy()
+        # float64 keys: NaN sorts last, and negating them gives a stable descending order
+        keys = self.values.astype(np.float64)
+        self.ascending = np.argsort(keys, kind='stable').astype(np.int32)
+        self.descending = np.argsort(-keys, kind='stable').astype(np.int32)
+        self.present = len(keys) - int(np.isnan(keys).sum())
+        self.sorted_values = keys[self.ascending[:self.present]]
+
+    def bounds(self, low=None, high=None):
+        """Slice of the ascending permutation holding ``low <= value <= high``"""
+        start = 0 if low is None else int(np.searchsorted(self.sorted_values, float(low), side='left'))
+        stop = self.present if high is None else int(np.searchsorted(self.sorted_values, float(high), side='right'))
+        return start, max(start, stop)
+
+    def in_range(self, ids, low=None, high=None):
+        values = self.values[ids].astype(np.float64)
+        keep = np.ones(len(ids), dtype=bool)
+        if low is not None:
+            keep &= values >= low
+        if high is not None:
+            keep &= values <= high
+        return ids[keep]
+
+    def order(self, ids=None, descending=False):
+        """``ids`` (all rows if None) in value order, read off the permutation"""
+        permutation = self.descending if descending else self.ascending
+        if ids is None:
+            return permutation
+        member = np.zeros(len(permutation), dtype=bool)
+        member[ids] = True
+        return permutation[member[permutation]]
+
+
+class ListingIndex:
+    """Posting lists (sorted int32 row ids) per value of each indexed column.
+
+    Ids are positions in the dataset version's frame, so ``frame.take(ids)``
+    materializes only the matching rows, in table order.
+    """
+
+    def __init__(self, df, columns=INDEXED_COLUMNS, range_columns=RANGE_COLUMNS, text_columns=TEXT_COLUMNS):
+        self.rows = 0 if df is None else len(df)
+        self.postings = {}
+        self.ranges = {}
+        self.text = {}
+        self.company_models = {}
+
+        if df is None or df.empty:
+            return
+
+        for column in columns:
+            if column in df.columns:
+                self.postings[column] = self._build_postings(df[column])
+        for column in range_columns:
+            if column in df.columns and pd.api.types.is_numeric_dtype(df[column]):
+                self.ranges[column] = SortedColumn(df[column])
+        for column in text_columns:
+            if column in self.postings:
+                postings = self.postings[column]
+                self.text[column] = TermIndex(list(postings), [len(ids) for ids in postings.values()])
+        if 'company' in self.text and 'model' in self.text:
+            # Each company's models as ranks in the model text index
+            model_ranks = {model: rank for rank, model in enumerate(self.text['model'].terms)}
+            pairs = df.groupby(['company', 'model'], observed=True, sort=False).size().index
+            for company, model in pairs:
+                self.company_models.setdefault(company, []).append(model_ranks[model])
+            self.company_models = {company: np.sort(np.array(ranks, dtype=np.int32))
+                                   for company, ranks in self.company_models.items()}
+
+    @staticmethod
+    def _build_postings(series):
+        # Values in order of first appearance; missing values (code -1) are not indexed
+        codes, uniques = pd.factorize(series)
+        order = np.argsort(codes, kind='stable').astype(np.int32)
+        order = order[np.count_nonzero(codes < 0):]
+        bounds = np.cumsum(np.bincount(codes[codes >= 0], minlength=len(uniques)))[:-1]
+        return dict(zip(uniques, np.split(order, bounds)))
+
+    def lookup(self, column, value):
+        """Sorted ids of the rows where ``column == value`` (KeyError for unknown columns)"""
+        if column not in self.postings:
+            raise KeyError(column)
+        return self.postings[column].get(value, EMPTY_IDS)
+
+    def match(self, filters):
+        """Sorted ids of the rows matching every ``{column: value}`` filter (None without filters)"""
+        id_arrays = sorted((self.lookup(column, value) for column, value in filters.items()), key=len)
+        if not id_arrays:
+            return None
+        ids = id_arrays[0]
+        for other in id_arrays[1:]:
+            if not len(ids):
+                break
+            ids = intersect_sorted(ids, other)
+        return ids
+
+    def range_match(self, column, low=None, high=None, candidates=None):
+        """Sorted ids of the rows (of ``candidates`` if given) with ``low <= column <= high``"""
+        if column not in self.ranges:
+            raise KeyError(column)
+        sorted_column = self.ranges[column]
+        start, stop = sorted_column.bounds(low, high)
+        if candidates is not None and len(candidates) <= stop - start:
+            # Fewer candidates than rows in range: check their values directly
+            return sorted_column.in_range(candidates, low, high)
+        ids = np.sort(sorted_column.ascending[start:stop])
+        return ids if candidates is None else intersect_sorted(candidates, ids)
+
+    def sorted_ids(self, column, ids=None, descending=False):
+        if column not in self.ranges:
+            raise KeyError(column)
+        return self.ranges[column].order(ids, descending)
+
+    def text_match(self, query, columns):
+        """Sorted ids of the rows whose lowercased value in any of ``columns`` contains ``query``.
+
+        Matching values come from the column's n-gram index; ``query`` is a
+        literal substring.
+        """
+        return union_sorted([
+            self.postings[column][value]
+            for column in columns
+            if column in self.text
+            for value in self.text[column].matching_terms(query)
+        ])
+
+    def fuzzy_match(self, query, columns, limit=5, min_score=FUZZY_SEARCH_THRESHOLD):
+        """Sorted ids of the rows holding the values of ``columns`` most similar to ``query``, and those values"""
+        terms = {column: self.text[column].similar(query, limit, min_score) for column in columns if column in self.text}
+        ids = union_sorted([self.postings[column][value] for column, values in terms.items() for value in values])
+        return ids, [value for values in terms.values() for value in values]
+
+    def resolve_car(self, company, model):
+        """Dataset spellings of a typed company and model (wrong case, typos, missing brand words).
+
+        The model is looked up among the resolved company's models: a name
+        spelt like one of them, with or without the brand in front, is taken
+        as is; only otherwise is the most similar one used. Names with no
+        close match come back as given.
+        """
+        if company and 'company' in self.text:
+            company = self.text['company'].closest(str(company)) or company
+        if model and 'model' in self.text:
+            models, ranks = self.text['model'], self.company_models.get(company)
+            model = (models.exact(str(model), ranks) or models.exact(f"{company} {model}", ranks)
+                     or models.closest(str(model), ranks=ranks) or model)
+        return company, model
+
+    def suggest(self, column, query, limit=10):
+        """Up to ``limit`` values of ``column`` containing ``query`` (word-prefix matches first, then by listing count)"""
+        return self.text[column].suggest(query, limit) if column in self.text else []
+
+    def values(self, column):
+        return list(self.postings.get(column, {}))
+
+    def __len__(self):
+        return self.rows
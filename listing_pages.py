@@ -0,0 +1,191 @@
+"""
+Paginated Listing Responses
+Opaque keyset cursors over the ordered row ids of a listing query, and JSON /
+NDJSON bodies generated a chunk of rows at a time, so a large page is never
+held in memory as one list of records or one serialized string
+"""
+
+import base64
+import hashlib
+import json
+
+import numpy as np
+
+# Rows converted to records per step while streaming; pages up to this size
+# are answered in one piece
+STREAM_CHUNK_ROWS = 500
+
+# Request arguments that select a page rather than the result set
+PAGE_ARGUMENTS = ('limit', 'cursor', 'format')
+
+
+class PaginationError(ValueError):
+    """Invalid ``limit``, or a cursor that is malformed or belongs to another query"""
+
+
+def query_scope(namespace, args):
+    """Identity of one query: ``namespace`` (endpoint or user) plus the query arguments (not the page ones).
+
+    The dataset version is not part of it: cursors name the last row served,
+    so any worker resumes them on whatever version it holds.
+    """
+    items = sorted((key, value) for key, value in args if key not in PAGE_ARGUMENTS)
+    digest = hashlib.sha1(repr(items).encode()).hexdigest()[:12]
+    return f"{namespace}:{digest}"
+
+
+def cursor_key(row_ids, offset, values=None):
+    """Key of the last row before ``offset``: (its sort value or None, its row id); None at the start"""
+    if offset <= 0:
+        return None
+    row = int(offset - 1 if row_ids is None else row_ids[offset - 1])
+    value = None if values is None else float(values[row])
+    return (None if value is None or np.isnan(value) else value), row
+
+
+def encode_cursor(scope, key):
+    payload = json.dumps({'s': scope, 'k': None if key is None else list(key)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, scope):
+    """Row key stored in ``cursor`` (None: from the start); PaginationError unless it was issued for ``scope``"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        issued_for = payload['s']
+        key = payload['k']
+        if key is not None:
+            value, row = key
+            key = (None if value is None else float(value), int(row))
+    except Exception:
+        raise PaginationError("Invalid cursor")
+    if key is not None and key[1] < 0:
+        raise PaginationError("Invalid cursor")
+    if issued_for != scope:
+        raise PaginationError("Cursor does not match this query; start again without a cursor")
+    return key
+
+
+def resume_offset(row_ids, rows, key, values=None, descending=False):
+    """Position in ``row_ids`` (all ``rows`` in table order if None) of the first row after ``key``.
+
+    ``row_ids`` is in table order, or ordered by ``values`` as
+    SortedColumn.order leaves it (missing values last, ties in table
+    order). The key need not be one of ``row_ids``, so a cursor issued on
+    another dataset version resumes at the same place in the order.
+    """
+    if key is None:
+        return 0
+    value, row = key
+    if row_ids is None:
+        return min(row + 1, rows)
+    if values is None:
+        return int(np.searchsorted(row_ids, row, side='right'))
+
+    column = values[row_ids].astype(np.float64)
+    missing = np.isnan(column)
+    if value is None:
+        after = missing & (row_ids > row)
+    else:
+        signed, value = (-column, -value) if descending else (column, value)
+        after = missing | (signed > value) | ((signed == value) & (row_ids > row))
+    following = np.flatnonzero(after)
+    return int(following[0]) if len(following) else len(row_ids)
+
+
+def parse_limit(value, default=None):
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise PaginationError("limit must be a whole number")
+    if limit < 0:
+        raise PaginationError("limit must be 0 or more")
+    return limit
+
+
+def paginate(row_ids, rows, offset=0, limit=None):
+    """Ids of one page of ``row_ids`` (all ``rows`` in table order if None) and the offset of the next page.
+
+    The next offset is None on the last page.
+    """
+    total = rows if row_ids is None else len(row_ids)
+    start = min(offset, total)
+    stop = total if limit is None else min(total, start + limit)
+    ids = np.arange(start, stop, dtype=np.int64) if row_ids is None else row_ids[start:stop]
+    return ids, (stop if stop < total else None)
+
+
+def iter_record_chunks(frame, ids, chunk_rows=STREAM_CHUNK_ROWS, to_records=None):
+    """Lists of row dicts for ``frame.take(ids)``, ``chunk_rows`` at a time.
+
+    ``to_records`` turns a slice of the frame into row dicts
+    (``to_dict('records')`` by default).
+    """
+    to_records = to_records or (lambda part: part.to_dict('records'))
+    for start in range(0, len(ids), chunk_rows):
+        yield to_records(frame.take(ids[start:start + chunk_rows]))
+
+
+def stream_json(fields, records_key, chunks, dumps):
+    """Text of the JSON object ``fields`` + ``{records_key: [...]}``, yielded piece by piece.
+
+    Keys come out sorted, matching ``jsonify``; ``dumps`` serializes one value.
+    """
+    yield '{'
+    for position, key in enumerate(sorted(list(fields) + [records_key])):
+        yield (',' if position else '') + dumps(key) + ':'
+        if key != records_key:
+            yield dumps(fields[key])
+            continue
+        separator = '['
+        for records in chunks:
+            if records:
+                yield separator + ','.join(dumps(record) for record in records)
+                separator = ','
+        yield '[]' if separator == '[' else ']'
+    yield '}\n'
+
+
+def stream_ndjson(chunks, dumps):
+    """One JSON document per line, one line per record"""
+    for records in chunks:
+        if records:
+            yield ''.join(dumps(record) + '\n' for record in records)
+
+
+if __name__ == "__main__":
+    import sys
+
+    import pandas as pd
+
+    # Check: pages joined up must equal the whole result, and the streamed
+    # text must parse to what json.dumps gives for the full object
+    paths = sys.argv[1:] or ['Cleaned_Car_data_master.csv', 'generated_5000_strict.csv']
+    frame = pd.concat([pd.read_csv(path) for path in paths], ignore_index=True)
+    row_ids = np.flatnonzero((frame['year'] >= 2015).to_numpy())
+    dumps = lambda value: json.dumps(value, separators=(',', ':'), sort_keys=True)
+    scope = query_scope('check', [('min_year', '2015'), ('limit', '700')])
+
+    records, cursor, pages = [], None, 0
+    while True:
+        offset = resume_offset(row_ids, len(frame), decode_cursor(cursor, scope)) if cursor else 0
+        ids, next_offset = paginate(row_ids, len(frame), offset, 700)
+        text = ''.join(stream_json({'next_cursor': None}, 'cars', iter_record_chunks(frame, ids), dumps))
+        records.extend(json.loads(text)['cars'])
+        pages += 1
+        if next_offset is None:
+            break
+        cursor = encode_cursor(scope, cursor_key(row_ids, next_offset))
+
+    expected = frame.take(row_ids).to_dict('records')
+    assert [dumps(record) for record in records] == [dumps(record) for record in expected]
+    lines = ''.join(stream_ndjson(iter_record_chunks(frame, row_ids), dumps)).splitlines()
+    assert lines == [dumps(record) for record in expected]
+    try:
+        decode_cursor(cursor, query_scope('check', [('min_year', '2016')]))
+        raise AssertionError("cursor accepted for another query")
+    except PaginationError:
+        pass
+    print(f"[OK] {len(records)} rows in {pages} pages match the unpaginated result")
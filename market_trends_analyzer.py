@@ -10,12 +10,31 @@ import json
 import os
 from collections import defaultdict
 import pickle
+import copy
 from scipy import stats
 from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import KMeans
 import warnings
+from dataset_snapshot import read_csv_cached
+from dataset_store import SERIALIZED_KILOMETER_ALIAS, normalize_listings
+from dataset_types import widen_numeric
+from derived_features import ANALYZER_DERIVED_COLUMNS, add_derived_columns, append_rows
 warnings.filterwarnings('ignore')
 
+# Response keys keep the kms_driven spelling clients read
+RESPONSE_COLUMNS = {'kilometers_driven': SERIALIZED_KILOMETER_ALIAS}
+
+
+def response_columns(columns):
+    """Flattened aggregate names ("kilometers_driven_mean") with the response spelling ("kms_driven_mean")"""
+    renamed = []
+    for column in columns:
+        for name, public in RESPONSE_COLUMNS.items():
+            if column == name or column.startswith(f"{name}_"):
+                column = public + column[len(name):]
+        renamed.append(column)
+    return renamed
+
 def clean_for_json(obj):
     """Clean data for JSON serialization by replacing NaN, inf, and -inf values"""
     if isinstance(obj, dict):
@@ -33,31 +52,76 @@ def clean_for_json(obj):
     else:
         return obj
 
+def value_counts(series):
+    """value_counts with ties in the order a string column gives them (first appearance in ``series``).
+
+    A categorical column counts in category order and reports unused
+    categories; here it is counted like the strings it stands for.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.value_counts()
+    codes = series.cat.codes.to_numpy()
+    present, first, counts = np.unique(codes[codes >= 0], return_index=True, return_counts=True)
+    order = np.argsort(first)
+    return pd.Series(counts[order], index=series.cat.categories[present[order]]).sort_values(ascending=False)
+
+
+def value_counts_dict(series, limit=None):
+    counts = value_counts(series)
+    return (counts.head(limit) if limit else counts).to_dict()
+
+
+def mode_value(series, default='N/A'):
+    """Most frequent value; ties go to the smallest value as spelt, as ``mode`` does on strings"""
+    counts = value_counts(series)
+    if counts.empty:
+        return default
+    return min(counts.index[counts.to_numpy() == counts.iloc[0]])
+
 class MarketTrendsAnalyzer:
-    def __init__(self, data_file='Cleaned_Car_data_master.csv', additional_data_file='generated_5000_strict.csv', enhanced_data_file='enhanced_indian_car_dataset.csv'):
-        """Initialize the market trends analyzer with car data"""
+    def __init__(self, data_file='Cleaned_Car_data_master.csv', additional_data_file='generated_5000_strict.csv', enhanced_data_file='enhanced_indian_car_dataset.csv', data=None):
+        """Initialize the market trends analyzer with car data
+
+        ``data`` is the app's shared listings table (see DatasetStore.view);
+        without it the CSV files are read and normalized here.
+        """
+        if data is not None:
+            # Shallow copy: derived columns are added here, listing columns stay
+            # shared (downcast numeric ones are widened so statistics match)
+            self.data = widen_numeric(data)
+            print(f"[OK] Shared dataset used for analysis - {len(self.data)} records")
+        else:
+            self.data = normalize_listings(self._load_files(data_file, additional_data_file, enhanced_data_file))
+            
+        self.current_year = datetime.now().year
+        self.prepare_data()
+
+    def _load_files(self, data_file, additional_data_file, enhanced_data_file):
+        """Read the analysis dataset from the local CSV files"""
         try:
             # Try to load enhanced dataset first
             if os.path.exists(enhanced_data_file):
-                self.data = pd.read_csv(enhanced_data_file)
-                print(f"[OK] Enhanced dataset loaded for analysis - {len(self.data)} records")
-            else:
-                # Fallback to original datasets
-                data1 = pd.read_csv(data_file)
-                print(f"[OK] Main dataset loaded for analysis - {len(data1)} records")
+                data = read_csv_cached(enhanced_data_file)
+                print(f"[OK] Enhanced dataset loaded for analysis - {len(data)} records")
+                return data
+
+            # Fallback to original datasets
+            data1 = read_csv_cached(data_file)
+            print(f"[OK] Main dataset loaded for analysis - {len(data1)} records")
             
             # Try to load additional dataset
             try:
-                data2 = pd.read_csv(additional_data_file)
+                data2 = read_csv_cached(additional_data_file)
                 print(f"[OK] Additional dataset loaded for analysis - {len(data2)} records")
                 
                 # Combine both datasets
-                self.data = pd.concat([data1, data2], ignore_index=True)
-                print(f"[OK] Combined dataset for analysis - {len(self.data)} total records")
+                data = pd.concat([data1, data2], ignore_index=True)
+                print(f"[OK] Combined dataset for analysis - {len(data)} total records")
+                return data
             except FileNotFoundError:
                 print(f"[WARNING] Additional dataset not found: {additional_data_file}")
                 print("Using main dataset only")
-                self.data = data1
+                return data1
                 
         except FileNotFoundError:
             print(f"[ERROR] Main dataset not found: {data_file}")
@@ -65,43 +129,23 @@ class MarketTrendsAnalyzer:
         except Exception as e:
             print(f"[ERROR] Error loading datasets: {str(e)}")
             raise
-            
-        self.current_year = datetime.now().year
-        self.prepare_data()
         
     def prepare_data(self):
         """Prepare and clean data for analysis"""
-        # Calculate car age
-        self.data['car_age'] = self.current_year - self.data['year']
-        
-        # Create price per km metric
-        self.data['price_per_km'] = self.data['Price'] / (self.data['kms_driven'] + 1)
-        
-        # Create depreciation rate
-        self.data['depreciation_rate'] = (self.data['predicted_price'] - self.data['Price']) / self.data['predicted_price'] * 100
-        
-        # Categorize price ranges
-        self.data['price_category'] = pd.cut(self.data['Price'], 
-                                           bins=[0, 200000, 500000, 1000000, float('inf')],
-                                           labels=['Budget', 'Mid-Range', 'Premium', 'Luxury'])
-        
-        # Create market segments
-        self.data['market_segment'] = self.data.apply(self._categorize_segment, axis=1)
-        
-    def _categorize_segment(self, row):
-        """Categorize cars into market segments"""
-        if row['fuel_type'] == 'Electric':
-            return 'Electric'
-        elif row['engine_size'] > 2000:
-            return 'Performance'
-        elif row['Price'] > 1000000:
-            return 'Luxury'
-        elif row['fuel_type'] == 'Diesel' and row['Price'] > 500000:
-            return 'Premium Diesel'
-        elif row['car_age'] <= 3:
-            return 'New/Recent'
-        else:
-            return 'Standard'
+        # Car age, price per km, depreciation rate, price category and
+        # market segment (see derived_features)
+        self.data = add_derived_columns(self.data, ANALYZER_DERIVED_COLUMNS, reference_year=self.current_year)
+        
+    def append_data(self, rows):
+        """Add new listings, deriving the analysis columns for those rows only"""
+        rows = normalize_listings(rows)
+        self.data = append_rows(self.data, rows, ANALYZER_DERIVED_COLUMNS, reference_year=self.current_year)
+
+    def with_appended(self, rows):
+        """Copy of this analyzer with ``rows`` appended (this one is left as it is)"""
+        analyzer = copy.copy(self)
+        analyzer.append_data(rows)
+        return analyzer
     
     def get_market_overview(self):
         """Get comprehensive market overview statistics"""
@@ -111,29 +155,29 @@ class MarketTrendsAnalyzer:
             'median_price': float(self.data['Price'].median()),
             'price_std': float(self.data['Price'].std()),
             'average_age': float(self.data['car_age'].mean()),
-            'average_mileage': float(self.data['kms_driven'].mean()),
+            'average_mileage': float(self.data['kilometers_driven'].mean()),
             'total_companies': self.data['company'].nunique(),
             'total_models': self.data['model'].nunique(),
-            'market_segments': self.data['market_segment'].value_counts().to_dict(),
-            'fuel_type_distribution': self.data['fuel_type'].value_counts().to_dict(),
-            'transmission_distribution': self.data['transmission'].value_counts().to_dict(),
-            'city_distribution': self.data['city'].value_counts().head(10).to_dict(),
-            'price_range_distribution': self.data['price_category'].value_counts().to_dict()
+            'market_segments': value_counts_dict(self.data['market_segment']),
+            'fuel_type_distribution': value_counts_dict(self.data['fuel_type']),
+            'transmission_distribution': value_counts_dict(self.data['transmission']),
+            'city_distribution': value_counts_dict(self.data['city'], 10),
+            'price_range_distribution': value_counts_dict(self.data['price_category'])
         }
         return clean_for_json(overview)
     
     def get_company_trends(self):
         """Analyze trends by company"""
-        company_stats = self.data.groupby('company').agg({
+        company_stats = self.data.groupby('company', observed=True).agg({
             'Price': ['mean', 'median', 'std', 'count'],
             'car_age': 'mean',
-            'kms_driven': 'mean',
+            'kilometers_driven': 'mean',
             'depreciation_rate': 'mean',
             'price_per_km': 'mean'
         }).round(2)
         
         # Flatten column names
-        company_stats.columns = ['_'.join(col).strip() for col in company_stats.columns]
+        company_stats.columns = response_columns(['_'.join(col).strip() for col in company_stats.columns])
         
         # Calculate market share
         total_listings = len(self.data)
@@ -156,7 +200,7 @@ class MarketTrendsAnalyzer:
             company_trends[company] = {
                 'stats': company_stats.loc[company].to_dict(),
                 'price_trend': price_trend,
-                'popular_models': company_data['model'].value_counts().head(5).to_dict(),
+                'popular_models': value_counts_dict(company_data['model'], 5),
                 'avg_depreciation': float(company_data['depreciation_rate'].mean()),
                 'reliability_score': self._calculate_reliability_score(company_data)
             }
@@ -193,11 +237,11 @@ class MarketTrendsAnalyzer:
         """Analyze price trends by manufacturing year"""
         year_trends = self.data.groupby('year').agg({
             'Price': ['mean', 'median', 'count'],
-            'kms_driven': 'mean',
+            'kilometers_driven': 'mean',
             'depreciation_rate': 'mean'
         }).round(2)
         
-        year_trends.columns = ['_'.join(col).strip() for col in year_trends.columns]
+        year_trends.columns = response_columns(['_'.join(col).strip() for col in year_trends.columns])
         
         # Calculate year-over-year changes
         year_trends['price_change'] = year_trends['Price_mean'].pct_change() * 100
@@ -220,11 +264,11 @@ class MarketTrendsAnalyzer:
                     'max': float(fuel_data['Price'].max())
                 },
                 'average_age': float(fuel_data['car_age'].mean()),
-                'average_mileage': float(fuel_data['kms_driven'].mean()),
+                'average_mileage': float(fuel_data['kilometers_driven'].mean()),
                 'depreciation_rate': float(fuel_data['depreciation_rate'].mean()),
-                'popular_companies': fuel_data['company'].value_counts().head(5).to_dict(),
-                'city_preference': fuel_data['city'].value_counts().head(5).to_dict(),
-                'maintenance_level': fuel_data['maintenance_level'].value_counts().to_dict()
+                'popular_companies': value_counts_dict(fuel_data['company'], 5),
+                'city_preference': value_counts_dict(fuel_data['city'], 5),
+                'maintenance_level': value_counts_dict(fuel_data['maintenance_level'])
             }
         
         return clean_for_json(fuel_analysis)
@@ -233,7 +277,7 @@ class MarketTrendsAnalyzer:
         """Analyze market trends by city"""
         city_analysis = {}
         
-        for city in self.data['city'].value_counts().head(10).index:
+        for city in value_counts(self.data['city']).head(10).index:
             city_data = self.data[self.data['city'] == city]
             
             city_analysis[city] = {
@@ -242,8 +286,8 @@ class MarketTrendsAnalyzer:
                 'average_price': float(city_data['Price'].mean()),
                 'median_price': float(city_data['Price'].median()),
                 'price_std': float(city_data['Price'].std()),
-                'popular_companies': city_data['company'].value_counts().head(5).to_dict(),
-                'popular_fuel_types': city_data['fuel_type'].value_counts().to_dict(),
+                'popular_companies': value_counts_dict(city_data['company'], 5),
+                'popular_fuel_types': value_counts_dict(city_data['fuel_type']),
                 'average_car_age': float(city_data['car_age'].mean()),
                 'luxury_market_share': float(len(city_data[city_data['Price'] > 1000000]) / len(city_data) * 100),
                 'budget_market_share': float(len(city_data[city_data['Price'] < 200000]) / len(city_data) * 100)
@@ -280,7 +324,7 @@ class MarketTrendsAnalyzer:
                 })
         
         # Identify emerging segments
-        segment_growth = self.data['market_segment'].value_counts()
+        segment_growth = value_counts(self.data['market_segment'])
         for segment in segment_growth.index[:3]:
             if segment in ['Electric', 'Performance']:
                 predictions['emerging_segments'].append({
@@ -313,8 +357,9 @@ class MarketTrendsAnalyzer:
         analytics = {}
         
         # Prepare numerical data for analysis
-        numerical_cols = ['Price', 'year', 'kms_driven', 'engine_size', 'power', 'car_age']
+        numerical_cols = ['Price', 'year', 'kilometers_driven', 'engine_size', 'power', 'car_age']
         numerical_data = self.data[numerical_cols].fillna(self.data[numerical_cols].mean())
+        numerical_data.columns = response_columns(numerical_data.columns)
         
         # Correlation analysis
         correlation_matrix = numerical_data.corr()
@@ -341,8 +386,8 @@ class MarketTrendsAnalyzer:
                 'size': len(cluster_data),
                 'avg_price': float(cluster_data['Price'].mean()),
                 'avg_age': float(cluster_data['car_age'].mean()),
-                'dominant_fuel': cluster_data['fuel_type'].mode().iloc[0] if len(cluster_data) > 0 else 'N/A',
-                'dominant_company': cluster_data['company'].mode().iloc[0] if len(cluster_data) > 0 else 'N/A',
+                'dominant_fuel': mode_value(cluster_data['fuel_type']),
+                'dominant_company': mode_value(cluster_data['company']),
                 'characteristics': self._describe_cluster(cluster_data)
             }
         
@@ -381,7 +426,7 @@ class MarketTrendsAnalyzer:
         elasticity['age_sensitivity'] = float(abs(age_price_corr))
         
         # Mileage vs Price elasticity
-        mileage_price_corr = self.data['kms_driven'].corr(self.data['Price'])
+        mileage_price_corr = self.data['kilometers_driven'].corr(self.data['Price'])
         elasticity['mileage_sensitivity'] = float(abs(mileage_price_corr))
         
         # Engine size vs Price elasticity
@@ -411,9 +456,9 @@ def get_market_trends_data():
     analyzer = MarketTrendsAnalyzer()
     return clean_for_json(analyzer.generate_market_report())
 
-def get_company_comparison(companies):
+def get_company_comparison(companies, analyzer=None):
     """Compare specific companies"""
-    analyzer = MarketTrendsAnalyzer()
+    analyzer = analyzer or MarketTrendsAnalyzer()
     company_trends = analyzer.get_company_trends()
     
     comparison = {}
@@ -423,10 +468,10 @@ def get_company_comparison(companies):
     
     return clean_for_json(comparison)
 
-def get_price_prediction_trends(fuel_type=None, company=None, year_range=None):
+def get_price_prediction_trends(fuel_type=None, company=None, year_range=None, analyzer=None):
     """Get price prediction trends with filters"""
-    analyzer = MarketTrendsAnalyzer()
-    data = analyzer.data.copy()
+    analyzer = analyzer or MarketTrendsAnalyzer()
+    data = analyzer.data
     
     # Apply filters
     if fuel_type:
@@ -0,0 +1,174 @@
+"""
+Versioned Model Registry
+Loads price-model artifacts in the background, warms them up and swaps the
+active version atomically under live traffic
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+# Artifacts tried in order when no explicit path is given
+MODEL_CANDIDATES = [
+    'Comprehensive_Model.pkl',
+    'Debug_Enhanced_Model.pkl',
+    'Fixed_Enhanced_Model.pkl',
+    'Enhanced_Real_Price_Model.pkl',
+    'BestCombinedModel.pkl'
+]
+
+
+def artifact_version(path):
+    """Identify a model artifact by name and modification time"""
+    try:
+        return f"{os.path.basename(path)}@{int(os.path.getmtime(path))}"
+    except (OSError, TypeError):
+        return None
+
+
+def resolve_model_path(candidates=MODEL_CANDIDATES):
+    """First existing candidate, preferring its compact export when up to date"""
+    # Imported here: forest_engine pulls in sklearn, which the app loads off the import path
+    from forest_engine import compact_model_path
+
+    for path in candidates:
+        # Memory-mappable joblib export first, then the older pickled export
+        for compact in (compact_model_path(path), f"{os.path.splitext(path)[0]}.compact.pkl"):
+            if os.path.exists(compact) and (
+                    not os.path.exists(path) or os.path.getmtime(compact) >= os.path.getmtime(path)):
+                return compact
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"None of the model artifacts exist: {', '.join(candidates)}")
+
+
+class ModelVersion:
+    """A loaded model artifact plus everything derived from it.
+
+    Requests take one reference to the active version and read every model
+    attribute from it, so a swap can never mix two models in one response.
+    """
+
+    def __init__(self, path, model_data):
+        if not isinstance(model_data, dict) or model_data.get('model') is None:
+            raise ValueError(f"Model format not recognized in {path}")
+
+        self.path = path
+        self.version = artifact_version(path)
+        self.data = model_data
+        self.model = model_data['model']
+        self.name = model_data.get('model_name', 'Enhanced Model')
+        self.categorical_features = list(model_data.get('categorical_features', []))
+        self.numerical_features = list(model_data.get('numerical_features', []))
+        self.performance = model_data.get('performance', {})
+        self.feature_names = self.categorical_features + self.numerical_features
+        self.fast_path = None
+        self.loaded_at = time.time()
+
+    @classmethod
+    def load(cls, path):
+        from forest_engine import load_model_artifact
+
+        return cls(path, load_model_artifact(path))
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'path': self.path,
+            'model_name': self.name,
+            'features': len(self.feature_names),
+            'fast_path': self.fast_path is not None,
+            'loaded_at': self.loaded_at
+        }
+
+
+class ModelRegistry:
+    """Holds loaded model versions and the one serving traffic.
+
+    ``prepare(version)`` runs after loading (e.g. compiling a fast path),
+    ``warmup(version)`` must raise if the model is not fit to serve, and
+    ``on_activate(version)`` publishes a newly activated version.
+    """
+
+    def __init__(self, prepare=None, warmup=None, on_activate=None, keep_versions=3):
+        self.prepare = prepare
+        self.warmup = warmup
+        self.on_activate = on_activate
+        self.keep_versions = max(1, int(keep_versions))
+
+        self.active = None
+        self.versions = OrderedDict()
+        self.status = {'state': 'idle', 'path': None, 'error': None, 'finished_at': None}
+
+        self._lock = threading.Lock()
+        self._reload_thread = None
+
+    def load(self, path=None):
+        """Load, prepare and warm up an artifact without activating it"""
+        path = path or resolve_model_path()
+        version = ModelVersion.load(path)
+        if self.prepare is not None:
+            self.prepare(version)
+        if self.warmup is not None:
+            self.warmup(version)
+        return version
+
+    def activate(self, version):
+        """Make ``version`` the one serving requests"""
+        with self._lock:
+            self.versions[version.version] = version
+            self.versions.move_to_end(version.version)
+            while len(self.versions) > self.keep_versions:
+                self.versions.popitem(last=False)
+            self.active = version
+            if self.on_activate is not None:
+                self.on_activate(version)
+
+    def load_and_activate(self, path=None):
+        version = self.load(path)
+        self.activate(version)
+        return version
+
+    def reload(self, path=None, background=True):
+        """Load a new version (in a background thread by default) and swap it in.
+
+        Returns False if a reload is already running.
+        """
+        with self._lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return False
+            self.status = {'state': 'loading', 'path': path, 'error': None, 'finished_at': None}
+            self._reload_thread = threading.Thread(target=self._reload, args=(path,), name='model-reload', daemon=True)
+
+        if background:
+            self._reload_thread.start()
+        else:
+            self._reload_thread.run()
+        return True
+
+    def _reload(self, path):
+        try:
+            version = self.load_and_activate(path)
+            self.status = {'state': 'ready', 'path': version.path, 'error': None, 'finished_at': time.time()}
+            print(f"[OK] Model {version.version} activated")
+        except Exception as e:
+            # The previous version keeps serving
+            self.status = {'state': 'failed', 'path': path, 'error': str(e), 'finished_at': time.time()}
+            print(f"[ERROR] Model reload failed: {str(e)}")
+
+    def rollback(self, version_id):
+        """Re-activate a previously loaded version"""
+        version = self.versions.get(version_id)
+        if version is None:
+            raise KeyError(version_id)
+        self.activate(version)
+        return version
+
+    def stats(self):
+        return {
+            'active': self.active.describe() if self.active is not None else None,
+            'versions': [version.describe() for version in self.versions.values()],
+            'reload': dict(self.status)
+        }
@@ -0,0 +1,117 @@
+"""
+Streaming MongoDB Loader for the Listings Table
+Reads a collection in large cursor batches with a projection and packs each
+column into typed chunks before building one DataFrame
+"""
+
+import time
+
+import pandas as pd
+
+# Listing fields used by the app (the schema of the uploaded CSV datasets)
+LISTING_COLUMNS = [
+    'car_id', 'company', 'model', 'year', 'kilometers_driven', 'kms_driven', 'fuel_type',
+    'transmission', 'owner', 'owner_count', 'car_condition', 'insurance_status',
+    'previous_accidents', 'num_doors', 'engine_size', 'power', 'Price', 'city',
+    'emission_norm', 'insurance_eligible', 'maintenance_level', 'predicted_price',
+    'listing_type', 'is_certified', 'price_with_gst', 'is_synthetic'
+]
+
+
+def _typed_chunk(values):
+    """Pack one column's batch into a typed array (pandas' own C-level inference)"""
+    return pd.Series(values, dtype=None if values else object)
+
+
+def _concat_chunks(chunks):
+    """Join a column's chunks with the dtype whole-table inference would give.
+
+    A chunk where the field is missing everywhere infers as object on its
+    own; it is re-typed to match the other chunks so it becomes NaN there.
+    """
+    if len(chunks) == 1:
+        return chunks[0]
+
+    typed = [chunk for chunk in chunks if not chunk.isna().all()]
+    if typed and len(typed) < len(chunks):
+        dtype = typed[0].dtype
+        if dtype.kind in 'iu':
+            dtype = 'float64'
+        elif dtype.kind == 'b':
+            dtype = object
+        chunks = [
+            chunk.astype(dtype) if not chunk.isna().all() or dtype == object
+            else pd.Series([None] * len(chunk), dtype=dtype)
+            for chunk in chunks
+        ]
+    return pd.concat(chunks, ignore_index=True)
+
+
+class ColumnBuffers:
+    """Per-column typed chunks filled from a stream of documents"""
+
+    def __init__(self, columns, chunk_rows=50000):
+        self.columns = list(columns)
+        self.chunk_rows = max(1, int(chunk_rows))
+        self.rows = 0
+        self._seen = set()
+        self._pending = {column: [] for column in self.columns}
+        self._chunks = {column: [] for column in self.columns}
+
+    def append(self, document):
+        for column in self.columns:
+            self._pending[column].append(document.get(column))
+        self._seen.update(document.keys())
+        self.rows += 1
+        if len(self._pending[self.columns[0]]) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.columns or not self._pending[self.columns[0]]:
+            return
+        for column in self.columns:
+            self._chunks[column].append(_typed_chunk(self._pending[column]))
+            self._pending[column] = []
+
+    def to_frame(self):
+        """Concatenate each column once and hand the arrays to pandas"""
+        self.flush()
+        data = {}
+        for column in self.columns:
+            # Like pd.DataFrame(records): a field no document has is not a column
+            if column not in self._seen:
+                continue
+            chunks = self._chunks.pop(column)
+            data[column] = _concat_chunks(chunks) if chunks else pd.Series([], dtype=object)
+        return pd.DataFrame(data, copy=False)
+
+
+def load_collection_frame(collection, query=None, columns=LISTING_COLUMNS, batch_size=10000,
+                          progress_every=100000, label=None):
+    """Stream ``collection.find(query)`` into a DataFrame of ``columns``.
+
+    Only the projected fields are transferred, documents are dropped as soon
+    as their values are buffered, and progress with rows/second is printed
+    every ``progress_every`` rows.
+    """
+    label = label or collection.name
+    projection = {column: 1 for column in columns}
+    projection['_id'] = 0
+
+    buffers = ColumnBuffers(columns, chunk_rows=batch_size * 5)
+    start = time.perf_counter()
+    cursor = collection.find(query or {}, projection, batch_size=batch_size)
+    try:
+        for document in cursor:
+            buffers.append(document)
+            if progress_every and buffers.rows % progress_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"[INFO] {label}: {buffers.rows:,} rows streamed ({buffers.rows / elapsed:,.0f} rows/s)")
+    finally:
+        cursor.close()
+
+    df = buffers.to_frame()
+    elapsed = time.perf_counter() - start
+    rate = buffers.rows / elapsed if elapsed > 0 else 0.0
+    print(f"[OK] {label}: {buffers.rows:,} rows loaded in {elapsed:.2f} s ({rate:,.0f} rows/s)")
+    return df
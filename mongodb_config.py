@@ -25,10 +25,26 @@ COLLECTIONS = {
 # Global client variables
 sync_client = None
 async_client = None
+# Process that created the clients: MongoClient is not fork-safe, so a
+# forked worker (e.g. gunicorn --preload) connects again on first use
+client_pid = None
+
+def reset_after_fork():
+    """Drop the parent's clients in a forked child (they are never closed there)"""
+    global sync_client, async_client, client_pid
+    sync_client = None
+    async_client = None
+    client_pid = None
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_after_fork)
 
 def get_sync_client():
     """Get synchronous MongoDB client"""
-    global sync_client
+    global sync_client, client_pid
+    if client_pid != os.getpid():
+        reset_after_fork()
+        client_pid = os.getpid()
     if sync_client is None:
         try:
             sync_client = MongoClient(MONGODB_URL)
@@ -42,7 +58,10 @@ def get_sync_client():
 
 def get_async_client():
     """Get asynchronous MongoDB client"""
-    global async_client
+    global async_client, client_pid
+    if client_pid != os.getpid():
+        reset_after_fork()
+        client_pid = os.getpid()
     if async_client is None:
         try:
             async_client = AsyncIOMotorClient(MONGODB_URL)
@@ -0,0 +1,105 @@
+"""
+Micro-Batching Request Coalescer for Price Predictions
+Queues feature rows from concurrent requests and scores them with one batched predict call
+"""
+
+import os
+import queue
+import threading
+import time
+
+
+class _PendingPrediction:
+    """A queued row waiting for its prediction"""
+
+    __slots__ = ('row', 'event', 'result', 'error')
+
+    def __init__(self, row):
+        self.row = row
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class PredictionBatcher:
+    """Coalesce single-row predictions into batched model calls.
+
+    ``predict_fn`` receives a list of feature rows and returns one prediction
+    per row, in order. A batch is flushed when ``max_batch_size`` rows are
+    queued or ``max_wait_ms`` has passed since the first row arrived.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=2.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+        self.stats = {'requests': 0, 'batches': 0, 'largest_batch': 0, 'fallbacks': 0}
+
+    def _ensure_worker(self):
+        # Threads do not survive fork, so a forked worker starts its own
+        if self._worker is not None and self._worker.is_alive() and self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive() and self._worker_pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._worker_pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, name='prediction-batcher', daemon=True)
+            self._worker.start()
+
+    def submit(self, row, timeout=5.0):
+        """Queue a row and block until its prediction is ready"""
+        self._ensure_worker()
+        pending = _PendingPrediction(row)
+        self._queue.put(pending)
+
+        if not pending.event.wait(timeout):
+            raise TimeoutError(f"Prediction not ready after {timeout} seconds")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect(self):
+        """Block for the first row, then gather more until the batch is full or the window closes"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self.stats['requests'] += len(batch)
+            self.stats['batches'] += 1
+            self.stats['largest_batch'] = max(self.stats['largest_batch'], len(batch))
+
+            try:
+                predictions = self.predict_fn([pending.row for pending in batch])
+                for pending, prediction in zip(batch, predictions):
+                    pending.result = prediction
+            except Exception:
+                # One bad row must not fail its neighbours: retry them one by one
+                self.stats['fallbacks'] += 1
+                for pending in batch:
+                    try:
+                        pending.result = self.predict_fn([pending.row])[0]
+                    except Exception as e:
+                        pending.error = e
+            finally:
+                for pending in batch:
+                    pending.event.set()
@@ -0,0 +1,106 @@
+"""
+LRU + TTL Cache for Price Predictions
+Keyed on the normalized car specification and invalidated when the model or dataset changes
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(namespace, car_data):
+    """Canonical, hashable key for a car specification (None if unhashable)"""
+    try:
+        key = (namespace, tuple(sorted(car_data.items())))
+        hash(key)
+        return key
+    except TypeError:
+        return None
+
+
+class PredictionCache:
+    """Bounded LRU cache whose entries also expire after ``ttl_seconds``.
+
+    Entries belong to a version (model artifact + dataset); ``sync_version``
+    drops everything as soon as that version changes.
+    """
+
+    def __init__(self, max_size=4096, ttl_seconds=600):
+        self.max_size = max(0, int(max_size))
+        self.ttl_seconds = float(ttl_seconds)
+        self.version = None
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def sync_version(self, version):
+        """Clear the cache if the model/dataset version has changed"""
+        if version == self.version:
+            return
+        with self._lock:
+            if version != self.version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.version = version
+
+    def get(self, key):
+        """Return a copy of the cached value, or None on a miss"""
+        if key is None or not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+        # Callers enrich results in place, so never hand out the stored object
+        return copy.deepcopy(value)
+
+    def set(self, key, value, version=None):
+        """Store a value; skipped if it was computed for a version no longer current"""
+        if key is None or not self.enabled:
+            return
+        expires = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._entries[key] = (expires, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'version': list(self.version) if isinstance(self.version, tuple) else self.version
+        }
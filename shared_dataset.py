@@ -0,0 +1,185 @@
+"""
+Shared-Memory Listings Table
+Places the numeric and dictionary-encoded columns of the listings table in one
+multiprocessing.shared_memory segment; every process reads zero-copy NumPy
+views described by a small JSON-serializable manifest
+"""
+
+import os
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+# Column offsets inside the segment are aligned for vectorized reads
+ALIGNMENT = 64
+
+
+def shared_dataset_enabled():
+    return os.getenv('SHARED_DATASET', 'false').lower() in ['1', 'true', 'yes']
+
+
+def column_kind(series):
+    """'numeric', 'categorical' or 'local' (kept in process memory, e.g. object columns)"""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = dtype.categories
+        if not len(categories) or all(isinstance(value, str) for value in categories):
+            return 'categorical'
+        return 'local'
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biufM':
+        return 'numeric'
+    return 'local'
+
+
+def _column_array(series, kind):
+    return series.array.codes if kind == 'categorical' else series.to_numpy()
+
+
+def _views(buffer, manifest, local_columns):
+    """Rebuild the table from a segment buffer without copying the shared columns"""
+    columns = {}
+    for entry in manifest['columns']:
+        name = entry['name']
+        if entry['kind'] == 'local':
+            if name in local_columns:
+                columns[name] = local_columns[name]
+            continue
+
+        values = np.ndarray((manifest['rows'],), dtype=entry['dtype'], buffer=buffer, offset=entry['offset'])
+        # Shared pages are read-only for every process, including the owner
+        values.flags.writeable = False
+        if entry['kind'] == 'categorical':
+            dtype = pd.CategoricalDtype(pd.Index(entry['categories'], dtype=entry['categories_dtype']),
+                                        ordered=entry['ordered'])
+            try:
+                values = pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+            except TypeError:
+                # pandas < 2.1 has no validate flag (and copies the codes)
+                values = pd.Categorical.from_codes(values, dtype=dtype)
+        columns[name] = values
+    return pd.DataFrame(columns, copy=False)
+
+
+def _unlink(segment, owner_pid):
+    # Forked workers inherit the finalizer; only the creating process unlinks
+    if os.getpid() != owner_pid:
+        return
+    try:
+        segment.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _attach_segment(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 every attach registers the segment with the
+        # resource tracker, which unlinks it when the attaching process exits
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class SharedFrame:
+    """A listings table whose numeric and categorical columns live in shared memory.
+
+    ``frame`` reads straight from the segment. Processes forked after
+    creation share it as-is; unrelated processes call ``attach(manifest)``.
+    The segment is unlinked when the creating process drops this object or
+    exits (mappings that other processes still hold stay valid).
+    """
+
+    def __init__(self, segment, manifest, frame, owner=False):
+        self.segment = segment
+        self.manifest = manifest
+        self.frame = frame
+        if owner:
+            weakref.finalize(self, _unlink, segment, os.getpid())
+
+    @classmethod
+    def create(cls, df, version=None):
+        """Copy ``df`` into a new segment and return it backed by that segment"""
+        layout = []
+        size = 0
+        for name in df.columns:
+            series = df[name]
+            kind = column_kind(series)
+            entry = {'name': str(name), 'kind': kind}
+            if kind != 'local':
+                values = _column_array(series, kind)
+                entry['dtype'] = values.dtype.str
+                entry['offset'] = size
+                size += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+                if kind == 'categorical':
+                    entry['categories'] = series.cat.categories.tolist()
+                    entry['categories_dtype'] = str(series.cat.categories.dtype)
+                    entry['ordered'] = bool(series.cat.ordered)
+            layout.append(entry)
+
+        segment = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for entry in layout:
+            if entry['kind'] != 'local':
+                values = _column_array(df[entry['name']], entry['kind'])
+                target = np.ndarray(values.shape, dtype=values.dtype, buffer=segment.buf, offset=entry['offset'])
+                target[:] = values
+
+        manifest = {
+            'segment': segment.name,
+            'version': version,
+            'rows': len(df),
+            'bytes': size,
+            'columns': layout
+        }
+        local_columns = {entry['name']: df[entry['name']] for entry in layout if entry['kind'] == 'local'}
+        frame = _views(segment.buf, manifest, local_columns)
+        frame.index = df.index
+        return cls(segment, manifest, frame, owner=True)
+
+    @classmethod
+    def attach(cls, manifest, local_columns=None):
+        """Map an existing segment; 'local' columns come from ``local_columns`` if given"""
+        segment = _attach_segment(manifest['segment'])
+        return cls(segment, manifest, _views(segment.buf, manifest, local_columns or {}))
+
+    def describe(self):
+        shared = [entry for entry in self.manifest['columns'] if entry['kind'] != 'local']
+        return {
+            'segment': self.manifest['segment'],
+            'size_mb': round(self.manifest['bytes'] / 1e6, 2),
+            'shared_columns': len(shared),
+            'local_columns': [entry['name'] for entry in self.manifest['columns'] if entry['kind'] == 'local']
+        }
+
+
+def _check_attached(manifest, expected):
+    """Runs in a separate (spawned) process: the attached columns must match"""
+    attached = SharedFrame.attach(manifest)
+    shared = [entry['name'] for entry in manifest['columns'] if entry['kind'] != 'local']
+    pd.testing.assert_frame_equal(attached.frame, expected[shared])
+    print(f"[OK] pid {os.getpid()} attached {len(shared)} shared columns from {manifest['segment']}")
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    import sys
+
+    from dataset_types import compact_dtypes
+
+    # Round-trip check: the shared table must equal the compact table, here
+    # and in a process that only has the manifest
+    paths = sys.argv[1:] or ['Cleaned_Car_data_master.csv', 'generated_5000_strict.csv']
+    compact = compact_dtypes(pd.concat([pd.read_csv(path) for path in paths], ignore_index=True))
+    shared = SharedFrame.create(compact, version='check')
+    pd.testing.assert_frame_equal(shared.frame, compact)
+    print(f"[OK] {len(compact)} rows identical; {shared.describe()}")
+
+    process = multiprocessing.get_context('spawn').Process(target=_check_attached, args=(shared.manifest, compact))
+    process.start()
+    process.join()
+    sys.exit(process.exitcode)
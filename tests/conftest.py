@@ -0,0 +1,69 @@
+import os
+import pickle
+import sys
+from collections import OrderedDict
+
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+# The app's modules live at the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CATEGORICAL_FEATURES = ['company', 'model', 'fuel_type', 'transmission', 'city']
+NUMERICAL_FEATURES = ['year', 'kilometers_driven', 'age', 'engine_size', 'power']
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    """unified_app with every warm-up step finished (the dataset is read from the CSV files in the repository)"""
+    os.chdir(ROOT)
+    import unified_app
+
+    unified_app.warmup.wait(list(unified_app.warmup.steps), timeout=600)
+    return unified_app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture(scope='session')
+def model_artifacts(app_module, tmp_path_factory):
+    """Two small forests in the train_comprehensive_model.py artifact layout, trained on the repository listings"""
+    listings = app_module.dataset_store.frame.sample(2000, random_state=0)
+    frame = pd.DataFrame([app_module.build_enhanced_features(row) for row in listings.to_dict('records')])
+    X = frame[CATEGORICAL_FEATURES + NUMERICAL_FEATURES].astype({column: object for column in CATEGORICAL_FEATURES})
+
+    paths = []
+    for name, seed in [('model_a.pkl', 0), ('model_b.pkl', 1)]:
+        pipeline = Pipeline([
+            ('preprocessor', ColumnTransformer([('onehotencoder', OneHotEncoder(handle_unknown='ignore', sparse_output=False),
+                                                 CATEGORICAL_FEATURES)], remainder='passthrough')),
+            ('model', RandomForestRegressor(n_estimators=20, max_depth=10, random_state=seed))
+        ]).fit(X, listings['Price'].to_numpy(dtype=float))
+        path = str(tmp_path_factory.mktemp('models') / name)
+        with open(path, 'wb') as f:
+            pickle.dump({'model': pipeline, 'model_name': f"Test RandomForest {seed}",
+                         'categorical_features': CATEGORICAL_FEATURES, 'numerical_features': NUMERICAL_FEATURES,
+                         'performance': {'r2_score': 0.9, 'rmse': 100000, 'mae': 60000}}, f)
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture
+def enhanced_model(app_module, model_artifacts):
+    """First test model loaded, warmed up and serving; the registry is restored afterwards"""
+    registry = app_module.model_registry
+    previous, versions = registry.active, OrderedDict(registry.versions)
+    version = registry.load_and_activate(model_artifacts[0])
+    yield version
+
+    registry.versions = versions
+    registry.active = previous
+    app_module.publish_enhanced_model(previous)
@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app_warmup import Warmup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def failing_step():
+    raise ValueError("non-finite warm-up predictions")
+
+
+def test_failed_step_finishes_but_is_not_ready():
+    warmup = Warmup()
+    warmup.add('dataset', lambda: None)
+    warmup.add('enhanced_model', failing_step)
+    assert not warmup.ready()
+
+    warmup.start(background=False)
+    assert warmup.wait(['dataset', 'enhanced_model'], timeout=1)
+    assert warmup.report()['enhanced_model']['state'] == 'failed'
+    assert not warmup.ready()
+
+
+def test_ready_once_every_step_succeeds():
+    warmup = Warmup()
+    warmup.add('dataset', lambda: None)
+    warmup.start(background=False)
+    assert warmup.ready()
+
+
+def test_import_leaves_the_heavy_subsystems_to_the_warm_up():
+    # A fresh interpreter whose warm-up thread never runs: whatever is loaded was loaded by the import
+    code = ("import sys, threading; threading.Thread.start = lambda thread: None; import unified_app; "
+            "print('IMPORTED', 'market_trends_analyzer' in sys.modules, unified_app.dataset_store.active is None, "
+            "unified_app.model_registry.active is None, unified_app.warmup.ready())")
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, timeout=300,
+                            env=dict(os.environ, APP_WARMUP='background')).stdout
+    imported = next(line.split() for line in output.splitlines() if line.startswith('IMPORTED'))
+    assert imported[1:] == ['False', 'True', 'True', 'False']
+
+
+@pytest.mark.parametrize('path, needed', [
+    ('/api/health', []),
+    ('/static/app.js', []),
+    ('/api/cars', ['dataset']),
+    ('/market-trends/overview', ['dataset']),
+    ('/api/predict/batch', ['dataset', 'enhanced_model', 'legacy_model']),
+    ('/predict', ['dataset', 'enhanced_model', 'legacy_model']),
+])
+def test_requests_wait_only_for_the_subsystems_they_use(app_module, path, needed):
+    assert app_module.startup_requirements(path) == needed
+
+
+def test_requests_get_503_until_their_subsystems_are_warm(app_module, client, monkeypatch):
+    warmup = Warmup()
+    for name in app_module.warmup.steps:
+        warmup.add(name, lambda: None)
+    monkeypatch.setattr(app_module, 'warmup', warmup)
+    monkeypatch.setattr(app_module, 'STARTUP_WAIT_TIMEOUT', 0.05)
+
+    health = client.get('/api/health')
+    assert health.status_code == 200 and health.get_json()['ready'] is False
+    assert client.get('/api/health?ready=1').status_code == 503
+    response = client.get('/api/companies')
+    assert response.status_code == 503
+    assert response.get_json()['subsystems']['dataset']['state'] == 'pending'
+
+    warmup.start(background=False)
+    assert client.get('/api/companies').status_code == 200
+    assert client.get('/api/health?ready=1').status_code == 200
@@ -0,0 +1,87 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from comparables_index import ComparablesIndex
+from dataset_types import compact_dtypes
+
+
+def make_listings(rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'company': rng.choice(['Maruti', 'Hyundai', 'Tata'], rows),
+        'model': rng.choice(['Swift', 'Creta', 'Nexon'], rows),
+        'year': rng.integers(2010, 2024, rows),
+        'Price': rng.integers(100000, 2000000, rows).astype(float),
+        'kilometers_driven': rng.integers(1000, 200000, rows),
+        'fuel_type': rng.choice(['Petrol', 'Diesel', 'CNG'], rows),
+        'transmission': rng.choice(['Manual', 'Automatic'], rows),
+        'car_condition': rng.choice(['Excellent', 'Good', 'Fair'], rows),
+        'city': rng.choice([f"City {i}" for i in range(12)], rows)
+    })
+    # A brand with a single listing has no price spread
+    df.loc[0, ['company', 'model', 'year']] = ['Kia', 'Seltos', 2022]
+    return df
+
+
+def scan(car, company, model, year):
+    """car_info as the dataset scan computed it before the index"""
+    exact = car[(car['company'] == company) & (car['model'] == model) & (car['year'] == year)]
+    company_year = car[(car['company'] == company) & (car['year'] == year)]
+    same_company = car[car['company'] == company]
+    similar = next((frame for frame in (exact, company_year, same_company) if not frame.empty), None)
+    if similar is None:
+        return None
+
+    price_std = similar['Price'].std()
+    return {
+        'similar_cars_found': len(similar),
+        'price_statistics': {
+            'average': float(round(similar['Price'].mean(), 2)),
+            'minimum': float(round(similar['Price'].min(), 2)),
+            'maximum': float(round(similar['Price'].max(), 2)),
+            'standard_deviation': float(round(price_std, 2)) if not pd.isna(price_std) else 0.0
+        },
+        'fuel_type_distribution': similar['fuel_type'].value_counts().to_dict(),
+        'transmission_distribution': similar['transmission'].value_counts().to_dict(),
+        'condition_distribution': similar['car_condition'].value_counts().to_dict(),
+        'top_cities': similar['city'].value_counts().head(10).to_dict(),
+        'year_range': {'min': int(similar['year'].min()), 'max': int(similar['year'].max())},
+        'average_kilometers': float(round(similar['kilometers_driven'].mean(), 0)),
+        'data_availability': {
+            'exact_match': not exact.empty,
+            'company_year_match': not company_year.empty,
+            'company_match': not same_company.empty
+        }
+    }
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_lookup_matches_the_dataset_scan(compact):
+    listings = make_listings()
+    index = ComparablesIndex(compact_dtypes(listings) if compact else listings)
+
+    for company, model, year in itertools.product(['Maruti', 'Tata', 'Kia', 'Unknown'], ['Swift', 'Seltos', 'Alto'],
+                                                  [2012, 2022, 2030]):
+        expected = scan(listings, company, model, year)
+        info = index.lookup(company, model, year)
+        if expected is None:
+            assert info is None
+            continue
+        assert info['price_statistics'] == pytest.approx(expected.pop('price_statistics'))
+        info.pop('price_statistics')
+        # top_cities keeps ten of twelve cities; which tied ones is not specified
+        top_cities = info.pop('top_cities')
+        assert len(top_cities) == len(expected['top_cities'])
+        assert sorted(top_cities.values(), reverse=True) == list(expected.pop('top_cities').values())
+        assert info == expected
+
+
+def test_lookup_returns_copies_and_ignores_unhashable_values():
+    index = ComparablesIndex(make_listings())
+    info = index.lookup('Maruti', 'Swift', 2015)
+    info['fuel_type_distribution']['Electric'] = 1
+    assert 'Electric' not in index.lookup('Maruti', 'Swift', 2015)['fuel_type_distribution']
+    assert index.lookup(['Maruti'], 'Swift', 2015) is None
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from dataset_snapshot import cached_table, collection_fingerprint
+
+
+class ListingCollection:
+    """In-memory stand-in for a collection on a server that refuses dbHash"""
+
+    name = 'car_dataset'
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.database = self
+
+    def command(self, *args, **kwargs):
+        raise PermissionError('dbHash not allowed')
+
+    def count_documents(self, query, limit=0):
+        if query:
+            (field, condition), = query.items()
+            count = sum((field in document) == condition['$exists'] for document in self.documents)
+        else:
+            count = len(self.documents)
+        return min(count, limit) if limit else count
+
+    def find_one(self, query, projection, sort):
+        (field, direction), = sort
+        stamped = [document for document in self.documents if field in document]
+        if not stamped:
+            return None
+        document = sorted(stamped, key=lambda document: document[field], reverse=direction < 0)[0]
+        return {key: document[key] for key in projection}
+
+
+def listings(start=datetime(2026, 1, 1)):
+    return [{'_id': f"Maruti_Swift_{year}_Petrol", 'year': year, 'updated_at': start + timedelta(minutes=i)}
+            for i, year in enumerate(range(2015, 2020))]
+
+
+def test_fingerprint_changes_on_in_place_update_and_delete_plus_insert():
+    documents = listings()
+    collection = ListingCollection(documents)
+    original = collection_fingerprint(collection)
+
+    documents[0].update(year=2014, updated_at=datetime(2026, 2, 1))
+    updated = collection_fingerprint(collection)
+    assert updated != original
+
+    # Same count and newest _id as before: only the stamp gives it away
+    documents.pop(1)
+    documents.append({'_id': 'Hyundai_Creta_2018_Diesel', 'year': 2018, 'updated_at': datetime(2026, 3, 1)})
+    assert collection_fingerprint(collection) not in (original, updated)
+
+
+def test_unstamped_collection_is_never_served_from_a_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATASET_SNAPSHOT_DIR', str(tmp_path))
+    documents = listings()
+    documents[2].pop('updated_at')
+    collection = ListingCollection(documents)
+    assert collection_fingerprint(collection) is None
+
+    reads = []
+    for _ in range(2):
+        cached_table('car_dataset', collection_fingerprint(collection),
+                     lambda: reads.append(1) or pd.DataFrame({'year': [2015, 2016]}))
+    assert len(reads) == 2
+    assert not list(tmp_path.iterdir())
+
+
+def test_stamped_collection_reuses_its_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATASET_SNAPSHOT_DIR', str(tmp_path))
+    collection = ListingCollection(listings())
+    reads = []
+    for _ in range(2):
+        df = cached_table('car_dataset', collection_fingerprint(collection),
+                          lambda: reads.append(1) or pd.DataFrame({'year': [2015, 2016]}))
+    assert len(reads) == 1
+    assert df['year'].tolist() == [2015, 2016]
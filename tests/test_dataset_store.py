@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from dataset_snapshot import cached_table
+from dataset_store import DatasetStore, listing_records, normalize_listings
+
+
+def test_served_rows_keep_the_kms_driven_spelling():
+    combined = pd.DataFrame({'car_id': [1, 2], 'kilometers_driven': [41000.0, np.nan], 'kms_driven': [np.nan, 52000.0]})
+    frame = normalize_listings(combined)
+    assert list(frame.columns) == ['car_id', 'kilometers_driven']
+
+    records = listing_records(frame)
+    assert [record['kms_driven'] for record in records] == [41000.0, 52000.0]
+    assert [record['kilometers_driven'] for record in records] == [41000.0, 52000.0]
+
+
+def test_reload_reads_the_source_instead_of_the_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATASET_SNAPSHOT_DIR', str(tmp_path))
+    source = {'table': pd.DataFrame({'company': ['Maruti', 'Tata'], 'year': [2015, 2019]})}
+    reads = []
+
+    def loader():
+        # A fingerprint that cannot see the edit below, like a stale collection fingerprint
+        return cached_table('listings', 'same', lambda: reads.append(1) or source['table'].copy())
+
+    store = DatasetStore(loader)
+    first = store.load_and_activate()
+    source['table'] = pd.DataFrame({'company': ['Maruti', 'Kia'], 'year': [2015, 2021]})
+    store.reload(background=False)
+
+    assert len(reads) == 2
+    assert store.active is not first
+    assert store.frame['company'].astype(str).tolist() == ['Maruti', 'Kia']
+    # The rewritten snapshot now serves the next boot
+    assert cached_table('listings', 'same', lambda: None)['company'].tolist() == ['Maruti', 'Kia']
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from dataset_store import DatasetStore
+from dataset_types import compact_dtypes
+from derived_features import (ANALYZER_DERIVED_COLUMNS, MODEL_DERIVED_COLUMNS, add_derived_columns, append_rows,
+                              derive_columns)
+from market_trends_analyzer import MarketTrendsAnalyzer
+
+
+def make_listings(rows=400, seed=0, fuel_types=('Petrol', 'Diesel', 'CNG')):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'company': rng.choice(['Maruti', 'Hyundai', 'Tata'], rows),
+        'model': rng.choice(['Swift', 'Creta', 'Nexon', 'Alto'], rows),
+        'year': rng.integers(2005, 2024, rows),
+        'Price': rng.integers(100000, 2000000, rows).astype(float),
+        'kilometers_driven': rng.integers(1000, 200000, rows),
+        'fuel_type': rng.choice(list(fuel_types), rows),
+        'transmission': rng.choice(['Manual', 'Automatic'], rows),
+        'owner_count': rng.choice(['1st', '2nd'], rows),
+        'engine_size': rng.integers(800, 3000, rows).astype(float),
+        'power': rng.integers(50, 300, rows).astype(float),
+        'city': rng.choice(['Delhi', 'Mumbai', 'Pune'], rows),
+        'predicted_price': rng.integers(100000, 2000000, rows).astype(float)
+    })
+
+
+def test_table_flags_match_exactly_like_training():
+    df = pd.DataFrame({'fuel_type': ['Electric', 'electric', None], 'transmission': ['Automatic', 'AUTOMATIC', 'Manual'],
+                       'owner_count': ['1st', '1ST', '2nd']})
+    flags = derive_columns(df, ['is_electric', 'is_automatic', 'is_first_owner'])
+    assert flags['is_electric'].tolist() == [1, 0, 0]
+    assert flags['is_automatic'].tolist() == [1, 0, 0]
+    assert flags['is_first_owner'].tolist() == [1, 0, 0]
+
+
+def test_append_rows_matches_full_recompute_and_keeps_categories():
+    top = compact_dtypes(make_listings(seed=1))
+    # New rows bring a fuel type and a city the compact table has no category for
+    bottom = make_listings(rows=150, seed=2, fuel_types=('Petrol', 'Electric'))
+    bottom.loc[:9, 'city'] = 'Kochi'
+
+    names = ANALYZER_DERIVED_COLUMNS + MODEL_DERIVED_COLUMNS
+    appended = append_rows(add_derived_columns(top, names, reference_year=2024), bottom, names, reference_year=2024)
+    full = add_derived_columns(pd.concat([top.astype(object), bottom.astype(object)], ignore_index=True)
+                               .astype({column: bottom[column].dtype for column in bottom.columns}),
+                               names, reference_year=2024)
+
+    for column in ['fuel_type', 'city', 'company', 'price_category']:
+        assert isinstance(appended[column].dtype, pd.CategoricalDtype), column
+    assert list(appended['fuel_type'].cat.categories[:len(top['fuel_type'].cat.categories)]) == \
+        list(top['fuel_type'].cat.categories)
+    pd.testing.assert_frame_equal(appended.astype(object), full[appended.columns].astype(object))
+
+
+def test_reload_with_appended_rows_extends_the_analyzer():
+    listings = make_listings(seed=3)
+    tables = [listings.iloc[:300].reset_index(drop=True), listings]
+    analyzers = {}
+
+    def prepare(version):
+        previous = version.appended_to.derived('market_analyzer') if version.appended_to is not None else None
+        analyzers[version.version] = (previous is not None)
+        version.derive('market_analyzer', lambda v: previous.with_appended(v.frame.iloc[len(version.appended_to.frame):])
+                       if previous is not None else MarketTrendsAnalyzer(data=v.view()))
+
+    store = DatasetStore(lambda: tables.pop(0), prepare=prepare)
+    first = store.load_and_activate()
+    store.reload(background=False)
+    second = store.active
+
+    assert analyzers == {first.version: False, second.version: True}
+    assert second.appended_to is None
+    extended = second.derived('market_analyzer').data
+    rebuilt = MarketTrendsAnalyzer(data=second.view()).data
+    pd.testing.assert_frame_equal(extended.astype(object), rebuilt[extended.columns].reset_index(drop=True).astype(object))
+    assert first.derived('market_analyzer').data.shape[0] == 300
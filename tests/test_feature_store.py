@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset_types import compact_dtypes
+from feature_store import FeatureStore
+
+
+def make_listings(rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'company': rng.choice(['Maruti', 'Hyundai', 'Tata'], rows),
+        'model': rng.choice(['Swift', 'Creta', 'Nexon'], rows),
+        'year': rng.integers(2010, 2024, rows),
+        'Price': rng.integers(100000, 2000000, rows).astype(float),
+        'engine_size': rng.integers(800, 3000, rows).astype(float),
+        'power': rng.integers(50, 300, rows).astype(float),
+        'num_doors': rng.choice([3.0, 4.0, 5.0], rows)
+    })
+    # Tata Nexon never lists its power, Tata never its doors
+    df.loc[(df['company'] == 'Tata') & (df['model'] == 'Nexon'), 'power'] = np.nan
+    df.loc[df['company'] == 'Tata', 'num_doors'] = np.nan
+    return df
+
+
+def typical(df, column, *masks):
+    """Median of the most specific listing subset that has the column"""
+    for mask in masks:
+        values = df.loc[mask, column].dropna()
+        if not values.empty:
+            return int(round(values.median()))
+    return None
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_lookups_match_scanning_the_listings(compact):
+    listings = make_listings()
+    store = FeatureStore(compact_dtypes(listings) if compact else listings)
+
+    for company in ['Maruti', 'Tata', 'Kia']:
+        for model in ['Swift', 'Nexon', 'Alto']:
+            for year in [2012, 2030]:
+                same_company = listings['company'] == company
+                same_model = same_company & (listings['model'] == model)
+                same_year = same_model & (listings['year'] == year)
+
+                prices = listings.loc[same_year if same_year.any() else same_company, 'Price']
+                expected_price = prices.mean() if not prices.empty else None
+                assert store.price_mean(company, model, year) == pytest.approx(expected_price)
+
+                for column in ['engine_size', 'power', 'num_doors']:
+                    expected = typical(listings, column, same_year, same_model, same_company)
+                    assert store.typical_spec(company, model, year, column, -1) == (-1 if expected is None else expected)
+
+
+def test_missing_columns_and_unhashable_values_fall_back_to_defaults():
+    store = FeatureStore(make_listings().drop(columns=['power']))
+    assert store.typical_spec('Maruti', 'Swift', 2015, 'power', 90) == 90
+    assert store.typical_spec(['Maruti'], 'Swift', 2015, 'engine_size', 1200) == 1200
+    assert len(FeatureStore(pd.DataFrame())) == 0
@@ -0,0 +1,90 @@
+import pickle
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer
+
+from forest_engine import CompactForestRegressor, CompactPipeline, export_compact_model, is_memory_mapped, load_model_artifact
+
+
+def make_data(rows=600, features=6, missing=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(rows, features))
+    y = 3 * X[:, 0] - 2 * X[:, 1] ** 2 + np.sin(X[:, 2]) + rng.normal(scale=0.1, size=rows)
+    if missing:
+        X[rng.random(X.shape) < missing] = np.nan
+    return X, y
+
+
+def round_trip(compact, tmp_path):
+    path = str(tmp_path / 'forest.compact.joblib')
+    joblib.dump(compact, path, protocol=pickle.HIGHEST_PROTOCOL)
+    return joblib.load(path, mmap_mode='r')
+
+
+@pytest.mark.parametrize('forest_class', [RandomForestRegressor, ExtraTreesRegressor])
+@pytest.mark.parametrize('missing', [0.0, 0.15])
+def test_compact_forest_matches_sklearn_predict(forest_class, missing, tmp_path):
+    X, y = make_data(missing=missing)
+    forest = forest_class(n_estimators=25, max_depth=12, random_state=0).fit(X, y)
+    compact = CompactForestRegressor.from_forest(forest)
+    if missing:
+        # Splits send missing values both ways, so the NaN path is exercised
+        assert compact.missing_left_ is not None and compact.missing_left_.any()
+
+    loaded = round_trip(compact, tmp_path)
+    assert is_memory_mapped(loaded.value_) and is_memory_mapped(loaded.children_)
+
+    X_test, _ = make_data(rows=300, missing=missing, seed=1)
+    np.testing.assert_allclose(loaded.predict(X_test), forest.predict(X_test), rtol=1e-12, atol=0)
+
+    per_tree = np.stack([tree.predict(X_test.astype(np.float32)) for tree in forest.estimators_], axis=1)
+    mean, percentiles = loaded.predict_quantiles(X_test)
+    np.testing.assert_allclose(mean, forest.predict(X_test), rtol=1e-12, atol=0)
+    np.testing.assert_allclose(percentiles, np.percentile(per_tree, (10, 50, 90), axis=1).T, rtol=1e-12, atol=0)
+
+
+def test_chunked_traversal_matches_single_pass(tmp_path):
+    X, y = make_data(missing=0.1)
+    forest = RandomForestRegressor(n_estimators=10, random_state=0).fit(X, y)
+    compact = round_trip(CompactForestRegressor.from_forest(forest), tmp_path)
+    compact.chunk_size = 64
+    np.testing.assert_allclose(compact.predict(X), forest.predict(X), rtol=1e-12, atol=0)
+
+
+def test_export_replaces_the_pipeline_forest(tmp_path):
+    X, y = make_data()
+    pipeline = Pipeline([('identity', FunctionTransformer()),
+                         ('model', RandomForestRegressor(n_estimators=10, random_state=0))]).fit(X, y)
+    source = str(tmp_path / 'model.pkl')
+    with open(source, 'wb') as f:
+        pickle.dump({'model': pipeline}, f)
+
+    output, forest, compact = export_compact_model(source)
+    served = load_model_artifact(output)
+    assert isinstance(served['model'], CompactPipeline)
+    assert isinstance(served['model'].steps[-1][1], CompactForestRegressor)
+    # Built from the fitted forest only; the served pipeline still predicts
+    assert not hasattr(served['model'].steps[-1][1], 'fit')
+    assert served['compact_forest']['n_estimators'] == 10
+    np.testing.assert_allclose(served['model'].predict(X), pipeline.predict(X), rtol=1e-12, atol=0)
+
+
+def test_rejects_unsupported_estimators():
+    with pytest.raises(ValueError):
+        CompactForestRegressor.from_forest(Pipeline([('identity', FunctionTransformer())]))
+
+
+def test_plain_pipeline_artifacts_still_load(tmp_path):
+    X, y = make_data()
+    forest = RandomForestRegressor(n_estimators=10, random_state=0).fit(X, y)
+    path = str(tmp_path / 'old.compact.joblib')
+    joblib.dump({'model': Pipeline([('identity', FunctionTransformer()),
+                                    ('model', CompactForestRegressor.from_forest(forest))])}, path)
+
+    served = load_model_artifact(path)['model']
+    assert isinstance(served, CompactPipeline)
+    np.testing.assert_allclose(served.predict(X), forest.predict(X), rtol=1e-12, atol=0)
@@ -0,0 +1,25 @@
+import pandas as pd
+import pytest
+
+from listing_index import ListingIndex
+
+
+@pytest.fixture(scope='module')
+def index():
+    cars = [('Hyundai', 'Hyundai Creta SX'), ('Hyundai', 'Hyundai Creta SX'), ('Hyundai', 'Hyundai Creta'),
+            ('Skoda', 'Octavia'), ('Skoda', 'Skoda Octavia Classic'), ('Skoda', 'Skoda Octavia Classic'),
+            ('Mahindra', 'Mahindra Thar CRDe'), ('Mahindra', 'Mahindra Scorpio')]
+    return ListingIndex(pd.DataFrame(cars, columns=['company', 'model']))
+
+
+@pytest.mark.parametrize('typed, expected', [
+    (('Hyundai', 'Hyundai Creta'), ('Hyundai', 'Hyundai Creta')),
+    (('hyundai', 'creta'), ('Hyundai', 'Hyundai Creta')),
+    (('Skoda', 'Octavia'), ('Skoda', 'Octavia')),
+    (('Skoda', 'octavia classic'), ('Skoda', 'Skoda Octavia Classic')),
+    (('Hundai', 'Creta SX'), ('Hyundai', 'Hyundai Creta SX')),
+    (('Mahindra', 'Thar'), ('Mahindra', 'Mahindra Thar CRDe')),
+    (('Mahindra', 'Xylo'), ('Mahindra', 'Xylo')),
+])
+def test_exact_names_win_over_similar_ones(index, typed, expected):
+    assert index.resolve_car(*typed) == expected
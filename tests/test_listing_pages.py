@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from listing_index import SortedColumn
+from listing_pages import (PaginationError, cursor_key, decode_cursor, encode_cursor, paginate, query_scope,
+                           resume_offset)
+
+
+def walk(row_ids, rows, scope, limit, values=None, descending=False, cursor=None, pages=None):
+    """Row ids served page by page, and the cursor after the last page walked"""
+    served, walked = [], 0
+    while True:
+        offset = resume_offset(row_ids, rows, decode_cursor(cursor, scope), values, descending) if cursor else 0
+        ids, next_offset = paginate(row_ids, rows, offset, limit)
+        served.extend(ids.tolist())
+        walked += 1
+        cursor = encode_cursor(scope, cursor_key(row_ids, next_offset, values)) if next_offset is not None else None
+        if cursor is None or walked == pages:
+            return served, cursor
+
+
+def prices(rows, seed):
+    values = np.random.default_rng(seed).integers(1, 50, rows).astype(np.float64)
+    values[::17] = np.nan
+    return values
+
+
+@pytest.mark.parametrize('descending', [False, True])
+def test_sorted_pages_join_up_to_the_full_order(descending):
+    values = prices(1000, seed=0)
+    order = SortedColumn(pd.Series(values)).order(None, descending)
+    scope = query_scope('search', [('sort', 'price')])
+    served, _ = walk(order, len(values), scope, 37, values, descending)
+    assert served == order.tolist()
+
+
+@pytest.mark.parametrize('descending', [False, True])
+def test_cursor_resumes_on_a_version_with_appended_rows(descending):
+    old = prices(600, seed=1)
+    new = np.concatenate([old, prices(200, seed=2)])
+    scope = query_scope('search', [('sort', 'price')])
+    old_order = SortedColumn(pd.Series(old)).order(None, descending)
+    new_order = SortedColumn(pd.Series(new)).order(None, descending).tolist()
+
+    first, cursor = walk(old_order, len(old), scope, 50, old, descending, pages=4)
+    rest, _ = walk(np.array(new_order), len(new), scope, 50, new, descending, cursor=cursor)
+
+    # Old rows come exactly once, and the rest follows the new version's order
+    assert [row for row in first + rest if row < len(old)] == old_order.tolist()
+    assert rest == new_order[new_order.index(rest[0]):]
+
+
+def test_table_order_cursor_continues_into_appended_rows():
+    scope = query_scope('cars', [('company', 'Maruti')])
+    first, cursor = walk(np.arange(0, 300, 3), 300, scope, 40, pages=1)
+    rest, _ = walk(np.arange(0, 450, 3), 450, scope, 40, cursor=cursor)
+    assert first + rest == list(range(0, 450, 3))
+
+
+def test_cursor_is_bound_to_its_query():
+    cursor = encode_cursor(query_scope('search', [('q', 'swift')]), (None, 10))
+    assert decode_cursor(cursor, query_scope('search', [('q', 'swift'), ('limit', '5')])) == (None, 10)
+    with pytest.raises(PaginationError):
+        decode_cursor(cursor, query_scope('search', [('q', 'creta')]))
+    with pytest.raises(PaginationError):
+        decode_cursor('not-a-cursor', query_scope('search', []))
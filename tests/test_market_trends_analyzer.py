@@ -0,0 +1,38 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from dataset_store import normalize_listings
+from dataset_types import compact_dtypes
+from market_trends_analyzer import MarketTrendsAnalyzer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def listings():
+    paths = [os.path.join(ROOT, name) for name in ['Cleaned_Car_data_master.csv', 'generated_5000_strict.csv']]
+    return normalize_listings(pd.concat([pd.read_csv(path) for path in paths], ignore_index=True))
+
+
+def test_responses_keep_the_kms_driven_keys(listings):
+    analyzer = MarketTrendsAnalyzer(data=listings)
+    company = json.dumps(analyzer.get_company_trends())
+    year = next(iter(analyzer.get_price_trends_by_year().values()))
+    analytics = analyzer.get_advanced_analytics()
+
+    assert 'kms_driven_mean' in company and 'kilometers_driven' not in company
+    assert 'kms_driven_mean' in year and 'kilometers_driven_mean' not in year
+    assert 'kms_driven' in analytics['correlations']['price_correlations']
+
+
+def test_compact_table_gives_the_same_responses(listings):
+    wide = MarketTrendsAnalyzer(data=listings)
+    compact = MarketTrendsAnalyzer(data=compact_dtypes(listings))
+    for method in ['get_market_overview', 'get_city_market_analysis', 'get_fuel_type_analysis',
+                   'get_company_trends', 'get_advanced_analytics']:
+        expected, actual = getattr(wide, method)(), getattr(compact, method)()
+        # Ties in popular_* lists keep their order too
+        assert json.dumps(actual) == json.dumps(expected), method
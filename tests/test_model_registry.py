@@ -0,0 +1,100 @@
+import os
+import pickle
+import shutil
+
+import numpy as np
+import pytest
+from sklearn.dummy import DummyRegressor
+
+from forest_engine import export_compact_model, is_memory_mapped
+from model_registry import ModelRegistry, resolve_model_path
+
+
+def save_model(path, price):
+    model = DummyRegressor(strategy='constant', constant=price).fit(np.zeros((1, 1)), [price])
+    with open(path, 'wb') as f:
+        pickle.dump({'model': model, 'model_name': f"Constant {price}"}, f)
+    return str(path)
+
+
+def warm_up(version):
+    if version.model.constant_[0][0] < 0:
+        raise ValueError(f"Model {version.version} produced negative warm-up predictions")
+
+
+def test_reload_swaps_in_the_new_version_and_rollback_restores_the_old(tmp_path):
+    published = []
+    registry = ModelRegistry(warmup=warm_up, on_activate=published.append)
+    first = registry.load_and_activate(save_model(tmp_path / 'first.pkl', 100.0))
+
+    assert registry.reload(save_model(tmp_path / 'second.pkl', 200.0), background=False)
+    second = registry.active
+    assert second is not first and second.name == 'Constant 200.0'
+    assert registry.status['state'] == 'ready'
+    assert [version['version'] for version in registry.stats()['versions']] == [first.version, second.version]
+
+    assert registry.rollback(first.version) is first
+    assert registry.active is first
+    assert published == [first, second, first]
+    with pytest.raises(KeyError):
+        registry.rollback('missing.pkl@0')
+
+
+def test_failed_reload_keeps_the_serving_version(tmp_path):
+    registry = ModelRegistry(warmup=warm_up)
+    first = registry.load_and_activate(save_model(tmp_path / 'first.pkl', 100.0))
+
+    registry.reload(save_model(tmp_path / 'broken.pkl', -1.0), background=False)
+    assert registry.active is first
+    assert registry.status['state'] == 'failed'
+    assert 'negative warm-up predictions' in registry.status['error']
+    assert list(registry.versions) == [first.version]
+
+
+def test_only_the_latest_versions_stay_loaded(tmp_path):
+    registry = ModelRegistry(keep_versions=2)
+    versions = [registry.load_and_activate(save_model(tmp_path / f"model_{i}.pkl", float(i))) for i in range(3)]
+    assert list(registry.versions) == [versions[1].version, versions[2].version]
+    with pytest.raises(KeyError):
+        registry.rollback(versions[0].version)
+
+
+def test_reload_endpoint_rolls_back_to_a_loaded_version(app_module, client, enhanced_model, model_artifacts,
+                                                        monkeypatch):
+    car = {'company': 'Maruti', 'model': 'Swift', 'year': 2018}
+    other = app_module.model_registry.load_and_activate(model_artifacts[1])
+    assert client.post('/api/predict', json=car).get_json()['model_version'] == other.version
+
+    assert client.post('/api/model/reload', json={'version': enhanced_model.version}).status_code == 403
+    monkeypatch.setenv('ADMIN_API_TOKEN', 'secret')
+    headers = {'X-Admin-Token': 'secret'}
+    response = client.post('/api/model/reload', json={'version': enhanced_model.version}, headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['active']['version'] == enhanced_model.version
+    assert client.post('/api/predict', json=car).get_json()['model_version'] == enhanced_model.version
+    assert client.post('/api/model/reload', json={'version': 'missing.pkl@0'}, headers=headers).status_code == 404
+    assert client.post('/api/model/reload', json={'path': '../model.pkl'}, headers=headers).status_code == 400
+
+
+def test_registry_serves_the_compact_export_from_a_memory_map(app_module, model_artifacts, tmp_path):
+    source = shutil.copy(model_artifacts[0], tmp_path / 'Comprehensive_Model.pkl')
+    candidates = [str(tmp_path / 'Missing_Model.pkl'), source]
+    assert resolve_model_path(candidates) == source
+
+    output, forest, _ = export_compact_model(source)
+    assert resolve_model_path(candidates) == output
+    # A retrained pickle newer than its export wins until it is exported again
+    os.utime(source, (os.path.getmtime(output) + 10,) * 2)
+    assert resolve_model_path(candidates) == source
+    os.utime(source, (os.path.getmtime(output) - 10,) * 2)
+
+    registry = ModelRegistry(prepare=app_module.prepare_enhanced_model, warmup=app_module.warm_up_enhanced_model)
+    version = registry.load(resolve_model_path(candidates))
+    compact = version.model.steps[-1][1]
+    assert is_memory_mapped(compact.value_) and is_memory_mapped(compact.children_)
+    assert version.fast_path is not None and version.fast_path.forest is compact
+
+    rows = [app_module.build_enhanced_features(car) for car in app_module.warmup_samples()]
+    expected = forest.predict(version.model.steps[0][1].transform(app_module.build_enhanced_frame(rows, version)))
+    np.testing.assert_allclose([prediction for prediction, _ in app_module.predict_enhanced_rows(rows, version)],
+                               expected, rtol=1e-12, atol=0)
@@ -0,0 +1,131 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('company, model, expected', [
+    ('Hyundai', 'Creta', ('Hyundai', 'Creta')),
+    ('Hyundai', 'Hyundai Creta', ('Hyundai', 'Creta')),
+    ('Maruti', 'Maruti Suzuki Swift Dzire VDI', ('Maruti Suzuki', 'Dzire')),
+    ('Mahindra', 'Mahindra Thar CRDe', ('Mahindra', 'Thar')),
+    ('Mercedes', 'Mercedes Benz GLA Class', ('Mercedes-Benz', 'GLA')),
+    ('Hindustan', 'Hindustan Motors Ambassador', ('default', 'default')),
+])
+def test_legacy_price_table_finds_short_names_in_dataset_names(app_module, company, model, expected):
+    table = {
+        'Hyundai': {'Creta': (10, 16), 'default': (6, 10)},
+        'Maruti Suzuki': {'Swift': (5, 8), 'Dzire': (6, 9), 'default': (5, 9)},
+        'Mahindra': {'Thar': (12, 18), 'default': (10, 15)},
+        'Mercedes-Benz': {'GLA': (30, 40), 'default': (40, 60)},
+        'default': {'default': (8, 15)}
+    }
+    brand = app_module.legacy_price_key(table, company, brand=True)
+    assert (brand, app_module.legacy_price_key(table[brand], model)) == expected
+
+
+class SpreadFastPath:
+    """Stand-in compiled path whose trees disagree more about older cars"""
+
+    def predict_intervals(self, rows, quantiles):
+        predictions = np.full(len(rows), 500000.0)
+        spread = np.array([(2025 - float(row['year'])) / 40 for row in rows])
+        return predictions, np.column_stack([predictions * (1 - spread), predictions, predictions * (1 + spread)])
+
+
+def test_confidence_score_stays_numeric_and_calibration_follows_dataset_reloads(app_module, monkeypatch):
+    active = SimpleNamespace(version='spread@1', name='Spread', performance={'r2_score': 0.9}, feature_names=['year'],
+                             fast_path=SpreadFastPath())
+    monkeypatch.setattr(app_module.model_registry, 'active', active)
+    first = app_module.dataset_store.active
+
+    with app_module.app.test_request_context():
+        result = app_module.build_enhanced_result({}, 500000.0, include_car_info=False,
+                                                  interval=(450000.0, 500000.0, 550000.0), active=active)
+    assert result['confidence_score'] == 90
+    assert 0 <= result['calibrated_confidence'] <= 100
+    assert first.derived('confidence_calibration:spread@1')['dataset_version'] == first.version
+
+    # A reload's prepare hook calibrates the serving model on the new version before it is swapped in
+    reloaded = app_module.dataset_store.load(df=first.frame.iloc[:-50].reset_index(drop=True))
+    assert reloaded.version != first.version
+    calibration = reloaded.derived('confidence_calibration:spread@1')
+    assert calibration['dataset_version'] == reloaded.version
+    assert calibration['coverage'] != first.derived('confidence_calibration:spread@1')['coverage']
+
+
+def test_sweep_reports_the_model_and_dataset_versions(app_module, client, enhanced_model):
+    response = client.post('/api/predict/sweep', json={'company': 'Maruti', 'model': 'Swift', 'year': 2018,
+                                                       'years_ahead': [0, 5], 'kilometers': [20000, 80000]})
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['model_version'] == enhanced_model.version
+    assert result['dataset_version'] == app_module.dataset_store.version
+    assert [len(row) for row in result['prediction_intervals']['p10']] == [2, 2]
+
+
+def test_batch_values_good_rows_and_reports_bad_ones_by_index(client, enhanced_model):
+    swift = {'company': 'Maruti', 'model': 'Swift', 'year': 2018, 'kms_driven': 40000}
+    creta = {'company': 'Hyundai', 'model': 'Creta', 'year': 2020, 'fuel_type': 'Diesel'}
+    response = client.post('/api/predict/batch', json={'cars': [swift, 'Swift', {'company': 'Tata'}, creta,
+                                                                {'company': 'Tata', 'model': 'Nexon', 'year': 'new'}]})
+    assert response.status_code == 200
+    batch = response.get_json()
+    assert (batch['total'], batch['succeeded'], batch['failed']) == (5, 2, 3)
+
+    results = batch['results']
+    assert [result['index'] for result in results] == [0, 1, 2, 3, 4]
+    assert results[1]['error'] == 'Each car must be a JSON object'
+    assert results[2]['error'] == 'Missing required fields: model'
+    assert results[4]['error'].startswith('Invalid numeric values')
+
+    # Rows valued together match the same cars valued one at a time
+    for index, car in [(0, swift), (3, creta)]:
+        single = client.post('/api/predict', json=car).get_json()
+        assert results[index]['model_version'] == enhanced_model.version
+        assert results[index]['prediction'] == pytest.approx(single['prediction'])
+        assert 'car_info' not in results[index]
+
+
+def test_batch_size_limit(app_module, client, enhanced_model, monkeypatch):
+    monkeypatch.setattr(app_module, 'MAX_BATCH_SIZE', 3)
+    car = {'company': 'Maruti', 'model': 'Swift', 'year': 2018}
+
+    assert client.post('/api/predict/batch', json=[car] * 3).get_json()['succeeded'] == 3
+    response = client.post('/api/predict/batch', json=[car] * 4)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Batch too large: 4 cars (maximum 3)'
+    assert client.post('/api/predict/batch', json={'cars': 'Swift'}).status_code == 400
+
+
+def test_sweep_grid_starts_at_the_single_prediction_and_ages_the_car(client, enhanced_model):
+    car = {'company': 'Hyundai', 'model': 'Creta', 'year': 2019, 'kms_driven': 30000, 'fuel_type': 'Diesel'}
+    sweep = client.post('/api/predict/sweep', json=dict(car, years_ahead=[0, 3, 6], kilometers=[30000, 90000])).get_json()
+    assert sweep['cells'] == 6
+    assert sweep['valuation_years'][1] - sweep['valuation_years'][0] == 3
+    assert [len(row) for row in sweep['base_prices']] == [2, 2, 2]
+
+    # Today's row of the grid is the single prediction at each kilometer reading
+    for j, kilometers in enumerate(sweep['kilometers']):
+        single = client.post('/api/predict', json=dict(car, kms_driven=kilometers)).get_json()
+        assert sweep['base_prices'][0][j] == pytest.approx(single['prediction'])
+        assert sweep['final_prices'][0][j] == pytest.approx(single['final_price'])
+
+
+@pytest.mark.parametrize('body, error', [
+    ({'years_ahead': []}, "'years_ahead' must be a non-empty list of numbers"),
+    ({'years_ahead': [0, 31]}, "'years_ahead' values must be between 0 and 30"),
+    ({'kilometers': ['far']}, "'kilometers' must be a non-empty list of numbers"),
+    ({'years_ahead': list(range(26)), 'kilometers': list(range(0, 100000, 1000))},
+     'Sweep too large: 2600 cells (maximum 2500)'),
+    ({'model': ''}, 'Missing required fields: model'),
+])
+def test_sweep_rejects_bad_grids(client, enhanced_model, body, error):
+    response = client.post('/api/predict/sweep', json=dict({'company': 'Maruti', 'model': 'Swift', 'year': 2018}, **body))
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+
+
+def test_sweep_needs_the_comprehensive_model(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module, 'enhanced_model', None)
+    assert client.post('/api/predict/sweep', json={'company': 'Maruti', 'model': 'Swift'}).status_code == 503
@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+
+from prediction_batcher import PredictionBatcher
+
+
+def submit_concurrently(batcher, rows):
+    results = [None] * len(rows)
+    start = threading.Barrier(len(rows))
+
+    def run(i):
+        start.wait()
+        try:
+            results[i] = batcher.submit(rows[i])
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(rows))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_rows_share_model_calls_and_keep_their_own_results():
+    calls = []
+
+    def predict(rows):
+        calls.append(len(rows))
+        return [row * 10 for row in rows]
+
+    batcher = PredictionBatcher(predict, max_batch_size=4, max_wait_ms=50)
+    assert submit_concurrently(batcher, list(range(8))) == [row * 10 for row in range(8)]
+    assert sum(calls) == 8 and len(calls) < 8
+    assert max(calls) <= 4
+    assert batcher.stats['requests'] == 8 and batcher.stats['largest_batch'] == max(calls)
+
+
+def test_a_failing_row_does_not_fail_its_batch():
+    def predict(rows):
+        if 'bad' in rows:
+            raise ValueError('cannot score bad')
+        return [len(row) for row in rows]
+
+    batcher = PredictionBatcher(predict, max_batch_size=8, max_wait_ms=50)
+    results = submit_concurrently(batcher, ['a', 'bad', 'ccc'])
+    assert results[0] == 1 and results[2] == 3
+    assert isinstance(results[1], ValueError)
+    assert batcher.stats['fallbacks'] >= 1
+
+
+def test_submit_times_out_when_the_model_hangs():
+    release = threading.Event()
+    batcher = PredictionBatcher(lambda rows: release.wait() and [0.0] * len(rows), max_wait_ms=0)
+    with pytest.raises(TimeoutError):
+        batcher.submit('row', timeout=0.05)
+    release.set()
@@ -0,0 +1,69 @@
+import prediction_cache
+from prediction_cache import PredictionCache, make_cache_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prediction_cache.time, 'monotonic', clock)
+    cache = PredictionCache(max_size=8, ttl_seconds=60)
+    cache.sync_version('v1')
+    key = make_cache_key('predict', {'company': 'Maruti', 'model': 'Swift', 'year': 2018})
+    cache.set(key, {'prediction': 450000.0})
+
+    clock.now += 59
+    assert cache.get(key) == {'prediction': 450000.0}
+    clock.now += 2
+    assert cache.get(key) is None
+    assert (cache.stats()['size'], cache.hits, cache.misses) == (0, 1, 1)
+
+
+def test_version_change_drops_entries_and_late_writes():
+    cache = PredictionCache(max_size=8, ttl_seconds=600)
+    cache.sync_version(('model@1', 'legacy@1', 'dataset-1'))
+    key = make_cache_key('predict', {'company': 'Maruti', 'model': 'Swift'})
+    cache.set(key, {'prediction': 1.0})
+
+    cache.sync_version(('model@2', 'legacy@1', 'dataset-1'))
+    assert cache.get(key) is None
+    assert cache.invalidations == 1
+
+    # A result computed by the old model arriving after the swap is not stored
+    cache.set(key, {'prediction': 1.0}, version=('model@1', 'legacy@1', 'dataset-1'))
+    assert cache.get(key) is None
+
+
+def test_least_recently_used_entry_is_evicted_and_values_are_copies():
+    cache = PredictionCache(max_size=2, ttl_seconds=600)
+    keys = [make_cache_key('predict', {'year': year}) for year in (2016, 2017, 2018)]
+    cache.set(keys[0], {'prediction': 1.0})
+    cache.set(keys[1], {'prediction': 2.0})
+    cache.get(keys[0])['prediction'] = -1.0
+    cache.set(keys[2], {'prediction': 3.0})
+
+    assert cache.get(keys[0]) == {'prediction': 1.0}
+    assert cache.get(keys[1]) is None
+    assert cache.evictions == 1
+    assert make_cache_key('predict', {'features': ['unhashable']}) is None
+
+
+def test_predict_is_cached_per_model_version(app_module, client, enhanced_model, model_artifacts):
+    car = {'company': 'Hyundai', 'model': 'i20', 'year': 2017, 'kms_driven': 61000}
+    first = client.post('/api/predict', json=car).get_json()
+    hits = client.get('/api/predict/cache-stats').get_json()['hits']
+    assert client.post('/api/predict', json=car).get_json() == first
+    assert client.get('/api/predict/cache-stats').get_json()['hits'] == hits + 1
+
+    # Serving another model invalidates everything cached for the previous one
+    other = app_module.model_registry.load_and_activate(model_artifacts[1])
+    second = client.post('/api/predict', json=car).get_json()
+    assert second['model_version'] == other.version != first['model_version']
+    assert second['prediction'] != first['prediction']
+    assert client.get('/api/predict/cache-stats').get_json()['hits'] == hits + 1
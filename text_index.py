@@ -0,0 +1,204 @@
+"""
+Listing Text Index
+Lowercase n-gram and prefix index over the distinct values of a text column,
+ranked by how many listings hold each value, for substring search,
+search-box suggestions and typo-tolerant name lookups without scanning the
+table
+"""
+
+import math
+import re
+from bisect import bisect_left
+
+import numpy as np
+
+# Grams of up to this many characters are indexed; longer queries intersect
+# their trigrams and confirm the candidates
+GRAM_SIZE = 3
+
+EMPTY_RANKS = np.empty(0, dtype=np.int32)
+
+# Minimum similarity (0-1) for a misspelt name to be taken as a term
+SIMILARITY_THRESHOLD = 0.5
+
+# Shorter queries (letters and digits) are only matched exactly: "X" is not a typo of "X Trail"
+MIN_SIMILAR_LENGTH = 3
+
+
+def grams(text, size=GRAM_SIZE):
+    """Every substring of ``text`` with 1 to ``size`` characters"""
+    return {text[start:start + length]
+            for length in range(1, size + 1)
+            for start in range(len(text) - length + 1)}
+
+
+def word_trigrams(text):
+    """Trigrams of each word of ``text`` padded like pg_trgm ("  hy", " hyu", ..., "ai ")"""
+    words = re.sub(r'[^0-9a-z]+', ' ', text.lower()).split()
+    return {f"  {word} "[start:start + 3] for word in words for start in range(len(word) + 1)}
+
+
+class TermIndex:
+    """Distinct values of one column, most frequent first.
+
+    A value's rank is its position in that order, so any sorted array of
+    ranks is already in frequency order (ties keep first appearance).
+    """
+
+    def __init__(self, terms, counts):
+        order = sorted(range(len(terms)), key=lambda position: -counts[position])
+        self.terms = [terms[position] for position in order]
+        self.counts = np.array([counts[position] for position in order], dtype=np.int64)
+        self.keys = [str(term).lower() for term in self.terms]
+        self.key_ranks = {}
+        for rank, key in enumerate(self.keys):
+            self.key_ranks.setdefault(key, rank)
+
+        postings = {}
+        for rank, key in enumerate(self.keys):
+            for gram in grams(key):
+                postings.setdefault(gram, []).append(rank)
+        self.grams = {gram: np.array(ranks, dtype=np.int32) for gram, ranks in postings.items()}
+
+        # Every word-initial suffix ("maruti suzuki swift", "suzuki swift",
+        # "swift") in alphabetical order, with its rank, for prefix lookups
+        suffixes = sorted((key[start:], rank)
+                          for rank, key in enumerate(self.keys)
+                          for start in range(len(key))
+                          if start == 0 or key[start - 1] == ' ')
+        self.sorted_keys = [suffix for suffix, rank in suffixes]
+        self.prefix_ranks = np.array([rank for suffix, rank in suffixes], dtype=np.int32)
+
+        # Padded word trigrams for similarity, weighted by rarity: words most
+        # names share (a brand in every model) count less than distinctive ones
+        postings = {}
+        for rank, key in enumerate(self.keys):
+            for trigram in word_trigrams(key):
+                postings.setdefault(trigram, []).append(rank)
+        self.trigrams = {trigram: np.array(ranks, dtype=np.int32) for trigram, ranks in postings.items()}
+        self.unseen_weight = math.log(len(self.keys) + 1) + 1
+        self.trigram_weights = {trigram: math.log((len(self.keys) + 1) / (len(ranks) + 1)) + 1
+                                for trigram, ranks in self.trigrams.items()}
+        self.term_weights = np.zeros(len(self.keys))
+        for trigram, ranks in self.trigrams.items():
+            self.term_weights[ranks] += self.trigram_weights[trigram]
+
+    def containing(self, query):
+        """Sorted ranks of the terms whose lowercase form contains ``query`` (lowercase)"""
+        if not query:
+            return np.arange(len(self.terms), dtype=np.int32)
+        if len(query) <= GRAM_SIZE:
+            return self.grams.get(query, EMPTY_RANKS)
+
+        candidates = None
+        for gram in sorted((self.grams.get(query[start:start + GRAM_SIZE], EMPTY_RANKS)
+                            for start in range(len(query) - GRAM_SIZE + 1)), key=len):
+            candidates = gram if candidates is None else np.intersect1d(candidates, gram, assume_unique=True)
+            if not len(candidates):
+                return EMPTY_RANKS
+        # Holding every trigram does not guarantee holding them in sequence
+        return candidates[[query in self.keys[rank] for rank in candidates]]
+
+    def prefixed(self, query):
+        """Sorted ranks of the terms with a word starting with ``query`` (lowercase)"""
+        start = bisect_left(self.sorted_keys, query)
+        stop = bisect_left(self.sorted_keys, query + '\U0010ffff', start)
+        return np.unique(self.prefix_ranks[start:stop])
+
+    def suggest(self, query, limit=10):
+        """Up to ``limit`` terms containing ``query``: word-prefix matches first, each group by frequency.
+
+        When nothing contains it, the closest spellings are suggested instead.
+        """
+        query = query.lower()
+        ranks = self.prefixed(query)[:limit]
+        if len(ranks) < limit:
+            inner = self.containing(query)
+            inner = inner[~np.isin(inner, ranks)][:limit - len(ranks)]
+            ranks = np.concatenate([ranks, inner])
+        if not len(ranks):
+            return self.similar(query, limit)
+        return [self.terms[rank] for rank in ranks]
+
+    def similar(self, query, limit=5, min_score=SIMILARITY_THRESHOLD, ranks=None):
+        """Up to ``limit`` terms most similar to ``query``, best first (frequency breaks ties).
+
+        The score averages how much of the query's weighted trigrams a term
+        holds and the weighted Jaccard similarity of the two, so "hundai
+        creta" finds "Hyundai Creta" and "creta" alone still does. ``ranks``
+        limits the candidates (e.g. to one company's models).
+        """
+        if len(re.sub(r'[^0-9a-z]+', '', query.lower())) < MIN_SIMILAR_LENGTH:
+            return []
+        query_trigrams = word_trigrams(query)
+        found = [trigram for trigram in query_trigrams if trigram in self.trigrams]
+        if not found:
+            return []
+
+        query_weight = sum(self.trigram_weights.get(trigram, self.unseen_weight) for trigram in query_trigrams)
+        postings = [self.trigrams[trigram] for trigram in found]
+        weights = np.repeat([self.trigram_weights[trigram] for trigram in found], [len(ids) for ids in postings])
+        shared = np.bincount(np.concatenate(postings), weights=weights, minlength=len(self.keys))
+        scores = (shared / query_weight + shared / (query_weight + self.term_weights - shared)) / 2
+
+        candidates = np.flatnonzero(scores >= min_score - 1e-9)
+        if ranks is not None:
+            candidates = np.intersect1d(candidates, ranks)
+        best = candidates[np.lexsort((candidates, -scores[candidates]))][:limit]
+        return [self.terms[rank] for rank in best]
+
+    def exact(self, query, ranks=None):
+        """The term spelt ``query`` ignoring case (among ``ranks`` if given); None if there is none"""
+        rank = self.key_ranks.get(query.lower())
+        if rank is not None and (ranks is None or rank in ranks):
+            return self.terms[rank]
+        return None
+
+    def closest(self, query, min_score=SIMILARITY_THRESHOLD, ranks=None):
+        """The term spelt ``query`` (ignoring case) or else the most similar one; None if nothing is close"""
+        term = self.exact(query, ranks)
+        if term is not None:
+            return term
+        matches = self.similar(query, 1, min_score, ranks)
+        return matches[0] if matches else None
+
+    def matching_terms(self, query):
+        return [self.terms[rank] for rank in self.containing(query.lower())]
+
+    def __len__(self):
+        return len(self.terms)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    import pandas as pd
+
+    # Check: substring matches must equal a scan of the distinct values, and
+    # suggestions must come back in microseconds
+    paths = sys.argv[1:] or ['Cleaned_Car_data_master.csv', 'generated_5000_strict.csv']
+    df = pd.concat([pd.read_csv(path) for path in paths], ignore_index=True)
+    counts = df['model'].value_counts(sort=False)
+    index = TermIndex(list(counts.index), list(counts.values))
+
+    for query in ['', 'a', 'sw', 'swi', 'swift', 'swift dzire', 'i20 ', 'xyzzy', 'CRETA']:
+        expected = {term for term in counts.index if query.lower() in term.lower()}
+        assert set(index.matching_terms(query)) == expected, query
+        words = {term for term in expected if any(word.startswith(query.lower()) for word in term.lower().split(' '))}
+        assert set(index.suggest(query, len(index))[:len(words)]) == words, query
+
+    for typed, expected in [('Hundai Creta', 'Hyundai Creta'), ('honda citi', 'Honda City'), ('swift', 'Maruti Suzuki Swift')]:
+        assert index.closest(typed) == expected, typed
+    assert index.closest('xyzzy') is None and index.closest('X') is None
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        index.suggest('su')
+    suggest_us = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for _ in range(1000):
+        index.closest('Hundai Creta')
+    closest_us = (time.perf_counter() - start) * 1000
+    print(f"[OK] {len(index)} models, {len(index.grams)} grams; suggest('su') {suggest_us:.0f} us: "
+          f"{index.suggest('su', 5)}; closest('Hundai Creta') {closest_us:.0f} us")
@@ -14,6 +14,7 @@ from sklearn.compose import ColumnTransformer
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import pickle
 import warnings
+from derived_features import MODEL_DERIVED_COLUMNS, add_derived_columns
 warnings.filterwarnings('ignore')
 
 def train_comprehensive_model():
@@ -28,15 +29,8 @@ def train_comprehensive_model():
     print(f"Brands: {sorted(brands)}")
     
     # Feature engineering with robust handling
-    df['age'] = 2024 - df['year']
-    df['price_per_km'] = df['Price'] / (df['kilometers_driven'] + 1)
-    df['engine_power_ratio'] = df['power'] / (df['engine_size'] + 1)
-    
-    # Create binary features with proper handling
-    df['is_electric'] = (df['fuel_type'] == 'Electric').astype(int)
-    df['is_hybrid'] = (df['fuel_type'] == 'Hybrid').astype(int)
-    df['is_automatic'] = (df['transmission'] == 'Automatic').astype(int)
-    df['is_first_owner'] = (df['owner_count'] == '1st').astype(int)
+    # Age, price_per_km, engine_power_ratio and the is_* flags (see derived_features)
+    df = add_derived_columns(df, MODEL_DERIVED_COLUMNS, reference_year=2024)
     df['is_certified'] = df['is_certified'].astype(int)
     
     # Define features
@@ -1,9 +1,11 @@
-from flask import Flask, render_template, request, redirect, jsonify, send_from_directory
+from flask import Flask, Response, render_template, request, redirect, jsonify, send_from_directory, g, has_request_context
 
 from flask_cors import CORS, cross_origin
 
 import pickle
 
+import re
+
 import pandas as pd
 
 import numpy as np
@@ -34,21 +36,12 @@ if sys.platform == "win32":
 
 
 
-# Import market trends analyzer
-
-try:
-
-    from market_trends_analyzer import MarketTrendsAnalyzer, get_market_trends_data, get_company_comparison, get_price_prediction_trends
-
-    MARKET_TRENDS_AVAILABLE = True
-
-    print("[OK] Market Trends Analyzer imported successfully")
-
-except ImportError as e:
+# Market trends analyzer: imported (with scipy and sklearn) by the background
+# warm-up when the analyzer is first built, not while the app starts
 
-    print(f"[WARNING] Market Trends Analyzer not available: {e}")
+import importlib.util
 
-    MARKET_TRENDS_AVAILABLE = False
+MARKET_TRENDS_AVAILABLE = importlib.util.find_spec('market_trends_analyzer') is not None
 
 
 
@@ -56,7 +49,7 @@ except ImportError as e:
 
 try:
 
-    from mongodb_config import get_sync_collections, test_connection
+    from mongodb_config import get_sync_collections, test_connection, get_sync_client, MONGODB_DATABASE, COLLECTIONS
 
     from auth_routes import auth_bp
 
@@ -172,328 +165,472 @@ def debug_routes():
 
 
 
-# Load the enhanced model and encoders
+# Load the enhanced model and encoders through the versioned model registry
+from model_registry import ModelRegistry, artifact_version, resolve_model_path
 
-try:
 
-    # Try to load the comprehensive model first
-    if os.path.exists('Comprehensive_Model.pkl'):
-        enhanced_model_data = pickle.load(open('Comprehensive_Model.pkl', 'rb'))
-        print("[OK] Comprehensive Model loaded successfully")
-    elif os.path.exists('Debug_Enhanced_Model.pkl'):
-        enhanced_model_data = pickle.load(open('Debug_Enhanced_Model.pkl', 'rb'))
-        print("[OK] Debug Enhanced Model loaded successfully")
-    elif os.path.exists('Fixed_Enhanced_Model.pkl'):
-        enhanced_model_data = pickle.load(open('Fixed_Enhanced_Model.pkl', 'rb'))
-        print("[OK] Fixed Enhanced Model loaded successfully")
-    elif os.path.exists('Enhanced_Real_Price_Model.pkl'):
-        enhanced_model_data = pickle.load(open('Enhanced_Real_Price_Model.pkl', 'rb'))
-        print("[OK] Enhanced Real Price Model loaded successfully")
-    else:
-        enhanced_model_data = pickle.load(open('BestCombinedModel.pkl', 'rb'))
-        print("[OK] Best Combined Model loaded successfully")
-    
+def publish_enhanced_model(version):
+    """Mirror the active model version into the module-level globals"""
+    global enhanced_model, enhanced_model_data, enhanced_model_path, enhanced_model_version
+    global enhanced_model_name, enhanced_categorical_columns, enhanced_numerical_features
+    global enhanced_performance, enhanced_feature_names, enhanced_fast_path
 
-    # Handle the actual model structure
+    if version is None:
+        enhanced_model = None
+        enhanced_model_data = None
+        enhanced_model_path = None
+        enhanced_model_version = None
+        enhanced_model_name = "None"
+        enhanced_categorical_columns = []
+        enhanced_numerical_features = []
+        enhanced_performance = {}
+        enhanced_feature_names = []
+        enhanced_fast_path = None
+        return
 
-    if isinstance(enhanced_model_data, dict):
+    enhanced_model = version.model
+    enhanced_model_data = version.data
+    enhanced_model_path = version.path
+    enhanced_model_version = version.version
+    enhanced_model_name = version.name
+    enhanced_categorical_columns = version.categorical_features
+    enhanced_numerical_features = version.numerical_features
+    enhanced_performance = version.performance
+    enhanced_feature_names = version.feature_names
+    enhanced_fast_path = version.fast_path
 
-        enhanced_model = enhanced_model_data.get('model')
 
-        enhanced_model_name = enhanced_model_data.get('model_name', 'Enhanced Model')
+# The model is a Pipeline, so we don't need separate scaler/encoders
+enhanced_scaler = None
+enhanced_label_encoders = {}
 
-        enhanced_categorical_columns = enhanced_model_data.get('categorical_features', [])
+publish_enhanced_model(None)
+model_registry = ModelRegistry(on_activate=publish_enhanced_model)
 
-        enhanced_numerical_features = enhanced_model_data.get('numerical_features', [])
 
-        enhanced_performance = enhanced_model_data.get('performance', {})
 
-        
+# Legacy model (for backward compatibility), loaded by the startup warm-up
 
-        # The model is a Pipeline, so we don't need separate scaler/encoders
+model = None
+le_name = None
+le_company = None
+le_fuel = None
+le_transmission = None
+scaler = None
+legacy_model_version = None
 
-        enhanced_scaler = None
 
-        enhanced_label_encoders = {}
+def load_legacy_model():
+    """Load LinearRegressionModel.pkl into the legacy model globals"""
+    global model, le_name, le_company, le_fuel, le_transmission, scaler, legacy_model_version
 
-        enhanced_feature_names = enhanced_categorical_columns + enhanced_numerical_features
+    try:
 
-        
+        model_data = pickle.load(open('LinearRegressionModel.pkl', 'rb'))
 
-        print(f"[OK] Model: {enhanced_model_name}")
-        print(f"[OK] Features: {len(enhanced_feature_names)} total")
-        print(f"[OK] Performance: R² = {enhanced_performance.get('r2_score', 0):.4f}")
-        
-    else:
+        model = model_data['model']
 
-        # Fallback for unexpected format
+        le_name = model_data['le_name']
 
-        enhanced_model = None
+        le_company = model_data['le_company']
 
-        enhanced_scaler = None
+        le_fuel = model_data['le_fuel']
 
-        enhanced_label_encoders = {}
+        le_transmission = model_data.get('le_transmission', None)
 
-        enhanced_feature_names = []
+        scaler = model_data.get('scaler', None)
 
-        enhanced_categorical_columns = []
+    except Exception as e:
 
-        enhanced_numerical_features = []
+        print(f"[ERROR] Error loading legacy model: {str(e)}")
 
-        enhanced_model_name = "Unknown"
+        print("[WARNING] No models available - some features may not work")
 
-        enhanced_performance = {}
+        model = None
 
-        print("[WARNING] Enhanced model format not recognized")
+        le_name = None
 
-        
+        le_company = None
 
-except FileNotFoundError:
+        le_fuel = None
 
-    print("[WARNING] Enhanced model not found, using legacy model")
+        le_transmission = None
 
-    enhanced_model = None
+        scaler = None
 
-    enhanced_scaler = None
+    legacy_model_version = artifact_version('LinearRegressionModel.pkl') if model is not None else None
 
-    enhanced_label_encoders = {}
 
-    enhanced_feature_names = []
 
-    enhanced_categorical_columns = []
+# Load master dataset from MongoDB
+from dataset_snapshot import cached_table, collection_fingerprint, read_csv_cached
+from mongo_loader import load_collection_frame
 
-    enhanced_numerical_features = []
 
-    enhanced_model_name = "None"
+def load_listing_table():
+    """Read the listings table from MongoDB, falling back to the CSV files"""
+    try:
+        # Connect to MongoDB and load data
+        from mongodb_config import get_sync_client, MONGODB_DATABASE, COLLECTIONS
+    
+        client = get_sync_client()
+        if client:
+            # Collections are looked up on each call: a forked worker gets its
+            # own client from get_sync_client instead of the loader's
+            def listing_database():
+                return get_sync_client()[MONGODB_DATABASE]
+        
+            # Function to get user-specific data
+            def get_user_specific_data(user_id=None):
+                if user_id:
+                    # First check for user-specific car data collection
+                    user_collection = listing_database()[COLLECTIONS['user_car_data']]
+                    # If user_id is provided, get user-specific data
+                    user_data = load_collection_frame(user_collection, {"user_id": user_id},
+                                                      label=f"user {user_id} cars")
+                    if not user_data.empty:
+                        return user_data
+                return None
+        
+            # Global function to load car data for a specific user
+            def load_car_data_for_user(user_id=None):
+                # Try to get user-specific data first
+                user_df = get_user_specific_data(user_id)
+            
+                # If user has specific data, use it
+                if user_df is not None and not user_df.empty:
+                    # Remove MongoDB _id field if it exists
+                    if '_id' in user_df.columns:
+                        user_df = user_df.drop('_id', axis=1)
+                    if 'user_id' in user_df.columns:
+                        user_df = user_df.drop('user_id', axis=1)
+                    
+                    print(f"[OK] User-specific dataset loaded: {len(user_df)} records")
+                    return user_df
+            
+                # Otherwise, fall back to main dataset
+                db = listing_database()
+                main_collection = db[COLLECTIONS['car_dataset']]
+                if COLLECTIONS['car_dataset'] in db.list_collection_names() and main_collection.count_documents({}) > 0:
+                    # Stream the listing columns into a DataFrame, reusing the
+                    # columnar snapshot while the collection is unchanged
+                    main_df = cached_table(
+                        COLLECTIONS['car_dataset'],
+                        collection_fingerprint(main_collection),
+                        lambda: load_collection_frame(main_collection, label=COLLECTIONS['car_dataset'])
+                    )
+
+                    print(f"[OK] Dataset loaded from MongoDB: {len(main_df)} records with {main_df['company'].nunique()} brands")
+                    return main_df
+                else:
+                    # Fallback to local files if MongoDB collection is empty
+                    print("[WARNING] MongoDB collection is empty, falling back to local files")
+                    raise FileNotFoundError("MongoDB collection is empty")
+        
+            # Load the default dataset (no user-specific filtering)
+            car = load_car_data_for_user()
+        
+            # Make the function available globally
+            app.config['load_car_data_for_user'] = load_car_data_for_user
+        else:
+            # Fallback to local files if MongoDB connection fails
+            print("[WARNING] MongoDB connection failed, falling back to local files")
+            raise FileNotFoundError("MongoDB connection failed")
+        
+    except Exception as e:
+        print(f"[WARNING] Error loading from MongoDB: {str(e)}")
+        print("[INFO] Falling back to local CSV files")
+    
+        try:
+            # Try to load the enhanced Indian brands dataset first
+            if os.path.exists('enhanced_indian_car_dataset.csv'):
+                car = read_csv_cached('enhanced_indian_car_dataset.csv')
+                print(f"[OK] Enhanced Indian brands dataset loaded: {len(car)} records with {car['company'].nunique()} brands")
+            elif os.path.exists('indian_car_brands_dataset.csv'):
+                car = read_csv_cached('indian_car_brands_dataset.csv')
+                print(f"[OK] Indian brands dataset loaded: {len(car)} records with {car['company'].nunique()} brands")
+            else:
+                # Fallback to original datasets
+                car1 = read_csv_cached('Cleaned_Car_data_master.csv')
+                car2 = read_csv_cached('generated_5000_strict.csv')
+                car = pd.concat([car1, car2], ignore_index=True)
+                print(f"[OK] Original datasets loaded: {len(car)} records")
+    
+        except FileNotFoundError as e:
+            print(f"[ERROR] Dataset file not found: {e}")
+            print("[ERROR] Creating empty DataFrame")
+            car = pd.DataFrame()
 
-    enhanced_performance = {}
+    return car
 
-except Exception as e:
 
-    print(f"[WARNING] Error loading enhanced model: {str(e)}")
 
-    print("Using legacy model instead")
+# Per-(company, model, year) aggregates used to fill in prediction inputs
+from feature_store import FeatureStore
 
-    enhanced_model = None
 
-    enhanced_scaler = None
+def build_feature_store(df):
+    """Precompute the prediction-input aggregates for a listings table"""
+    try:
+        store = FeatureStore(df)
+        print(f"[OK] Feature store built: {len(store.by_model_year)} model-years, "
+              f"{len(store.by_model)} models, {len(store.by_company)} brands")
+        return store
+    except Exception as e:
+        print(f"[WARNING] Could not build feature store: {e}")
+        return FeatureStore(None)
 
-    enhanced_label_encoders = {}
 
-    enhanced_feature_names = []
 
-    enhanced_categorical_columns = []
+# Precomputed "similar cars" summaries behind the car_info block
+from comparables_index import ComparablesIndex
 
-    enhanced_numerical_features = []
 
-    enhanced_model_name = "None"
+def build_comparables_index(df):
+    """Precompute car_info summaries for a listings table"""
+    try:
+        index = ComparablesIndex(df)
+        print(f"[OK] Comparables index built: {len(index)} groups")
+        return index
+    except Exception as e:
+        print(f"[WARNING] Could not build comparables index: {e}")
+        return ComparablesIndex(None)
 
-    enhanced_performance = {}
 
 
+# Inverted index (value -> sorted row ids) behind the /api/cars/search filters,
+# with n-gram text indexes for free-text search and /api/search-suggestions
+from listing_index import ListingIndex, intersect_sorted
 
-# Legacy model (for backward compatibility)
 
-try:
+def build_listing_index(df):
+    try:
+        index = ListingIndex(df)
+        print(f"[OK] Listing index built: {sum(len(postings) for postings in index.postings.values())} values "
+              f"over {len(index.postings)} columns")
+        return index
+    except Exception as e:
+        print(f"[WARNING] Could not build listing index: {e}")
+        return ListingIndex(None)
+
+
+def resolve_car_names(company, model):
+    """Dataset spellings of a typed company and model ("Hundai Creta" -> "Hyundai Creta")"""
+    version = request_dataset()
+    if version is None or getattr(version, 'listing_index', None) is None:
+        return company, model
+    try:
+        resolved = version.listing_index.resolve_car(company, model)
+        if resolved != (company, model):
+            print(f"[INFO] Matched {company} / {model} to {resolved[0]} / {resolved[1]}")
+        return resolved
+    except Exception as e:
+        print(f"[WARNING] Could not match car names: {e}")
+        return company, model
+
 
-    model_data = pickle.load(open('LinearRegressionModel.pkl', 'rb'))
+def note_resolved_names(result, data, car_data):
+    """Tell the client which names were valued when its company/model were matched to other spellings"""
+    for field in ('company', 'model'):
+        if car_data.get(field) != data.get(field):
+            result[f"resolved_{field}"] = car_data.get(field)
+        else:
+            # Cached results are shared by every spelling of the same car
+            result.pop(f"resolved_{field}", None)
 
-    model = model_data['model']
 
-    le_name = model_data['le_name']
 
-    le_company = model_data['le_company']
+# Market trends analyzer over a view of a dataset version's listings
+# (imported on first use: scipy and the analyzer add ~1.5 s to startup)
+def build_market_analyzer(version):
+    global MARKET_TRENDS_AVAILABLE
 
-    le_fuel = model_data['le_fuel']
+    if not MARKET_TRENDS_AVAILABLE:
+        return None
+    try:
+        from market_trends_analyzer import MarketTrendsAnalyzer
+    except ImportError as e:
+        print(f"[WARNING] Market Trends Analyzer not available: {e}")
+        MARKET_TRENDS_AVAILABLE = False
+        return None
+    try:
+        # A reload that only appended listings extends the previous analyzer:
+        # the analysis columns are derived for the new rows only
+        previous = version.appended_to.derived('market_analyzer') if version.appended_to is not None else None
+        if previous is not None and previous.current_year == datetime.now().year:
+            rows = version.frame.iloc[len(version.appended_to.frame):]
+            print(f"[OK] Market analyzer extended with {len(rows)} appended listings")
+            return previous.with_appended(rows)
+        return MarketTrendsAnalyzer(data=version.view())
+    except Exception as e:
+        print(f"[WARNING] Could not build market trends analyzer: {e}")
+        return None
 
-    le_transmission = model_data.get('le_transmission', None)
 
-    scaler = model_data.get('scaler', None)
 
-except Exception as e:
+# Additional fields not in new dataset - using defaults
 
-    print(f"[ERROR] Error loading legacy model: {str(e)}")
+maintenance_levels = ['Low', 'Medium', 'High']
 
-    print("[WARNING] No models available - some features may not work")
+listing_types = ['Dealer', 'Individual']
 
-    model = None
+is_certified_types = ['Yes', 'No']
 
-    le_name = None
 
-    le_company = None
 
-    le_fuel = None
+def build_dataset_catalogs(df):
+    """Dropdown values and numeric ranges served by the metadata endpoints"""
+    # Get unique values for all categorical fields
 
-    le_transmission = None
+    companies = sorted(df['company'].unique().tolist())
 
-    scaler = None
+    models = sorted(df['model'].unique().tolist())
 
+    fuel_types = sorted(df['fuel_type'].unique().tolist())
 
+    # Handle mixed types in transmission column by converting all to strings first
+    # (via object, since categorical columns cannot be filled with a new value)
+    transmission_values = df['transmission'].astype(object).fillna('').astype(str).unique().tolist()
+    transmission_types = sorted([t for t in transmission_values if t != ''])
 
-# Load master dataset from MongoDB
-try:
-    # Connect to MongoDB and load data
-    from mongodb_config import get_sync_client, MONGODB_DATABASE, COLLECTIONS
-    
-    client = get_sync_client()
-    if client:
-        db = client[MONGODB_DATABASE]
-        
-        # First check for user-specific car data collection
-        user_collection = db[COLLECTIONS['user_car_data']]
-        main_collection = db[COLLECTIONS['car_dataset']]
-        
-        # Function to get user-specific data
-        def get_user_specific_data(user_id=None):
-            if user_id:
-                # If user_id is provided, get user-specific data
-                user_data = list(user_collection.find({"user_id": user_id}))
-                if user_data:
-                    return pd.DataFrame(user_data)
-            return None
-        
-        # Global function to load car data for a specific user
-        def load_car_data_for_user(user_id=None):
-            # Try to get user-specific data first
-            user_df = get_user_specific_data(user_id)
-            
-            # If user has specific data, use it
-            if user_df is not None and not user_df.empty:
-                # Remove MongoDB _id field if it exists
-                if '_id' in user_df.columns:
-                    user_df = user_df.drop('_id', axis=1)
-                if 'user_id' in user_df.columns:
-                    user_df = user_df.drop('user_id', axis=1)
-                    
-                print(f"[OK] User-specific dataset loaded: {len(user_df)} records")
-                return user_df
-            
-            # Otherwise, fall back to main dataset
-            if COLLECTIONS['car_dataset'] in db.list_collection_names() and main_collection.count_documents({}) > 0:
-                # Convert MongoDB documents to DataFrame
-                car_data = list(main_collection.find({}))
-                main_df = pd.DataFrame(car_data)
-                
-                # Remove MongoDB _id field if it exists
-                if '_id' in main_df.columns:
-                    main_df = main_df.drop('_id', axis=1)
-                    
-                print(f"[OK] Dataset loaded from MongoDB: {len(main_df)} records with {main_df['company'].nunique()} brands")
-                return main_df
-            else:
-                # Fallback to local files if MongoDB collection is empty
-                print("[WARNING] MongoDB collection is empty, falling back to local files")
-                raise FileNotFoundError("MongoDB collection is empty")
-        
-        # Load the default dataset (no user-specific filtering)
-        car = load_car_data_for_user()
-        
-        # Make the function available globally
-        app.config['load_car_data_for_user'] = load_car_data_for_user
-    else:
-        # Fallback to local files if MongoDB connection fails
-        print("[WARNING] MongoDB connection failed, falling back to local files")
-        raise FileNotFoundError("MongoDB connection failed")
-        
-except Exception as e:
-    print(f"[WARNING] Error loading from MongoDB: {str(e)}")
-    print("[INFO] Falling back to local CSV files")
-    
+    # Use 'owner' column instead of 'owner_count' if it exists, otherwise use default values
     try:
-        # Try to load the enhanced Indian brands dataset first
-        if os.path.exists('enhanced_indian_car_dataset.csv'):
-            car = pd.read_csv('enhanced_indian_car_dataset.csv')
-            print(f"[OK] Enhanced Indian brands dataset loaded: {len(car)} records with {car['company'].nunique()} brands")
-        elif os.path.exists('indian_car_brands_dataset.csv'):
-            car = pd.read_csv('indian_car_brands_dataset.csv')
-            print(f"[OK] Indian brands dataset loaded: {len(car)} records with {car['company'].nunique()} brands")
+        if 'owner' in df.columns:
+            owner_types = sorted(df['owner'].unique().tolist())
+        elif 'owner_type' in df.columns:
+            owner_types = sorted(df['owner_type'].unique().tolist())
         else:
-            # Fallback to original datasets
-            car1 = pd.read_csv('Cleaned_Car_data_master.csv')
-            car2 = pd.read_csv('generated_5000_strict.csv')
-            car = pd.concat([car1, car2], ignore_index=True)
-            print(f"[OK] Original datasets loaded: {len(car)} records")
-    
-    except FileNotFoundError as e:
-        print(f"[ERROR] Dataset file not found: {e}")
-        print("[ERROR] Creating empty DataFrame")
-        car = pd.DataFrame()
-
+            owner_types = ['First Owner', 'Second Owner', 'Third Owner', 'Fourth & Above Owner']
+    except:
+        owner_types = ['First Owner', 'Second Owner', 'Third Owner', 'Fourth & Above Owner']
 
+    # Handle mixed types in car_condition column
+    condition_values = df['car_condition'].astype(object).fillna('').astype(str).unique().tolist()
+    condition_types = sorted([c for c in condition_values if c != ''])
 
-# Initialize market trends analyzer
+    # Handle mixed types in city column
+    city_values = df['city'].astype(object).fillna('').astype(str).unique().tolist()
+    cities = sorted([c for c in city_values if c != ''])
 
-market_analyzer = None
+    # Get numerical ranges
 
-if MARKET_TRENDS_AVAILABLE:
+    year_range = {'min': int(df['year'].min()), 'max': int(df['year'].max())}
 
+    # Check for different possible column names for kilometers
     try:
+        if 'kilometers_driven' in df.columns:
+            kms_range = {'min': int(df['kilometers_driven'].min()), 'max': int(df['kilometers_driven'].max())}
+        elif 'km_driven' in df.columns:
+            kms_range = {'min': int(df['km_driven'].min()), 'max': int(df['km_driven'].max())}
+        else:
+            kms_range = {'min': 0, 'max': 200000}  # Default values
+    except:
+        kms_range = {'min': 0, 'max': 200000}  # Default values
 
-        market_analyzer = MarketTrendsAnalyzer()
+    price_range = {'min': int(df['Price'].min()), 'max': int(df['Price'].max())}
 
-    except Exception as e:
+    return {
+        'companies': companies, 'models': models, 'fuel_types': fuel_types,
+        'transmission_types': transmission_types, 'owner_types': owner_types,
+        'condition_types': condition_types, 'cities': cities,
+        'year_range': year_range, 'kms_range': kms_range, 'price_range': price_range
+    }
 
-        MARKET_TRENDS_AVAILABLE = False
 
 
+# One shared copy of the listings table: normalized column names, content
+# version and compact dtypes (categorical strings, downcast numerics). Each
+# dataset version carries its own catalogs and indexes; a reload builds a
+# new version in the background and swaps it in with one reference update
+from dataset_store import DatasetStore, listing_records
 
-# Get unique values for all categorical fields
 
-companies = sorted(car['company'].unique().tolist())
+def prepare_dataset(version):
+    """Build the catalogs and indexes for a dataset version"""
+    version.catalogs = build_dataset_catalogs(version.frame)
+    version.feature_store = build_feature_store(version.frame)
+    version.comparables_index = build_comparables_index(version.frame)
+    version.listing_index = build_listing_index(version.frame)
+    if warmup.finished('market_analyzer'):
+        # Reloads run in the background, so build the new analyzer before the swap
+        version.derive('market_analyzer', build_market_analyzer)
+    # A new dataset version needs its own confidence calibration for the serving model
+    confidence_calibration(model_registry.active, version)
 
-models = sorted(car['model'].unique().tolist())
 
-fuel_types = sorted(car['fuel_type'].unique().tolist())
+def publish_dataset(version):
+    """Mirror the active dataset version into the module-level globals"""
+    global car, dataset_version, feature_store, comparables_index
+    global companies, models, fuel_types, transmission_types, owner_types, condition_types, cities
+    global year_range, kms_range, price_range
 
-# Handle mixed types in transmission column by converting all to strings first
-transmission_values = car['transmission'].fillna('').astype(str).unique().tolist()
-transmission_types = sorted([t for t in transmission_values if t != ''])
+    car = version.frame
+    dataset_version = version.version
+    feature_store = version.feature_store
+    comparables_index = version.comparables_index
 
-# Use 'owner' column instead of 'owner_count' if it exists, otherwise use default values
-try:
-    if 'owner' in car.columns:
-        owner_types = sorted(car['owner'].unique().tolist())
-    elif 'owner_type' in car.columns:
-        owner_types = sorted(car['owner_type'].unique().tolist())
-    else:
-        owner_types = ['First Owner', 'Second Owner', 'Third Owner', 'Fourth & Above Owner']
-except:
-    owner_types = ['First Owner', 'Second Owner', 'Third Owner', 'Fourth & Above Owner']
+    catalogs = version.catalogs
+    companies = catalogs['companies']
+    models = catalogs['models']
+    fuel_types = catalogs['fuel_types']
+    transmission_types = catalogs['transmission_types']
+    owner_types = catalogs['owner_types']
+    condition_types = catalogs['condition_types']
+    cities = catalogs['cities']
+    year_range = catalogs['year_range']
+    kms_range = catalogs['kms_range']
+    price_range = catalogs['price_range']
 
-# Handle mixed types in car_condition column
-condition_values = car['car_condition'].fillna('').astype(str).unique().tolist()
-condition_types = sorted([c for c in condition_values if c != ''])
 
-# Handle mixed types in city column
-city_values = car['city'].fillna('').astype(str).unique().tolist()
-cities = sorted([c for c in city_values if c != ''])
+# Empty until the warm-up activates the first version
+car = pd.DataFrame()
+dataset_version = None
 
-# Additional fields not in new dataset - using defaults
+dataset_store = DatasetStore(load_listing_table, prepare=prepare_dataset, on_activate=publish_dataset)
 
-maintenance_levels = ['Low', 'Medium', 'High']
 
-listing_types = ['Dealer', 'Individual']
+def request_dataset():
+    """The dataset version pinned for the current request (the active one outside requests)"""
+    if has_request_context() and g.get('dataset') is not None:
+        return g.dataset
+    return dataset_store.active
 
-is_certified_types = ['Yes', 'No']
 
+def request_market_analyzer():
+    """Market analyzer of the request's dataset version, built on first use"""
+    version = request_dataset()
+    return version.derive('market_analyzer', build_market_analyzer) if version is not None else None
 
 
-# Get numerical ranges
+# Seconds a request that arrives during warm-up waits for what it needs
+STARTUP_WAIT_TIMEOUT = float(os.getenv('STARTUP_WAIT_TIMEOUT', 60))
 
-year_range = {'min': int(car['year'].min()), 'max': int(car['year'].max())}
 
-# Check for different possible column names for kilometers
-try:
-    if 'kilometers_driven' in car.columns:
-        kms_range = {'min': int(car['kilometers_driven'].min()), 'max': int(car['kilometers_driven'].max())}
-    elif 'km_driven' in car.columns:
-        kms_range = {'min': int(car['km_driven'].min()), 'max': int(car['km_driven'].max())}
-    else:
-        kms_range = {'min': 0, 'max': 200000}  # Default values
-except:
-    kms_range = {'min': 0, 'max': 200000}  # Default values
+def startup_requirements(path):
+    """Warm-up steps a request path needs (health checks and static files need none)"""
+    if path == '/api/health' or not path.startswith(('/api/', '/predict', '/enhanced', '/market-trends')):
+        return []
+    if path.startswith(('/api/predict', '/predict')):
+        return ['dataset', 'enhanced_model', 'legacy_model']
+    return ['dataset']
 
-price_range = {'min': int(car['Price'].min()), 'max': int(car['Price'].max())}
+
+@app.before_request
+def pin_dataset_version():
+    needed = startup_requirements(request.path)
+    if needed and not warmup.wait(needed, STARTUP_WAIT_TIMEOUT):
+        return jsonify({"error": "Service is starting up, please retry shortly", "subsystems": warmup.report()}), 503
+
+    # Every read in this request uses the same table, catalogs and indexes
+    g.dataset = dataset_store.active
+
+
+@app.after_request
+def add_dataset_version_header(response):
+    version = g.get('dataset')
+    if version is not None:
+        response.headers['X-Dataset-Version'] = version.version
+    return response
 
 
 
@@ -503,7 +640,13 @@ price_range = {'min': int(car['Price'].min()), 'max': int(car['Price'].max())}
 
 def health_check():
 
-    return jsonify({"status": "healthy", "message": "Car Price Predictor API is running"})
+    # Answers during warm-up; ?ready=1 turns it into a readiness probe
+    ready = warmup.ready()
+    response = {"status": "healthy", "message": "Car Price Predictor API is running",
+                "ready": ready, "subsystems": warmup.report()}
+    if request.args.get('ready') and not ready:
+        return jsonify(response), 503
+    return jsonify(response)
 
 
 
@@ -511,7 +654,7 @@ def health_check():
 
 def get_companies():
 
-    return jsonify(companies)
+    return jsonify(request_dataset().catalogs['companies'])
 
 
 
@@ -519,7 +662,7 @@ def get_companies():
 
 def get_all_models():
 
-    return jsonify(models)
+    return jsonify(request_dataset().catalogs['models'])
 
 
 
@@ -527,6 +670,10 @@ def get_all_models():
 
 def get_models_by_company(company):
 
+    car = request_dataset().frame
+
+    company, _ = resolve_car_names(company, None)
+
     company_models = car[car['company'] == company]['model'].unique()
 
     return jsonify(sorted(company_models))
@@ -539,6 +686,8 @@ def get_models_by_company_and_year(company, year):
 
     """Get models for a specific company and year with optional fuel type filtering"""
 
+    car = request_dataset().frame
+
     try:
 
         # Get fuel_type from query parameters
@@ -698,7 +847,7 @@ def get_years():
 
 def get_fuel_types():
 
-    return jsonify(fuel_types)
+    return jsonify(request_dataset().catalogs['fuel_types'])
 
 
 
@@ -706,7 +855,7 @@ def get_fuel_types():
 
 def get_transmission_types():
 
-    return jsonify(transmission_types)
+    return jsonify(request_dataset().catalogs['transmission_types'])
 
 
 
@@ -714,7 +863,7 @@ def get_transmission_types():
 
 def get_owner_types():
 
-    return jsonify(owner_types)
+    return jsonify(request_dataset().catalogs['owner_types'])
 
 
 
@@ -722,7 +871,7 @@ def get_owner_types():
 
 def get_condition_types():
 
-    return jsonify(condition_types)
+    return jsonify(request_dataset().catalogs['condition_types'])
 
 
 
@@ -740,7 +889,7 @@ def get_insurance_types():
 
 def get_cities():
 
-    return jsonify(cities)
+    return jsonify(request_dataset().catalogs['cities'])
 
 
 
@@ -780,7 +929,7 @@ def get_maintenance_levels():
 
 def get_owner_counts():
 
-    return jsonify(owner_types)
+    return jsonify(request_dataset().catalogs['owner_types'])
 
 
 
@@ -790,29 +939,35 @@ def get_owner_counts():
 
 def get_dataset_info():
 
+    dataset = request_dataset()
+
+    catalogs = dataset.catalogs
+
     info = {
 
-        'total_companies': len(companies),
+        'total_companies': len(catalogs['companies']),
+
+        'total_models': len(catalogs['models']),
 
-        'total_models': len(models),
+        'total_records': len(dataset.frame),
 
-        'total_records': len(car),
+        'year_range': catalogs['year_range'],
 
-        'year_range': year_range,
+        'kms_range': catalogs['kms_range'],
 
-        'kms_range': kms_range,
+        'price_range': catalogs['price_range'],
 
-        'price_range': price_range,
+        'fuel_types': catalogs['fuel_types'],
 
-        'fuel_types': fuel_types,
+        'transmission_types': catalogs['transmission_types'],
 
-        'transmission_types': transmission_types,
+        'owner_types': catalogs['owner_types'],
 
-        'owner_types': owner_types,
+        'condition_types': catalogs['condition_types'],
 
-        'condition_types': condition_types,
+        'cities': catalogs['cities'],
 
-        'cities': cities
+        'dataset_version': dataset.version
 
     }
 
@@ -820,6 +975,56 @@ def get_dataset_info():
 
 
 
+# Cursor pagination (limit/cursor) and streamed bodies for the listing endpoints
+from listing_pages import (STREAM_CHUNK_ROWS, PaginationError, cursor_key, decode_cursor, encode_cursor,
+                           iter_record_chunks, paginate, parse_limit, query_scope, resume_offset, stream_json,
+                           stream_ndjson)
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def listing_page(row_ids, rows, scope, default_limit=None, values=None, descending=False):
+    """The request's page of ``row_ids`` (of all ``rows`` if None): (ids, next cursor or None).
+
+    ``values`` is the sort column when ``row_ids`` is ordered by it rather
+    than by table position.
+    """
+    limit = parse_limit(request.args.get('limit'), default_limit)
+    cursor = request.args.get('cursor')
+    offset = resume_offset(row_ids, rows, decode_cursor(cursor, scope), values, descending) if cursor else 0
+    ids, next_offset = paginate(row_ids, rows, offset, limit)
+    if next_offset is None:
+        return ids, None
+    return ids, encode_cursor(scope, cursor_key(row_ids, next_offset, values))
+
+
+def compact_dumps(value):
+    return app.json.dumps(value, separators=(',', ':'))
+
+
+def listing_response(frame, ids, total, next_cursor, fields):
+    """The page's rows under 'cars' plus ``fields``.
+
+    NDJSON (one row per line) with ?format=ndjson or Accept: application/x-ndjson;
+    otherwise JSON, streamed a chunk of rows at a time when the page is larger
+    than one chunk.
+    """
+    if request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == NDJSON_MIMETYPE:
+        response = Response(stream_ndjson(iter_record_chunks(frame, ids, to_records=listing_records), compact_dumps),
+                            mimetype=NDJSON_MIMETYPE)
+    elif len(ids) <= STREAM_CHUNK_ROWS:
+        response = jsonify({'cars': listing_records(frame.take(ids)), **fields})
+    else:
+        response = Response(stream_json(fields, 'cars', iter_record_chunks(frame, ids, to_records=listing_records),
+                                        compact_dumps),
+                            mimetype='application/json')
+    response.headers['X-Total-Count'] = str(total)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+
+
 # Query endpoints for car data
 
 @app.route('/api/cars')
@@ -830,6 +1035,8 @@ def get_cars():
 
     """Get all cars with optional filtering"""
 
+    car = request_dataset().frame
+
     try:
 
         # Get query parameters
@@ -842,10 +1049,6 @@ def get_cars():
 
         city = request.args.get('city')
 
-        limit = int(request.args.get('limit', 50))  # Default limit
-
-        
-
         # Get user ID from token if available
 
         user_id = None
@@ -880,57 +1083,67 @@ def get_cars():
 
             # Use the user-specific data loading function
 
-            filtered_cars = app.config['load_car_data_for_user'](user_id).copy()
+            frame = app.config['load_car_data_for_user'](user_id)
 
-            print(f"[INFO] Loaded user-specific data: {len(filtered_cars)} records")
+            print(f"[INFO] Loaded user-specific data: {len(frame)} records")
 
-        else:
+            scope = query_scope(f"user:{user_id}", request.args.items(multi=True))
 
-            # Start with all cars from global dataset
+            
 
-            filtered_cars = car.copy()
+            # Apply filters (one mask, no copy of the table)
 
-        
+            mask = np.ones(len(frame), dtype=bool)
 
-        # Apply filters
+            for column, value in [('company', company), ('model', model), ('city', city)]:
 
-        if company:
+                if value:
 
-            filtered_cars = filtered_cars[filtered_cars['company'] == company]
+                    mask &= (frame[column] == value).to_numpy()
 
-        if model:
+            if year:
 
-            filtered_cars = filtered_cars[filtered_cars['model'] == model]
+                mask &= (frame['year'] == int(year)).to_numpy()
 
-        if year:
+            row_ids = np.flatnonzero(mask)
 
-            filtered_cars = filtered_cars[filtered_cars['year'] == int(year)]
+        else:
 
-        if city:
+            # Global dataset: filters are lookups in the listing index
 
-            filtered_cars = filtered_cars[filtered_cars['city'] == city]
+            frame = car
 
-        
+            scope = query_scope('cars', request.args.items(multi=True))
+
+            index = request_dataset().listing_index
+
+            filters = {column: value for column, value in [('company', company), ('model', model), ('city', city)] if value}
+
+            row_ids = index.match(filters)
 
-        # Limit results
+            if year:
 
-        filtered_cars = filtered_cars.head(limit)
+                row_ids = index.range_match('year', int(year), int(year), row_ids)
 
         
 
-        # Convert to list of dictionaries
+        # Limit results (next pages via cursor)
 
-        cars_list = filtered_cars.to_dict('records')
+        total_matching = len(frame) if row_ids is None else len(row_ids)
+
+        page_ids, next_cursor = listing_page(row_ids, len(frame), scope, default_limit=50)
 
         
 
-        return jsonify({
+        return listing_response(frame, page_ids, total_matching, next_cursor, {
 
-            'cars': cars_list,
+            'total_found': len(page_ids),
 
-            'total_found': len(cars_list),
+            'total_in_dataset': len(page_ids),
 
-            'total_in_dataset': len(filtered_cars),
+            'total_matching': total_matching,
+
+            'next_cursor': next_cursor,
 
             'user_specific': user_id is not None
 
@@ -938,6 +1151,12 @@ def get_cars():
 
     
 
+    except PaginationError as e:
+
+        return jsonify({"error": str(e)}), 400
+
+    
+
     except Exception as e:
 
         return jsonify({"error": str(e)}), 500
@@ -952,6 +1171,8 @@ def get_car_by_id(car_id):
 
     """Get specific car by ID"""
 
+    car = request_dataset().frame
+
     try:
 
         car_data = car[car['car_id'] == car_id]
@@ -962,7 +1183,7 @@ def get_car_by_id(car_id):
 
         
 
-        return jsonify(car_data.iloc[0].to_dict())
+        return jsonify(listing_records(car_data.iloc[:1])[0])
 
     
 
@@ -972,6 +1193,15 @@ def get_car_by_id(car_id):
 
 
 
+# /api/cars/search sort values: (column, descending)
+SEARCH_SORT_OPTIONS = {
+    'price_asc': ('Price', False), 'price_desc': ('Price', True),
+    'year_asc': ('year', False), 'year_desc': ('year', True),
+    'kms_asc': ('kilometers_driven', False), 'kms_desc': ('kilometers_driven', True)
+}
+
+
+
 @app.route('/api/cars/search')
 
 @cross_origin()
@@ -980,6 +1210,8 @@ def search_cars():
 
     """Advanced search for cars"""
 
+    car = request_dataset().frame
+
     try:
 
         # Get search parameters
@@ -1002,83 +1234,102 @@ def search_cars():
 
         condition = request.args.get('condition')
 
-        
+        min_kms = request.args.get('min_kms')
+
+        max_kms = request.args.get('max_kms')
 
-        # Start with all cars
+        sort = request.args.get('sort')
 
-        filtered_cars = car.copy()
+        did_you_mean = []
+
+        if sort and sort not in SEARCH_SORT_OPTIONS:
+
+            return jsonify({"error": f"sort must be one of: {', '.join(SEARCH_SORT_OPTIONS)}"}), 400
 
         
 
-        # Text search in company and model
+        # Categorical filters: intersect the index's row ids, shortest list first
 
-        if query:
+        index = request_dataset().listing_index
 
-            filtered_cars = filtered_cars[
+        categorical_filters = {
 
-                filtered_cars['company'].str.lower().str.contains(query) |
+            column: value
 
-                filtered_cars['model'].str.lower().str.contains(query)
+            for column, value in [('fuel_type', fuel_type), ('transmission', transmission),
 
-            ]
+                                  ('owner', owner), ('car_condition', condition)]
+
+            if value
+
+        }
+
+        row_ids = index.match(categorical_filters)
 
         
 
-        # Price range filter
+        # Text search in company and model (substring lookups in the index's n-gram text index)
+
+        if query:
+
+            text_ids = index.text_match(query, ['company', 'model'])
 
-        if min_price:
+            # Nothing contains the query: take the closest names instead (typos)
 
-            filtered_cars = filtered_cars[filtered_cars['Price'] >= int(min_price)]
+            if not len(text_ids):
 
-        if max_price:
+                text_ids, did_you_mean = index.fuzzy_match(query, ['company', 'model'])
 
-            filtered_cars = filtered_cars[filtered_cars['Price'] <= int(max_price)]
+            row_ids = text_ids if row_ids is None else intersect_sorted(row_ids, text_ids)
 
         
 
-        # Year range filter
+        # Price, year and kilometer ranges: binary search in the presorted columns
 
-        if min_year:
+        for column, low, high in [('Price', min_price, max_price), ('year', min_year, max_year),
 
-            filtered_cars = filtered_cars[filtered_cars['year'] >= int(min_year)]
+                                  ('kilometers_driven', min_kms, max_kms)]:
 
-        if max_year:
+            if low or high:
 
-            filtered_cars = filtered_cars[filtered_cars['year'] <= int(max_year)]
+                row_ids = index.range_match(column, int(low) if low else None, int(high) if high else None, row_ids)
 
         
 
-        # Categorical filters
+        # Sorted output is read off the column's presorted permutation
 
-        if fuel_type:
+        if sort:
 
-            filtered_cars = filtered_cars[filtered_cars['fuel_type'] == fuel_type]
+            row_ids = index.sorted_ids(SEARCH_SORT_OPTIONS[sort][0], row_ids, descending=SEARCH_SORT_OPTIONS[sort][1])
 
-        if transmission:
+        
 
-            filtered_cars = filtered_cars[filtered_cars['transmission'] == transmission]
+        # One page (all matches without limit/cursor); only its rows are materialized
 
-        if owner:
+        total_found = len(car) if row_ids is None else len(row_ids)
 
-            filtered_cars = filtered_cars[filtered_cars['owner'] == owner]
+        scope = query_scope('search', request.args.items(multi=True))
 
-        if condition:
+        if sort:
 
-            filtered_cars = filtered_cars[filtered_cars['car_condition'] == condition]
+            sorted_column = index.ranges[SEARCH_SORT_OPTIONS[sort][0]].values
 
-        
+            page_ids, next_cursor = listing_page(row_ids, len(car), scope, values=sorted_column,
+                                                 descending=SEARCH_SORT_OPTIONS[sort][1])
 
-        # Convert to list of dictionaries
+        else:
 
-        cars_list = filtered_cars.to_dict('records')
+            page_ids, next_cursor = listing_page(row_ids, len(car), scope)
 
         
 
-        return jsonify({
+        return listing_response(car, page_ids, total_found, next_cursor, {
 
-            'cars': cars_list,
+            'total_found': total_found,
 
-            'total_found': len(cars_list),
+            'next_cursor': next_cursor,
+
+            'did_you_mean': did_you_mean,
 
             'search_params': {
 
@@ -1098,7 +1349,13 @@ def search_cars():
 
                 'owner': owner,
 
-                'condition': condition
+                'condition': condition,
+
+                'min_kms': min_kms,
+
+                'max_kms': max_kms,
+
+                'sort': sort
 
             }
 
@@ -1106,143 +1363,179 @@ def search_cars():
 
     
 
+    except PaginationError as e:
+
+        return jsonify({"error": str(e)}), 400
+
+    
+
     except Exception as e:
 
         return jsonify({"error": str(e)}), 500
 
 
 
-@app.route('/api/predict', methods=['POST'])
-@cross_origin()
-def predict():
-    try:
-        # Accept both JSON and form data for flexibility
-        if request.is_json:
-            data = request.get_json()
-        else:
-            data = request.form.to_dict()
-        
-        # Extract all possible fields with defaults
-        car_data = {
-            'company': data.get('company'),
-            'model': data.get('model') or data.get('car_models'),
-            'year': int(data.get('year', 2018)),
-            'kilometers_driven': int(data.get('kilometers_driven', 50000) or data.get('kms_driven', 50000) or data.get('kilo_driven', 50000)),
-            'fuel_type': data.get('fuel_type', 'Petrol'),
-            'transmission': data.get('transmission', 'Manual'),
-            'owner_count': data.get('owner_count', 1),
-            'car_condition': data.get('car_condition', 'Good'),
-            'city': data.get('city', 'Delhi'),
-            'previous_accidents': data.get('previous_accidents', 0),
-            'num_doors': data.get('num_doors', 4),
-            'engine_size': data.get('engine_size', 1200),
-            'power': data.get('power', 100)
-        }
+# Fallback specs for cars the feature store knows nothing about
+SPEC_DEFAULTS = {'num_doors': 4, 'engine_size': 1200, 'power': 100}
+
+
+def build_car_data(data):
+    """Extract prediction fields from a request payload.
+
+    Returns a ``(car_data, error)`` tuple; ``error`` is a message suitable for
+    a 400 response when the payload is missing fields or has bad numbers.
+    """
+    # Extract all possible fields with defaults
+    car_data = {
+        'company': data.get('company'),
+        'model': data.get('model') or data.get('car_models'),
+        'year': int(data.get('year', 2018)),
+        'kilometers_driven': int(data.get('kilometers_driven', 50000) or data.get('kms_driven', 50000) or data.get('kilo_driven', 50000)),
+        'fuel_type': data.get('fuel_type', 'Petrol'),
+        'transmission': data.get('transmission', 'Manual'),
+        'owner_count': data.get('owner_count', 1),
+        'car_condition': data.get('car_condition', 'Good'),
+        'city': data.get('city', 'Delhi'),
+        'previous_accidents': data.get('previous_accidents', 0),
+        'num_doors': data.get('num_doors'),
+        'engine_size': data.get('engine_size'),
+        'power': data.get('power')
+    }
 
-        # Validate required fields
-        required_fields = ['company', 'model']
-        missing_fields = [field for field in required_fields if not car_data[field]]
-        
-        if missing_fields:
-            return jsonify({
-                "error": f"Missing required fields: {', '.join(missing_fields)}"
+    # Validate required fields
+    required_fields = ['company', 'model']
+    missing_fields = [field for field in required_fields if not car_data[field]]
 
-            }), 400
+    if missing_fields:
+        return None, f"Missing required fields: {', '.join(missing_fields)}"
 
+    # Misspelt or partial names are matched to the dataset's spelling
+    car_data['company'], car_data['model'] = resolve_car_names(car_data['company'], car_data['model'])
 
+    # Unspecified specs default to what is typical for this car in the dataset
+    for field, default in SPEC_DEFAULTS.items():
+        if car_data[field] is None or car_data[field] == '':
+            car_data[field] = request_dataset().feature_store.typical_spec(
+                car_data['company'], car_data['model'], car_data['year'], field, default
+            )
 
-        # Convert numeric fields
+    # Convert numeric fields
+    try:
+        car_data['year'] = int(car_data['year'])
+        car_data['kilometers_driven'] = int(car_data['kilometers_driven'])
+        car_data['previous_accidents'] = int(car_data['previous_accidents'])
+        car_data['num_doors'] = int(car_data['num_doors'])
+        car_data['engine_size'] = int(car_data['engine_size'])
+        car_data['power'] = int(car_data['power'])
+    except (ValueError, TypeError) as e:
+        return None, f"Invalid numeric values: {str(e)}"
 
-        try:
+    return car_data, None
 
-            car_data['year'] = int(car_data['year'])
 
-            car_data['kilometers_driven'] = int(car_data['kilometers_driven'])
 
-            car_data['previous_accidents'] = int(car_data['previous_accidents'])
+def apply_price_breakdown(prediction_result, car_data, data):
+    """Apply showroom depreciation and GST to a prediction result in place.
 
-            car_data['num_doors'] = int(car_data['num_doors'])
+    Returns ``(base_price, gst_percentage, final_price)``.
+    """
+    # Determine GST percentage from input or year mapping
+    try:
+        provided_gst = data.get('gst_percentage') if isinstance(data, dict) else None
+        gst_percentage = float(provided_gst) if provided_gst not in (None, '') else None
+    except Exception:
+        gst_percentage = None
+    if gst_percentage is None:
+        gst_percentage = float(gst_rates.get(int(car_data.get('year', 2018)), DEFAULT_GST_PERCENTAGE))
+
+    base_price = float(prediction_result.get('prediction'))
+
+    # Apply showroom depreciation if it's a new car
+    is_showroom_new = car_data.get('is_showroom_new', False)
+    if is_showroom_new or car_data.get('kilometers_driven', 5000) < 1000:
+        # Determine price category for depreciation rate
+        if base_price < 500000:
+            price_category = 'Budget'
+            depreciation_rate = 15
+        elif base_price < 1000000:
+            price_category = 'Mid-Range'
+            depreciation_rate = 20
+        elif base_price < 2000000:
+            price_category = 'Premium'
+            depreciation_rate = 25
+        else:
+            price_category = 'Luxury'
+            depreciation_rate = 30
 
-            car_data['engine_size'] = int(car_data['engine_size'])
+        # Apply depreciation
+        depreciated_price = base_price * (1 - (depreciation_rate / 100))
+        prediction_result['is_showroom_new'] = True
+        prediction_result['depreciation_rate'] = depreciation_rate
+        prediction_result['original_price'] = base_price
+        base_price = depreciated_price
 
-            car_data['power'] = int(car_data['power'])
+    # Apply GST
+    final_price = round(base_price + (base_price * gst_percentage / 100.0), 2)
 
-        except (ValueError, TypeError) as e:
+    # Enrich response with GST details
+    prediction_result['base_price'] = base_price
+    prediction_result['gst_percentage'] = gst_percentage
+    prediction_result['final_price'] = final_price
 
-            return jsonify({
+    return base_price, gst_percentage, final_price
 
-                "error": f"Invalid numeric values: {str(e)}"
 
-            }), 400
 
+@app.route('/api/predict', methods=['POST'])
+@cross_origin()
+def predict():
+    try:
+        # Accept both JSON and form data for flexibility
+        if request.is_json:
+            data = request.get_json()
+        else:
+            data = request.form.to_dict()
 
+        car_data, error = build_car_data(data)
 
-        # Use enhanced model if available, with fallback to legacy
+        if error:
+            return jsonify({"error": error}), 400
 
-        if enhanced_model is not None:
+        # Repeated specs are served from the prediction cache
+        cache_version = prediction_cache_version()
+        prediction_cache.sync_version(cache_version)
+        cache_key = make_cache_key('predict', car_data)
+        prediction_result = prediction_cache.get(cache_key)
 
-            try:
+        if prediction_result is None:
 
-                prediction_result = predict_with_enhanced_model(car_data)
+            # Use enhanced model if available, with fallback to legacy
 
-            except Exception as e:
+            if enhanced_model is not None:
 
-                print(f"Enhanced model prediction error: {str(e)}")
+                try:
 
-                print("Falling back to legacy model")
+                    prediction_result = predict_with_enhanced_model(car_data)
 
-                prediction_result = predict_with_legacy_model(car_data)
+                except Exception as e:
 
-        else:
+                    print(f"Enhanced model prediction error: {str(e)}")
 
-            prediction_result = predict_with_legacy_model(car_data)
+                    print("Falling back to legacy model")
 
-        
+                    prediction_result = predict_with_legacy_model(car_data)
 
-        
+            else:
 
-        # Determine GST percentage from input or year mapping
-        try:
-            provided_gst = data.get('gst_percentage') if isinstance(data, dict) else None
-            gst_percentage = float(provided_gst) if provided_gst not in (None, '') else None
-        except Exception:
-            gst_percentage = None
-        if gst_percentage is None:
-            gst_percentage = float(gst_rates.get(int(car_data.get('year', 2018)), DEFAULT_GST_PERCENTAGE))
+                prediction_result = predict_with_legacy_model(car_data)
 
-        base_price = float(prediction_result.get('prediction'))
-        
-        # Apply showroom depreciation if it's a new car
-        is_showroom_new = car_data.get('is_showroom_new', False)
-        if is_showroom_new or car_data.get('kilometers_driven', 5000) < 1000:
-            # Determine price category for depreciation rate
-            if base_price < 500000:
-                price_category = 'Budget'
-                depreciation_rate = 15
-            elif base_price < 1000000:
-                price_category = 'Mid-Range'
-                depreciation_rate = 20
-            elif base_price < 2000000:
-                price_category = 'Premium'
-                depreciation_rate = 25
-            else:
-                price_category = 'Luxury'
-                depreciation_rate = 30
-                
-            # Apply depreciation
-            depreciated_price = base_price * (1 - (depreciation_rate / 100))
-            prediction_result['is_showroom_new'] = True
-            prediction_result['depreciation_rate'] = depreciation_rate
-            prediction_result['original_price'] = base_price
-            base_price = depreciated_price
-        
-        # Apply GST
-        final_price = round(base_price + (base_price * gst_percentage / 100.0), 2)
+            prediction_result.setdefault('model_version', legacy_model_version)
+            prediction_result.setdefault('dataset_version', request_dataset().version)
+            prediction_cache.set(cache_key, prediction_result, version=cache_version)
 
-        # Enrich response with GST details
-        prediction_result['base_price'] = base_price
-        prediction_result['gst_percentage'] = gst_percentage
-        prediction_result['final_price'] = final_price
+
+        base_price, gst_percentage, final_price = apply_price_breakdown(prediction_result, car_data, data)
+        note_resolved_names(prediction_result, data, car_data)
 
         # Store prediction in MongoDB if available and user is authenticated
 
@@ -1275,13 +1568,13 @@ def predict():
 
                 print(f"[WARNING] Failed to store prediction: {str(e)}")
 
-        
+
 
         # Log both for analysis
         print(f"Prediction (base): {base_price} | GST %: {gst_percentage} | Final: {final_price}")
         return jsonify(prediction_result)
 
-    
+
 
     except Exception as e:
 
@@ -1291,356 +1584,714 @@ def predict():
 
 
 
-def predict_with_enhanced_model(car_data):
+# Upper bound on cars accepted by a single /api/predict/batch request
+MAX_BATCH_SIZE = 10000
 
-    """Predict using the comprehensive model with robust error handling"""
-    try:
 
-        # Create input data dictionary with proper feature order
-        input_data = {}
-
-        
+@app.route('/api/predict/batch', methods=['POST'])
+@cross_origin()
+def predict_batch():
+    """Value a whole inventory with a single model call"""
+    try:
+        data = request.get_json(silent=True)
+        if isinstance(data, list):
+            data = {'cars': data}
+        if not isinstance(data, dict) or not isinstance(data.get('cars'), list):
+            return jsonify({"error": "Request body must be a JSON list of cars or an object with a 'cars' list"}), 400
+
+        cars = data['cars']
+        if len(cars) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"Batch too large: {len(cars)} cars (maximum {MAX_BATCH_SIZE})"}), 400
+
+        include_car_info = str(data.get('include_car_info', '')).lower() in ['1', 'true', 'yes']
+
+        # Validate every row first so one bad car does not fail the batch
+        results = [None] * len(cars)
+        valid_rows = []
+        for index, item in enumerate(cars):
+            if not isinstance(item, dict):
+                results[index] = {'index': index, 'error': 'Each car must be a JSON object'}
+                continue
+            try:
+                car_data, error = build_car_data(item)
+            except (ValueError, TypeError) as e:
+                car_data, error = None, f"Invalid numeric values: {str(e)}"
+            if error:
+                results[index] = {'index': index, 'error': error}
+            else:
+                valid_rows.append((index, item, car_data))
 
-        # Helper function to safely get values
-        def safe_get(key, default_value):
+        # One feature matrix and one predict call for all valid rows
+        batch_predictions = None
+        if valid_rows and enhanced_model is not None:
             try:
-                value = car_data.get(key, default_value)
-                if value is None or value == '' or str(value).lower() == 'nan':
-                    return default_value
-                return value
-            except:
-                return default_value
-        
-        # Add categorical features in exact order
-        input_data['company'] = str(safe_get('company', 'Maruti Suzuki')).strip()
-        input_data['model'] = str(safe_get('model', 'Alto')).strip()
-        input_data['fuel_type'] = str(safe_get('fuel_type', 'Petrol')).strip()
-        input_data['transmission'] = str(safe_get('transmission', 'Manual')).strip()
-        input_data['owner_count'] = str(safe_get('owner_count', '1st')).strip()
-        input_data['car_condition'] = str(safe_get('car_condition', 'Good')).strip()
-        input_data['city'] = str(safe_get('city', 'Delhi')).strip()
-        input_data['emission_norm'] = str(safe_get('emission_norm', 'BS-IV')).strip()
-        input_data['maintenance_level'] = str(safe_get('maintenance_level', 'Medium')).strip()
-        input_data['insurance_eligible'] = str(safe_get('insurance_eligible', 'Yes')).strip()
-        input_data['listing_type'] = str(safe_get('listing_type', 'Dealer')).strip()
-        
-        # Add numerical features in exact order with robust conversion
-        try:
-            input_data['year'] = int(float(safe_get('year', 2015)))
-        except:
-            input_data['year'] = 2015
-            
-        try:
-            input_data['kilometers_driven'] = int(float(safe_get('kilometers_driven', 50000)))
-        except:
-            input_data['kilometers_driven'] = 50000
-            
-        try:
-            input_data['engine_size'] = int(float(safe_get('engine_size', 1200)))
-        except:
-            input_data['engine_size'] = 1200
-            
-        try:
-            input_data['power'] = int(float(safe_get('power', 80)))
-        except:
-            input_data['power'] = 80
-            
-        try:
-            input_data['num_doors'] = int(float(safe_get('num_doors', 4)))
-        except:
-            input_data['num_doors'] = 4
-            
-        try:
-            input_data['previous_accidents'] = int(float(safe_get('previous_accidents', 0)))
-        except:
-            input_data['previous_accidents'] = 0
-        
-        # Feature engineering with robust calculations
-        try:
-            current_year = datetime.now().year
-        except Exception:
-            current_year = 2025
-        input_data['age'] = max(0, current_year - input_data['year'])
-        
-        # Calculate price_per_km based on similar cars in dataset
-        try:
-            similar_cars = car[(car['company'] == input_data['company']) & 
-                              (car['model'] == input_data['model']) & 
-                              (car['year'] == input_data['year'])]
-            if len(similar_cars) > 0:
-                avg_price = similar_cars['Price'].mean()
-                input_data['price_per_km'] = avg_price / (input_data['kilometers_driven'] + 1)
+                batch_predictions = predict_batch_with_enhanced_model(
+                    [car_data for _, _, car_data in valid_rows],
+                    include_car_info=include_car_info
+                )
+            except Exception as e:
+                print(f"Batch enhanced prediction error: {str(e)}")
+                print("Falling back to per-car predictions")
+
+        for position, (index, item, car_data) in enumerate(valid_rows):
+            if batch_predictions is not None:
+                prediction_result = batch_predictions[position]
             else:
+                # Same per-car fallback chain as /api/predict
+                prediction_result = None
+                if enhanced_model is not None:
+                    try:
+                        prediction_result = predict_with_enhanced_model(car_data)
+                        if not include_car_info:
+                            prediction_result.pop('car_info', None)
+                    except Exception as e:
+                        print(f"Enhanced model prediction error: {str(e)}")
+                if prediction_result is None:
+                    prediction_result = predict_with_legacy_model(car_data)
+                    prediction_result.setdefault('model_version', legacy_model_version)
+                    prediction_result.setdefault('dataset_version', request_dataset().version)
+
+            # Per-car gst_percentage wins over a batch-wide one
+            pricing_input = item if item.get('gst_percentage') not in (None, '') else data
+            apply_price_breakdown(prediction_result, car_data, pricing_input)
+            note_resolved_names(prediction_result, item, car_data)
+            prediction_result['index'] = index
+            results[index] = prediction_result
+
+        succeeded = sum(1 for result in results if 'error' not in result)
+        print(f"Batch prediction: {succeeded}/{len(cars)} cars valued")
 
-                # Fallback calculation based on brand
-                brand_cars = car[car['company'] == input_data['company']]
-                if len(brand_cars) > 0:
-                    avg_price = brand_cars['Price'].mean()
-                    input_data['price_per_km'] = avg_price / (input_data['kilometers_driven'] + 1)
-                else:
+        return jsonify({
+            'results': results,
+            'total': len(cars),
+            'succeeded': succeeded,
+            'failed': len(cars) - succeeded
+        })
 
-                    input_data['price_per_km'] = 1000000 / (input_data['kilometers_driven'] + 1)
-        except:
-            input_data['price_per_km'] = 1000000 / (input_data['kilometers_driven'] + 1)
-        
-        try:
-            input_data['engine_power_ratio'] = float(input_data['power']) / (float(input_data['engine_size']) + 1)
-        except:
-            input_data['engine_power_ratio'] = 0.1
-        
-        # Binary features with robust conversion
-        input_data['is_electric'] = 1 if str(input_data['fuel_type']).lower() == 'electric' else 0
-        input_data['is_hybrid'] = 1 if str(input_data['fuel_type']).lower() == 'hybrid' else 0
-        input_data['is_automatic'] = 1 if str(input_data['transmission']).lower() == 'automatic' else 0
-        input_data['is_first_owner'] = 1 if str(input_data['owner_count']).lower() == '1st' else 0
-        input_data['is_certified'] = 0
-        
-        # Create DataFrame with features in exact order from the loaded model
-        if hasattr(enhanced_model_data, 'get') and enhanced_model_data.get('categorical_features'):
-            # Use feature order from the loaded model
-            feature_order = enhanced_model_data['categorical_features'] + enhanced_model_data['numerical_features']
-        else:
-            # Fallback to global feature order
-            feature_order = enhanced_categorical_columns + enhanced_numerical_features
-        
-        # Create DataFrame with proper data types
-        input_df = pd.DataFrame([input_data])
+    except Exception as e:
+        print(f"Error in batch prediction: {str(e)}")
+        return jsonify({"error": f"Unable to make batch prediction. {str(e)}"}), 500
 
-        
 
-        # Ensure all columns exist and are properly typed
-        for col in feature_order:
-            if col not in input_df.columns:
-                if col in enhanced_categorical_columns:
-                    input_df[col] = 'Unknown'
-                else:
-                    input_df[col] = 0.0
-        
-        # Reorder columns to match feature order
-        input_df = input_df[feature_order]
-        
-        # Ensure all numerical columns are properly typed
-        for col in enhanced_numerical_features:
-            if col in input_df.columns:
-                input_df[col] = pd.to_numeric(input_df[col], errors='coerce').fillna(0)
-        
-        # Ensure no NaN values in categorical columns
-        for col in enhanced_categorical_columns:
-            if col in input_df.columns:
-                input_df[col] = input_df[col].fillna('Unknown')
-        
-        # Final check for any remaining NaN values
-        input_df = input_df.fillna(0)
-        
-        # Make prediction
-        prediction = enhanced_model.predict(input_df)[0]
 
-        predicted_price = float(np.round(prediction, 2))
+@app.route('/api/predict/cache-stats')
+@cross_origin()
+def prediction_cache_stats():
+    """Hit/miss counters for sizing the prediction cache"""
+    prediction_cache.sync_version(prediction_cache_version())
+    return jsonify(prediction_cache.stats())
+
 
-        
 
-        # Calculate confidence based on model performance
+def check_admin_token():
+    """Error response unless the request carries ADMIN_API_TOKEN (None if allowed)"""
+    expected = os.getenv('ADMIN_API_TOKEN')
+    if not expected:
+        return jsonify({"error": "Admin endpoints are disabled (set ADMIN_API_TOKEN)"}), 403
+    if request.headers.get('X-Admin-Token') != expected:
+        return jsonify({"error": "Invalid admin token"}), 403
+    return None
 
-        r2_score = enhanced_performance.get('r2_score', 0.85)
 
-        confidence_score = min(95, max(60, int(r2_score * 100)))
+@app.route('/api/model')
+@cross_origin()
+def model_status():
+    """Active model version, loaded versions, the last reload and the active confidence calibration"""
+    stats = model_registry.stats()
+    stats['confidence_calibration'] = confidence_calibration(model_registry.active, dataset_store.active)
+    return jsonify(stats)
 
-        
 
-        # Get additional car information from dataset
+@app.route('/api/model/reload', methods=['POST'])
+@cross_origin()
+def reload_model():
+    """Load a model in the background and swap it in once warmed up.
 
-        car_info = get_car_info_from_dataset(car_data)
+    Body: optional ``path`` (a .pkl/.joblib in the app directory; default is the
+    usual candidate order) or ``version`` to roll back to a loaded version.
+    """
+    denied = check_admin_token()
+    if denied:
+        return denied
 
-        
+    data = request.get_json(silent=True) or {}
+    path = data.get('path')
+    version_id = data.get('version')
 
-        return {
+    if version_id:
+        try:
+            version = model_registry.rollback(version_id)
+        except KeyError:
+            return jsonify({"error": f"Model version '{version_id}' is not loaded"}), 404
+        return jsonify({'status': 'activated', 'active': version.describe()})
 
-            "prediction": predicted_price,
+    # Only plain artifact names next to the app: pickles can run code
+    if path is not None and (not isinstance(path, str) or os.path.basename(path) != path
+                             or not path.endswith(('.pkl', '.joblib')) or not os.path.exists(path)):
+        return jsonify({"error": "'path' must name an existing .pkl or .joblib file in the app directory"}), 400
 
-            "model_used": enhanced_model_name,
+    if not model_registry.reload(path):
+        return jsonify({"error": "A model reload is already running", 'reload': model_registry.status}), 409
+    return jsonify({'status': 'loading', 'reload': model_registry.status}), 202
 
-            "confidence_score": confidence_score,
 
-            "model_performance": {
+@app.route('/api/dataset')
+@cross_origin()
+def dataset_status():
+    """Active dataset version and the last reload"""
+    return jsonify(dataset_store.stats())
 
-                "r2_score": r2_score,
 
-                "rmse": enhanced_performance.get('rmse', 50000),
+@app.route('/api/dataset/reload', methods=['POST'])
+@cross_origin()
+def reload_dataset():
+    """Re-read the listings source (not its snapshot) in the background and swap in the new version with its catalogs and indexes"""
+    denied = check_admin_token()
+    if denied:
+        return denied
 
-                "mae": enhanced_performance.get('mae', 30000)
+    if not dataset_store.reload():
+        return jsonify({"error": "A dataset reload is already running", 'reload': dataset_store.status}), 409
+    return jsonify({'status': 'loading', 'reload': dataset_store.status}), 202
 
-            },
 
-            "features_used": len(enhanced_feature_names),
 
-            "car_info": car_info,
+# Upper bound on grid cells scored by a single /api/predict/sweep request
+MAX_SWEEP_CELLS = 2500
+DEFAULT_SWEEP_YEARS_AHEAD = list(range(0, 11))
 
-            "message": f"Comprehensive prediction using {enhanced_model_name} with {len(enhanced_feature_names)} features"
+
+def parse_sweep_axis(values, name, minimum, maximum):
+    """Validate one sweep axis; returns ``(values, error)``"""
+    if not isinstance(values, list) or not values:
+        return None, f"'{name}' must be a non-empty list of numbers"
+    try:
+        parsed = [int(value) for value in values]
+    except (ValueError, TypeError):
+        return None, f"'{name}' must be a non-empty list of numbers"
+    if any(value < minimum or value > maximum for value in parsed):
+        return None, f"'{name}' values must be between {minimum} and {maximum}"
+    return parsed, None
+
+
+@app.route('/api/predict/sweep', methods=['POST'])
+@cross_origin()
+def predict_sweep():
+    """Project a car's price across future years and kilometers in one model call.
+
+    Takes the /api/predict fields plus optional ``years_ahead`` (default 0-10)
+    and ``kilometers`` (default: the car's current kilometers). Returns
+    matrices indexed as ``[years_ahead][kilometers]``.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+
+        if enhanced_model is None:
+            return jsonify({"error": "Comprehensive model not available"}), 503
+
+        try:
+            car_data, error = build_car_data(data)
+        except (ValueError, TypeError) as e:
+            car_data, error = None, f"Invalid numeric values: {str(e)}"
+        if error:
+            return jsonify({"error": error}), 400
+
+        years_ahead, error = parse_sweep_axis(data.get('years_ahead', DEFAULT_SWEEP_YEARS_AHEAD), 'years_ahead', 0, 30)
+        if error:
+            return jsonify({"error": error}), 400
+        kilometers, error = parse_sweep_axis(data.get('kilometers', [car_data['kilometers_driven']]), 'kilometers', 0, 2000000)
+        if error:
+            return jsonify({"error": error}), 400
+
+        cells = len(years_ahead) * len(kilometers)
+        if cells > MAX_SWEEP_CELLS:
+            return jsonify({"error": f"Sweep too large: {cells} cells (maximum {MAX_SWEEP_CELLS})"}), 400
+
+        # Same car, older: age grows with years_ahead while the model year stays put
+        km_rows = [build_enhanced_features(dict(car_data, kilometers_driven=km)) for km in kilometers]
+        feature_rows = [
+            dict(row, age=row['age'] + offset)
+            for offset in years_ahead
+            for row in km_rows
+        ]
+
+        # The whole grid is one feature matrix and one predict call
+        active = model_registry.active
+        scored = predict_enhanced_rows(feature_rows, active)
+
+        # GST follows the same year/override rule as /api/predict, per cell
+        _, gst_percentage, _ = apply_price_breakdown({'prediction': 0.0}, dict(car_data, kilometers_driven=1000), data)
+
+        width = len(kilometers)
+        base_prices = [[None] * width for _ in years_ahead]
+        final_prices = [[None] * width for _ in years_ahead]
+        intervals = {}
+        for cell, (prediction, interval) in enumerate(scored):
+            i, j = divmod(cell, width)
+            base_price = float(np.round(prediction, 2))
+            base_prices[i][j] = base_price
+            final_prices[i][j] = round(base_price + (base_price * gst_percentage / 100.0), 2)
+            if interval is not None:
+                for quantile, value in zip(PREDICTION_INTERVAL_QUANTILES, interval):
+                    intervals.setdefault(f"p{quantile}", [[None] * width for _ in years_ahead])[i][j] = float(np.round(value, 2))
+
+        current_year = datetime.now().year
+        result = {
+            'car': car_data,
+            'years_ahead': years_ahead,
+            'valuation_years': [current_year + offset for offset in years_ahead],
+            'kilometers': kilometers,
+            'base_prices': base_prices,
+            'gst_percentage': gst_percentage,
+            'final_prices': final_prices,
+            'cells': cells,
+            'model_used': active.name,
+            'model_version': active.version,
+            'dataset_version': request_dataset().version
         }
+        if intervals:
+            result['prediction_intervals'] = intervals
+        note_resolved_names(result, data, car_data)
 
-    
+        return jsonify(result)
 
     except Exception as e:
+        print(f"Error in sweep prediction: {str(e)}")
+        return jsonify({"error": f"Unable to make sweep prediction. {str(e)}"}), 500
 
-        print(f"Enhanced model prediction error: {str(e)}")
 
-        import traceback
-        traceback.print_exc()
-        raise e
 
+# Derived model inputs, shared with the training scripts and the market analyzer
+from derived_features import MODEL_DERIVED_COLUMNS, derive_record
 
+DERIVED_COLUMNS_WITHOUT_RATIO = [name for name in MODEL_DERIVED_COLUMNS if name != 'engine_power_ratio']
 
-def get_car_info_from_dataset(car_data):
 
-    """Get comprehensive car information from dataset"""
+def build_enhanced_features(car_data):
+    """Build the comprehensive model's feature dict for one car"""
+    # Create input data dictionary with proper feature order
+    input_data = {}
 
+    # Helper function to safely get values
+    def safe_get(key, default_value):
+        try:
+            value = car_data.get(key, default_value)
+            if value is None or value == '' or str(value).lower() == 'nan':
+                return default_value
+            return value
+        except:
+            return default_value
+
+    # Add categorical features in exact order
+    input_data['company'] = str(safe_get('company', 'Maruti Suzuki')).strip()
+    input_data['model'] = str(safe_get('model', 'Alto')).strip()
+    input_data['fuel_type'] = str(safe_get('fuel_type', 'Petrol')).strip()
+    input_data['transmission'] = str(safe_get('transmission', 'Manual')).strip()
+    input_data['owner_count'] = str(safe_get('owner_count', '1st')).strip()
+    input_data['car_condition'] = str(safe_get('car_condition', 'Good')).strip()
+    input_data['city'] = str(safe_get('city', 'Delhi')).strip()
+    input_data['emission_norm'] = str(safe_get('emission_norm', 'BS-IV')).strip()
+    input_data['maintenance_level'] = str(safe_get('maintenance_level', 'Medium')).strip()
+    input_data['insurance_eligible'] = str(safe_get('insurance_eligible', 'Yes')).strip()
+    input_data['listing_type'] = str(safe_get('listing_type', 'Dealer')).strip()
+
+    # Add numerical features in exact order with robust conversion
     try:
+        input_data['year'] = int(float(safe_get('year', 2015)))
+    except:
+        input_data['year'] = 2015
 
-        # Filter dataset for similar cars
+    try:
+        input_data['kilometers_driven'] = int(float(safe_get('kilometers_driven', 50000)))
+    except:
+        input_data['kilometers_driven'] = 50000
 
-        similar_cars = car[
+    try:
+        input_data['engine_size'] = int(float(safe_get('engine_size', 1200)))
+    except:
+        input_data['engine_size'] = 1200
 
-            (car['company'] == car_data['company']) & 
+    try:
+        input_data['power'] = int(float(safe_get('power', 80)))
+    except:
+        input_data['power'] = 80
 
-            (car['model'] == car_data['model']) &
+    try:
+        input_data['num_doors'] = int(float(safe_get('num_doors', 4)))
+    except:
+        input_data['num_doors'] = 4
 
-            (car['year'] == car_data['year'])
+    try:
+        input_data['previous_accidents'] = int(float(safe_get('previous_accidents', 0)))
+    except:
+        input_data['previous_accidents'] = 0
 
-        ]
+    # Feature engineering with robust calculations
+    try:
+        current_year = datetime.now().year
+    except Exception:
+        current_year = 2025
 
-        
+    # price_per_km uses the average price of similar cars in place of the
+    # listing price being predicted
+    try:
+        avg_price = request_dataset().feature_store.price_mean(input_data['company'], input_data['model'], input_data['year'])
+    except:
+        avg_price = None
+    if avg_price is None:
+        avg_price = 1000000
+
+    # Age, price_per_km, engine_power_ratio and the is_* flags, defined as in training
+    record = dict(input_data, Price=avg_price)
+    try:
+        derived = derive_record(record, MODEL_DERIVED_COLUMNS, reference_year=current_year)
+    except ZeroDivisionError:
+        derived = derive_record(record, DERIVED_COLUMNS_WITHOUT_RATIO, reference_year=current_year)
+        derived['engine_power_ratio'] = 0.1
+    derived['age'] = max(0, derived['age'])
+    input_data.update(derived)
+    input_data['is_certified'] = 0
 
-        if similar_cars.empty:
+    return input_data
 
-            # If no exact match, find similar cars from the same company and year
 
-            similar_cars = car[
 
-                (car['company'] == car_data['company']) & 
+def build_enhanced_frame(feature_rows, active=None):
+    """Turn feature dicts into the DataFrame layout the loaded pipeline expects"""
+    active = active or model_registry.active
 
-                (car['year'] == car_data['year'])
+    # Create DataFrame with features in exact order from the loaded model
+    feature_order = active.categorical_features + active.numerical_features
 
-            ]
+    # Create DataFrame with proper data types
+    input_df = pd.DataFrame(feature_rows)
 
-        
+    # Ensure all columns exist and are properly typed
+    for col in feature_order:
+        if col not in input_df.columns:
+            if col in active.categorical_features:
+                input_df[col] = 'Unknown'
+            else:
+                input_df[col] = 0.0
 
-        if similar_cars.empty:
+    # Reorder columns to match feature order
+    input_df = input_df[feature_order]
 
-            # If still no match, find cars from the same company
+    # Ensure all numerical columns are properly typed
+    for col in active.numerical_features:
+        if col in input_df.columns:
+            input_df[col] = pd.to_numeric(input_df[col], errors='coerce').fillna(0)
 
-            similar_cars = car[car['company'] == car_data['company']]
+    # Ensure no NaN values in categorical columns
+    for col in active.categorical_features:
+        if col in input_df.columns:
+            input_df[col] = input_df[col].fillna('Unknown')
 
-        
+    # Final check for any remaining NaN values
+    return input_df.fillna(0)
 
-        if not similar_cars.empty:
 
-            # Calculate statistics
 
-            avg_price = similar_cars['Price'].mean()
+def build_enhanced_result(car_data, prediction, include_car_info=True, interval=None, active=None):
+    """Wrap a raw model output in the /api/predict response structure.
 
-            min_price = similar_cars['Price'].min()
+    ``interval`` holds the per-tree percentiles of PREDICTION_INTERVAL_QUANTILES;
+    ``active`` is the model version that produced the prediction.
+    """
+    active = active or model_registry.active
+    predicted_price = float(np.round(prediction, 2))
 
-            max_price = similar_cars['Price'].max()
+    r2_score = active.performance.get('r2_score', 0.85)
 
-            price_std = similar_cars['Price'].std()
+    # Calculate confidence based on model performance
+    confidence_score = min(95, max(60, int(r2_score * 100)))
 
-            
+    prediction_interval = None
+    coverage = None
+    if interval is not None:
+        prediction_interval = {
+            f"p{quantile}": float(np.round(value, 2))
+            for quantile, value in zip(PREDICTION_INTERVAL_QUANTILES, interval)
+        }
+        coverage = calibrated_confidence(active, prediction, interval)
+
+    result = {
+        "prediction": predicted_price,
+        "model_used": active.name,
+        "model_version": active.version,
+        "dataset_version": request_dataset().version,
+        "confidence_score": confidence_score,
+        "model_performance": {
+            "r2_score": r2_score,
+            "rmse": active.performance.get('rmse', 50000),
+            "mae": active.performance.get('mae', 30000)
+        },
+        "features_used": len(active.feature_names),
+        "message": f"Comprehensive prediction using {active.name} with {len(active.feature_names)} features"
+    }
+    if prediction_interval is not None:
+        result["prediction_interval"] = prediction_interval
+    if coverage is not None:
+        result["calibrated_confidence"] = coverage
 
-            # Get fuel type distribution
+    # Get additional car information from dataset
+    if include_car_info:
+        result["car_info"] = get_car_info_from_dataset(car_data)
 
-            fuel_distribution = similar_cars['fuel_type'].value_counts().to_dict()
+    return result
 
-            
 
-            # Get transmission distribution
 
-            transmission_distribution = similar_cars['transmission'].value_counts().to_dict()
+def predict_with_enhanced_model(car_data):
 
-            
+    """Predict using the comprehensive model with robust error handling"""
+    try:
+        features = build_enhanced_features(car_data)
 
-            # Get condition distribution
+        # Make prediction (coalesced with concurrent requests when batching is on)
+        if prediction_batcher is not None:
+            prediction, interval, active = prediction_batcher.submit(features)
+        else:
+            prediction, interval, active = predict_enhanced_batch([features])[0]
 
-            condition_distribution = similar_cars['car_condition'].value_counts().to_dict()
+        return build_enhanced_result(car_data, prediction, interval=interval, active=active)
 
-            
+    except Exception as e:
 
-            # Get city distribution
+        print(f"Enhanced model prediction error: {str(e)}")
 
-            city_distribution = similar_cars['city'].value_counts().head(10).to_dict()
+        import traceback
+        traceback.print_exc()
+        raise e
 
-            
 
-            # Get year range for this company/model
 
-            year_range = {
+def predict_batch_with_enhanced_model(car_data_list, include_car_info=False):
+    """Predict many cars with one feature matrix and a single model call"""
+    active = model_registry.active
+    feature_rows = [build_enhanced_features(car_data) for car_data in car_data_list]
+    scored = predict_enhanced_rows(feature_rows, active)
 
-                'min': int(similar_cars['year'].min()),
+    return [
+        build_enhanced_result(car_data, prediction, include_car_info=include_car_info, interval=interval, active=active)
+        for car_data, (prediction, interval) in zip(car_data_list, scored)
+    ]
 
-                'max': int(similar_cars['year'].max())
 
-            }
 
-            
+def compile_enhanced_fast_path(active):
+    """Compile the pandas-free single-row path and verify it against the pipeline"""
+    try:
+        from fast_inference import CompiledPipeline
 
-            # Get average kilometers
+        compiled = CompiledPipeline(active.model, active.categorical_features)
 
-            avg_kms = similar_cars['kilometers_driven'].mean()
+        # Verify on a few dataset rows plus one unseen spec before trusting it
+        feature_rows = [build_enhanced_features(sample) for sample in warmup_samples()]
+        if not compiled.verify(active.model, build_enhanced_frame(feature_rows, active), feature_rows):
+            print("[WARNING] Compiled inference path disagrees with the pipeline, not using it")
+            return None
 
-            
+        print(f"[OK] Compiled single-row inference path enabled for {active.version}")
+        return compiled
+    except Exception as e:
+        print(f"[WARNING] Compiled inference path not available: {str(e)}")
+        return None
 
-            return {
 
-                'similar_cars_found': len(similar_cars),
+def warmup_samples():
+    """Synthetic requests: a few dataset rows plus one spec the model never saw"""
+    car = request_dataset().frame
+    samples = car.head(8).to_dict('records') if not car.empty else []
+    samples.append({'company': 'Unknown Brand', 'model': 'Unknown Model', 'year': 2020})
+    return samples
 
-                'price_statistics': {
 
-                    'average': float(round(avg_price, 2)),
+# calibrated_confidence is the share of listings, among those whose trees
+# disagreed about as much, priced within CONFIDENCE_TOLERANCE of the
+# prediction. It is measured on the serving dataset, which the model is not
+# trained on (train_comprehensive_model.py uses enhanced_indian_car_dataset.csv),
+# so each dataset version keeps its own calibration per model version
+CONFIDENCE_TOLERANCE = float(os.getenv('CONFIDENCE_TOLERANCE', 0.2))
+CONFIDENCE_CALIBRATION_ROWS = int(os.getenv('CONFIDENCE_CALIBRATION_ROWS', 1000))
+CONFIDENCE_BINS = 10
 
-                    'minimum': float(round(min_price, 2)),
 
-                    'maximum': float(round(max_price, 2)),
+def relative_spread(predictions, intervals):
+    """P10-P90 width of the per-tree predictions relative to the prediction"""
+    intervals = np.asarray(intervals, dtype=float).reshape(-1, len(PREDICTION_INTERVAL_QUANTILES))
+    return (intervals[:, -1] - intervals[:, 0]) / np.maximum(np.abs(np.asarray(predictions, dtype=float)), 1.0)
 
-                    'standard_deviation': float(round(price_std, 2)) if not pd.isna(price_std) else 0.0
 
-                },
+def calibrate_confidence(active, dataset):
+    """Observed hit rate (price within tolerance of the prediction) per bin of relative spread"""
+    try:
+        car = dataset.frame
+        if active.fast_path is None or car.empty or 'Price' not in car.columns:
+            return None
+        listed = car[car['Price'] > 0]
+        sample = listed.sample(min(CONFIDENCE_CALIBRATION_ROWS, len(listed)), random_state=0)
+        if len(sample) < CONFIDENCE_BINS * 10:
+            return None
+
+        feature_rows = [build_enhanced_features(row) for row in sample.to_dict('records')]
+        predictions, intervals = active.fast_path.predict_intervals(feature_rows, PREDICTION_INTERVAL_QUANTILES)
+        if intervals is None:
+            return None
+        predictions = np.asarray(predictions, dtype=float)
+        spread = relative_spread(predictions, intervals)
+        hits = np.abs(sample['Price'].to_numpy(dtype=float) - predictions) <= CONFIDENCE_TOLERANCE * np.abs(predictions)
+
+        # Equal-count bins of spread; wider spreads are never reported as more confident
+        order = np.argsort(spread, kind='stable')
+        bins = np.array_split(order, CONFIDENCE_BINS)
+        centers = np.array([np.median(spread[rows]) for rows in bins])
+        coverage = np.minimum.accumulate(np.array([hits[rows].mean() for rows in bins]))
+        print(f"[OK] Confidence of model {active.version} calibrated on {len(sample)} listings of {dataset.version}: "
+              f"{coverage[0]:.0%} (spread {centers[0]:.2f}) to {coverage[-1]:.0%} (spread {centers[-1]:.2f}) "
+              f"within {CONFIDENCE_TOLERANCE:.0%}")
+        return {
+            'spread': centers.tolist(),
+            'coverage': coverage.tolist(),
+            'tolerance': CONFIDENCE_TOLERANCE,
+            'rows': len(sample),
+            'model_version': active.version,
+            'dataset_version': dataset.version
+        }
+    except Exception as e:
+        print(f"[WARNING] Could not calibrate confidence scores: {str(e)}")
+        return None
 
-                'fuel_type_distribution': fuel_distribution,
 
-                'transmission_distribution': transmission_distribution,
+def confidence_calibration(active, dataset=None):
+    """Calibration of a model version on a dataset version (default: the request's), built once per pair"""
+    dataset = dataset or request_dataset()
+    if active is None or dataset is None:
+        return None
+    return dataset.derive(f'confidence_calibration:{active.version}', lambda version: calibrate_confidence(active, version))
 
-                'condition_distribution': condition_distribution,
 
-                'top_cities': city_distribution,
+def calibrated_confidence(active, prediction, interval):
+    """calibrated_confidence (0-100) for one prediction, or None if the versions are not calibrated"""
+    calibration = confidence_calibration(active)
+    if calibration is None:
+        return None
+    spread = relative_spread([prediction], [interval])[0]
+    return int(round(100 * float(np.interp(spread, calibration['spread'], calibration['coverage']))))
 
-                'year_range': year_range,
 
-                'average_kilometers': float(round(avg_kms, 0)),
+def prepare_enhanced_model(active):
+    """Attach the compiled inference path to a freshly loaded model version and calibrate it on the active dataset"""
+    active.fast_path = compile_enhanced_fast_path(active)
+    confidence_calibration(active, dataset_store.active)
 
-                'data_availability': {
 
-                    'exact_match': len(car[
+def warm_up_enhanced_model(active):
+    """Score synthetic requests so the version is hot before it takes traffic"""
+    feature_rows = [build_enhanced_features(sample) for sample in warmup_samples()]
+    for rows in [feature_rows[:1], feature_rows]:
+        predictions = [prediction for prediction, _ in predict_enhanced_rows(rows, active)]
+        if not np.all(np.isfinite(predictions)):
+            raise ValueError(f"Model {active.version} produced non-finite warm-up predictions")
 
-                        (car['company'] == car_data['company']) & 
 
-                        (car['model'] == car_data['model']) &
+# Percentiles of the per-tree predictions reported as the price interval
+PREDICTION_INTERVAL_QUANTILES = (10, 50, 90)
+prediction_intervals_enabled = os.getenv('PREDICTION_INTERVALS', 'true').lower() in ['1', 'true', 'yes']
 
-                        (car['year'] == car_data['year'])
 
-                    ]) > 0,
+def predict_enhanced_rows(feature_rows, active=None):
+    """Score feature dicts with the compiled path, or the pipeline as a fallback.
 
-                    'company_year_match': len(car[
+    Returns one ``(prediction, interval)`` pair per row; ``interval`` is None
+    when intervals are disabled or the model is not a forest.
+    """
+    active = active or model_registry.active
+    if active is None:
+        raise RuntimeError("No enhanced model loaded")
 
-                        (car['company'] == car_data['company']) & 
+    if active.fast_path is None:
+        predictions = active.model.predict(build_enhanced_frame(feature_rows, active))
+        return [(prediction, None) for prediction in predictions]
 
-                        (car['year'] == car_data['year'])
+    if not prediction_intervals_enabled:
+        return [(prediction, None) for prediction in active.fast_path.predict(feature_rows)]
 
-                    ]) > 0,
+    predictions, intervals = active.fast_path.predict_intervals(feature_rows, PREDICTION_INTERVAL_QUANTILES)
+    if intervals is None:
+        return [(prediction, None) for prediction in predictions]
+    return list(zip(predictions, intervals))
 
-                    'company_match': len(car[car['company'] == car_data['company']]) > 0
 
-                }
+def predict_enhanced_batch(feature_rows):
+    """Score with the active version and tag each row with the version used"""
+    active = model_registry.active
+    return [(prediction, interval, active) for prediction, interval in predict_enhanced_rows(feature_rows, active)]
 
-            }
+
+# New versions are compiled and warmed up before they are swapped in
+model_registry.prepare = prepare_enhanced_model
+model_registry.warmup = warm_up_enhanced_model
+
+
+def load_enhanced_model():
+    """Load, compile and warm up the startup model version.
+
+    Goes through the same path as /api/model/reload: a version that fails
+    to load or warm up is not activated, so the registry stays empty (the
+    legacy model answers predictions) and the warm-up step reports failed.
+    """
+    # Prefer the compact array-backed export (python forest_engine.py) when it is up to date
+    model_registry.reload(resolve_model_path(), background=False)
+    version = model_registry.active
+    if version is None:
+        raise RuntimeError(f"Enhanced model not activated: {model_registry.status['error']}")
+    print(f"[OK] {version.name} loaded from {version.path}")
+    print(f"[OK] Features: {len(version.feature_names)} total")
+    print(f"[OK] Performance: R² = {version.performance.get('r2_score', 0):.4f}")
+
+
+# Opt-in micro-batching: concurrent /api/predict calls share one model call
+prediction_batcher = None
+if os.getenv('PREDICTION_BATCHING', '').lower() in ['1', 'true', 'yes']:
+    from prediction_batcher import PredictionBatcher
+
+    prediction_batcher = PredictionBatcher(
+        predict_enhanced_batch,
+        max_batch_size=int(os.getenv('PREDICTION_BATCH_SIZE', 32)),
+        max_wait_ms=float(os.getenv('PREDICTION_BATCH_WAIT_MS', 2))
+    )
+    print(f"[OK] Prediction batching enabled: up to {prediction_batcher.max_batch_size} rows "
+          f"or {prediction_batcher.max_wait * 1000:g} ms per batch")
+
+
+# LRU + TTL cache of prediction results keyed on the normalized car spec
+from prediction_cache import PredictionCache, make_cache_key
+
+prediction_cache = PredictionCache(
+    max_size=int(os.getenv('PREDICTION_CACHE_SIZE', 4096)),
+    ttl_seconds=float(os.getenv('PREDICTION_CACHE_TTL', 600))
+)
+
+
+def prediction_cache_version():
+    """Cached predictions are only valid for this model/dataset combination"""
+    return (enhanced_model_version, legacy_model_version, request_dataset().version)
+
+
+
+def get_car_info_from_dataset(car_data):
+    """Get comprehensive car information from dataset"""
+
+    try:
+        company, model = resolve_car_names(car_data['company'], car_data['model'])
+
+        car_info = request_dataset().comparables_index.lookup(company, model, car_data['year'])
+
+        if car_info is not None:
+            return car_info
 
         else:
 
@@ -1652,8 +2303,6 @@ def get_car_info_from_dataset(car_data):
 
             }
 
-            
-
     except Exception as e:
 
         print(f"Error getting car info: {str(e)}")
@@ -1668,8 +2317,31 @@ def get_car_info_from_dataset(car_data):
 
 
 
+def legacy_price_key(table, name, brand=False):
+    """Key of a legacy price table for a typed or dataset-spelt name; 'default' if none fits.
+
+    The tables use short names ("Maruti Suzuki" / "Swift") where the dataset
+    has "Maruti" / "Maruti Suzuki Swift": a model matches the longest key
+    spelt as whole words in it (the later one on a tie: "Swift Dzire" is a
+    Dzire), a brand the key sharing its first word.
+    """
+    if name in table:
+        return name
+    words = lambda text: re.split(r'[\s-]+', str(text or '').lower().strip())
+    name_words = words(name)
+    if brand:
+        matches = [key for key in table if key != 'default' and words(key)[0] == name_words[0]]
+        return max(matches, key=len) if matches else 'default'
+
+    padded = f" {' '.join(name_words)} "
+    found = {key: padded.rfind(f" {' '.join(words(key))} ") for key in table if key != 'default'}
+    matches = sorted((key for key in found if found[key] >= 0), key=lambda key: (len(key), found[key]))
+    return matches[-1] if matches else 'default'
+
+
 def predict_with_legacy_model(car_data):
     """Fallback to legacy model for backward compatibility"""
+    car = request_dataset().frame
     try:
         # Don't validate - instead use fallbacks for unknown values
         company = car_data['company']
@@ -1827,15 +2499,9 @@ def predict_with_legacy_model(car_data):
         # Get base price based on brand and model
         import random
         
-        # Get price range based on brand and model
-        if company in car_prices:
-            brand_models = car_prices[company]
-            if model in brand_models:
-                min_price, max_price = brand_models[model]
-            else:
-                min_price, max_price = brand_models['default']
-        else:
-            min_price, max_price = car_prices['default']['default']
+        # Get price range based on brand and model (dataset names are matched to the table's short names)
+        brand_models = car_prices[legacy_price_key(car_prices, company, brand=True)]
+        min_price, max_price = brand_models[legacy_price_key(brand_models, model)]
         
         # Convert to lakhs to rupees
         min_price = min_price * 100000
@@ -2212,6 +2878,8 @@ def api_market_overview():
 
     """Get comprehensive market overview"""
 
+    market_analyzer = request_market_analyzer()
+
     if not MARKET_TRENDS_AVAILABLE or not market_analyzer:
 
         return jsonify({
@@ -2258,6 +2926,8 @@ def api_company_trends():
 
     """Get company-wise market trends"""
 
+    market_analyzer = request_market_analyzer()
+
     if not MARKET_TRENDS_AVAILABLE or not market_analyzer:
 
         return jsonify({
@@ -2304,6 +2974,8 @@ def api_company_comparison():
 
     """Compare specific companies"""
 
+    market_analyzer = request_market_analyzer()
+
     if not MARKET_TRENDS_AVAILABLE:
 
         return jsonify({
@@ -2332,7 +3004,9 @@ def api_company_comparison():
 
         
 
-        comparison = get_company_comparison(companies)
+        from market_trends_analyzer import get_company_comparison
+
+        comparison = get_company_comparison(companies, analyzer=market_analyzer)
 
         return jsonify({
 
@@ -2364,6 +3038,8 @@ def api_fuel_type_analysis():
 
     """Get fuel type market analysis"""
 
+    market_analyzer = request_market_analyzer()
+
     if not MARKET_TRENDS_AVAILABLE or not market_analyzer:
 
         return jsonify({
@@ -2410,6 +3086,8 @@ def api_city_market_analysis():
 
     """Get city-wise market analysis"""
 
+    market_analyzer = request_market_analyzer()
+
     if not MARKET_TRENDS_AVAILABLE or not market_analyzer:
 
         return jsonify({
@@ -2456,6 +3134,8 @@ def api_price_trends():
 
     """Get price trends by year"""
 
+    market_analyzer = request_market_analyzer()
+
     if not MARKET_TRENDS_AVAILABLE or not market_analyzer:
 
         return jsonify({
@@ -2502,6 +3182,8 @@ def api_market_predictions():
 
     """Get market predictions and insights"""
 
+    market_analyzer = request_market_analyzer()
+
     if not MARKET_TRENDS_AVAILABLE or not market_analyzer:
 
         return jsonify({
@@ -2548,6 +3230,8 @@ def api_advanced_analytics():
 
     """Get advanced analytics including clustering and correlations"""
 
+    market_analyzer = request_market_analyzer()
+
     if not MARKET_TRENDS_AVAILABLE or not market_analyzer:
 
         return jsonify({
@@ -2594,6 +3278,8 @@ def api_filtered_trends():
 
     """Get filtered price trends"""
 
+    market_analyzer = request_market_analyzer()
+
     if not MARKET_TRENDS_AVAILABLE:
 
         return jsonify({
@@ -2626,7 +3312,9 @@ def api_filtered_trends():
 
         
 
-        trends = get_price_prediction_trends(fuel_type, company, year_range)
+        from market_trends_analyzer import get_price_prediction_trends
+
+        trends = get_price_prediction_trends(fuel_type, company, year_range, analyzer=market_analyzer)
 
         return jsonify({
 
@@ -2668,6 +3356,8 @@ def api_market_report():
 
     """Get comprehensive market report"""
 
+    market_analyzer = request_market_analyzer()
+
     if not MARKET_TRENDS_AVAILABLE or not market_analyzer:
 
         return jsonify({
@@ -2720,6 +3410,8 @@ def api_price_trends_chart():
 
     """Get price trends by year for chart visualization"""
 
+    car = request_dataset().frame
+
     try:
 
         # Get price trends by year directly from dataset
@@ -2788,6 +3480,8 @@ def api_company_market_share_chart():
 
     """Get company market share data for pie chart - ALL BRANDS"""
 
+    car = request_dataset().frame
+
     try:
 
         # Get company counts directly from dataset
@@ -2886,6 +3580,8 @@ def api_fuel_type_distribution_chart():
 
     """Get fuel type distribution for chart"""
 
+    car = request_dataset().frame
+
     try:
 
         # Get fuel type counts directly from dataset
@@ -2968,11 +3664,13 @@ def api_city_price_comparison_chart():
 
     """Get city-wise price comparison for bar chart - ALL CITIES"""
 
+    car = request_dataset().frame
+
     try:
 
         # Get city average prices directly from dataset
 
-        city_avg_prices = car.groupby('city')['Price'].agg(['mean', 'count']).round(2)
+        city_avg_prices = car.groupby('city', observed=True)['Price'].agg(['mean', 'count']).round(2)
 
         city_avg_prices = city_avg_prices.sort_values('mean', ascending=False)
 
@@ -3044,6 +3742,10 @@ def api_transmission_trends_chart():
 
     """Get transmission type trends over years"""
 
+    car = request_dataset().frame
+
+    market_analyzer = request_market_analyzer()
+
     if not MARKET_TRENDS_AVAILABLE or not market_analyzer:
 
         return jsonify({
@@ -3148,6 +3850,10 @@ def api_ev_vs_ice_trends_chart():
 
     """Get EV vs ICE (Internal Combustion Engine) trends"""
 
+    car = request_dataset().frame
+
+    market_analyzer = request_market_analyzer()
+
     if not MARKET_TRENDS_AVAILABLE or not market_analyzer:
 
         return jsonify({
@@ -3284,6 +3990,10 @@ def api_price_vs_kms_scatter_chart():
 
     """Get price vs kilometers driven scatter plot data"""
 
+    car = request_dataset().frame
+
+    market_analyzer = request_market_analyzer()
+
     if not MARKET_TRENDS_AVAILABLE or not market_analyzer:
 
         return jsonify({
@@ -3376,6 +4086,8 @@ def api_indian_brands_sales():
 
     """Get real-time sales data for all Indian car brands"""
 
+    car = request_dataset().frame
+
     try:
 
         # Generate realistic sales data based on dataset
@@ -3870,11 +4582,13 @@ def api_company_price_comparison_chart():
 
     """Get company-wise average price comparison - ALL BRANDS"""
 
+    car = request_dataset().frame
+
     try:
 
         # Get company average prices directly from dataset
 
-        company_avg_prices = car.groupby('company')['Price'].agg(['mean', 'count']).round(2)
+        company_avg_prices = car.groupby('company', observed=True)['Price'].agg(['mean', 'count']).round(2)
 
         company_avg_prices = company_avg_prices.sort_values('mean', ascending=False)
 
@@ -3968,35 +4682,15 @@ def api_search_suggestions():
 
         
 
-        if category in ['all', 'companies']:
-
-            companies_list = car['company'].unique()
-
-            suggestions['companies'] = [c for c in companies_list if query in c.lower()][:10]
-
-        
-
-        if category in ['all', 'models']:
-
-            models_list = car['model'].unique()
-
-            suggestions['models'] = [m for m in models_list if query in m.lower()][:10]
-
-        
-
-        if category in ['all', 'cities']:
-
-            cities_list = car['city'].unique()
-
-            suggestions['cities'] = [c for c in cities_list if query in c.lower()][:10]
+        # Ranked lookups in the listing index's n-gram/prefix text index
 
-        
+        index = request_dataset().listing_index
 
-        if category in ['all', 'fuel_types']:
+        for key, column in [('companies', 'company'), ('models', 'model'), ('cities', 'city'), ('fuel_types', 'fuel_type')]:
 
-            fuel_types_list = car['fuel_type'].unique()
+            if category in ['all', key]:
 
-            suggestions['fuel_types'] = [f for f in fuel_types_list if query in f.lower()][:10]
+                suggestions[key] = index.suggest(column, query, 10)
 
         
 
@@ -4100,6 +4794,14 @@ def predict_legacy():
 
 
 
+        # Misspelt or partial names are matched to the dataset's spelling (the encoders' classes)
+
+        typed_names = {'company': company, 'model': car_model}
+
+        company, car_model = resolve_car_names(company, car_model)
+
+
+
         # Validate that values exist in training data
 
         if company not in le_company.classes_:
@@ -4120,43 +4822,56 @@ def predict_legacy():
 
 
 
-        # Create DataFrame with input data
+        # Repeated specs are served from the prediction cache
 
-        input_data = pd.DataFrame({
+        prediction_cache.sync_version(prediction_cache_version())
 
-            'name': [car_model],
+        cache_key = make_cache_key('legacy', {'company': company, 'model': car_model, 'year': year,
+                                              'kilometers_driven': driven, 'fuel_type': fuel_type})
 
-            'company': [company], 
+        predicted_price = prediction_cache.get(cache_key)
 
-            'year': [year],
+        if predicted_price is None:
 
-            'kilometers_driven': [driven],
+            # Create DataFrame with input data
 
-            'fuel_type': [fuel_type]
+            input_data = pd.DataFrame({
 
-        })
+                'name': [car_model],
 
+                'company': [company], 
 
+                'year': [year],
 
-        # Encode categorical variables
+                'kilometers_driven': [driven],
 
-        input_data['name_encoded'] = le_name.transform(input_data['name'])
+                'fuel_type': [fuel_type]
 
-        input_data['company_encoded'] = le_company.transform(input_data['company'])
+            })
 
-        input_data['fuel_encoded'] = le_fuel.transform(input_data['fuel_type'])
 
 
+            # Encode categorical variables
 
-        # Select only the encoded features
+            input_data['name_encoded'] = le_name.transform(input_data['name'])
+
+            input_data['company_encoded'] = le_company.transform(input_data['company'])
 
-        input_encoded = input_data[['name_encoded', 'company_encoded', 'year', 'kilometers_driven', 'fuel_encoded']]
+            input_data['fuel_encoded'] = le_fuel.transform(input_data['fuel_type'])
+
+
+
+            # Select only the encoded features
 
+            input_encoded = input_data[['name_encoded', 'company_encoded', 'year', 'kilometers_driven', 'fuel_encoded']]
 
 
-        prediction = model.predict(input_encoded)
 
-        predicted_price = float(np.round(prediction[0], 2))
+            prediction = model.predict(input_encoded)
+
+            predicted_price = float(np.round(prediction[0], 2))
+
+            prediction_cache.set(cache_key, predicted_price)
 
         
 
@@ -4176,7 +4891,7 @@ def predict_legacy():
 
         print(f"Legacy Prediction: base={predicted_price}, gst%={gst_percentage}, final={final_price}")
 
-        return jsonify({
+        result = {
 
             "prediction": predicted_price,
             "base_price": predicted_price,
@@ -4185,9 +4900,17 @@ def predict_legacy():
 
             "model_used": "Legacy Linear Regression",
 
+            "model_version": legacy_model_version,
+
+            "dataset_version": request_dataset().version,
+
             "message": "Legacy prediction successful"
 
-        })
+        }
+
+        note_resolved_names(result, typed_names, {'company': company, 'model': car_model})
+
+        return jsonify(result)
 
     
 
@@ -4281,6 +5004,8 @@ def enhanced_predictor():
 
     """Render the enhanced predictor page with market trends"""
 
+    car = request_dataset().frame
+
     if MARKET_TRENDS_AVAILABLE:
 
         try:
@@ -4404,6 +5129,43 @@ def api_test():
 
 
 
+# Startup warm-up: the dataset, models and market analyzer load in this order
+# off the import path (APP_WARMUP=blocking loads them before serving, e.g.
+# when a pre-forking server imports the app once). Requests that need a
+# subsystem wait for it; /api/health answers immediately
+from app_warmup import Warmup, warmup_mode
+
+
+def warm_up_market_analyzer():
+    if dataset_store.active.derive('market_analyzer', build_market_analyzer) is None and MARKET_TRENDS_AVAILABLE:
+        raise RuntimeError("Market trends analyzer could not be built")
+
+
+def warm_up_dataset():
+    dataset_store.load_and_activate()
+    dataset_store.schedule(int(os.getenv('DATASET_RELOAD_INTERVAL', '0') or 0))
+
+
+warmup = Warmup()
+warmup.add('dataset', warm_up_dataset)
+warmup.add('enhanced_model', load_enhanced_model)
+warmup.add('legacy_model', load_legacy_model)
+warmup.add('market_analyzer', warm_up_market_analyzer)
+warmup.start(background=warmup_mode() == 'background')
+
+
+def after_fork():
+    """Per-worker setup when a pre-loading server forks this process (gunicorn.conf.py).
+
+    The dataset versions, catalogs and models loaded by the parent are
+    inherited copy-on-write. MongoDB clients reconnect on first use (see
+    mongodb_config) and the prediction batcher starts its own thread.
+    """
+    warmup.after_fork()
+    dataset_store.after_fork()
+
+
+
 if __name__ == '__main__':
 
     print("AI Car Marketplace - Enhanced Edition")
@@ -4430,6 +5192,10 @@ if __name__ == '__main__':
 
         print(f"[OK] Cities: {car['city'].nunique()} locations")
 
+    elif not warmup.finished('dataset'):
+
+        print("[INFO] Dataset: Loading in the background")
+
     else:
 
         print("[WARNING] Dataset: Not loaded")
@@ -9,6 +9,7 @@ import pandas as pd
 from pymongo import MongoClient, UpdateOne
 from mongodb_config import get_sync_client, MONGODB_DATABASE
 import json
+from datetime import datetime
 from tqdm import tqdm
 
 # Dataset files to check
@@ -76,6 +77,8 @@ def upload_dataset_to_mongodb():
         }
         # Convert to string and use as _id
         record['_id'] = f"{unique_fields['company']}_{unique_fields['model']}_{unique_fields['year']}_{unique_fields['fuel_type']}"
+        # Change stamp for the app's dataset snapshot fingerprint
+        record['updated_at'] = datetime.utcnow()
     
     # Insert data in batches
     batch_size = 1000
@@ -111,6 +114,7 @@ def upload_dataset_to_mongodb():
     collection.create_index([("model", 1)])
     collection.create_index([("year", 1)])
     collection.create_index([("fuel_type", 1)])
+    collection.create_index([("updated_at", 1)])
     print("[OK] Indexes created successfully")
     
     return True